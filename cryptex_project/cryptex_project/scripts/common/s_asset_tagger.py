@@ -0,0 +1,229 @@
+# File: s_asset_tagger.py
+# Tags news text with the assets it mentions in a single pass.
+# Names, aliases and tickers (built-in list plus exchange market lists) are compiled into an
+# Aho-Corasick automaton over lower-cased text. Tickers only count when written in upper case
+# (in text that is not all caps) or as a $cashtag, so symbols that are also English words
+# ("ONE", "NEAR") stay quiet; very short tickers need the cashtag. Names that are also everyday words
+# ("optimism", "polygon", "tron") only count when the text names the asset another way too.
+# The compiled automaton is saved as JSON in a private per-user cache directory and reused while the
+# dictionary is unchanged; JSON rather than pickle, so a tampered cache file cannot run code.
+
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# --- CONFIG ---
+CACHE_PATH = os.environ.get("CRYPTEX_ASSET_TAGGER_CACHE", os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "cryptex", "asset_tagger.json"))
+CACHE_MAX_AGE_S = int(os.environ.get("CRYPTEX_ASSET_TAGGER_MAX_AGE_S", str(24 * 3600)))
+MARKET_EXCHANGES = [e for e in os.environ.get("CRYPTEX_ASSET_TAGGER_EXCHANGES", "binance,kraken,coinbase").split(",") if e]
+MIN_TICKER_LEN = 2
+MIN_BARE_TICKER_LEN = 3
+# --------------
+
+# Canonical symbol -> names / aliases matched case-insensitively.
+BUILTIN_ALIASES: Dict[str, List[str]] = {
+    "BTC": ["bitcoin", "btc", "xbt"],
+    "ETH": ["ethereum", "ether", "eth"],
+    "SOL": ["solana"],
+    "XRP": ["ripple", "xrp"],
+    "BNB": ["bnb", "binance coin"],
+    "DOGE": ["dogecoin", "doge"],
+    "ADA": ["cardano"],
+    "AVAX": ["avalanche", "avax"],
+    "DOT": ["polkadot"],
+    "LINK": ["chainlink"],
+    "MATIC": ["polygon", "matic"],
+    "LTC": ["litecoin", "ltc"],
+    "TRX": ["tron", "trx"],
+    "SHIB": ["shiba inu", "shib"],
+    "TON": ["toncoin"],
+    "USDT": ["tether", "usdt"],
+    "USDC": ["usd coin", "usdc"],
+    "ARB": ["arbitrum"],
+    "OP": ["optimism"],
+    "PEPE": ["pepe"],
+}
+# Aliases that are common English words or names: matched only alongside the ticker, a cashtag or
+# another alias of the same asset ("Avalanche (AVAX) rallies", but not "avalanche risk in the Alps").
+AMBIGUOUS_ALIASES = {"optimism", "polygon", "avalanche", "tron"}
+# Quote currencies and fiat are not news catalysts for a traded asset.
+IGNORED_SYMBOLS = {"USD", "EUR", "GBP", "JPY", "AUD", "CAD", "CHF", "TRY", "BRL", "USDT", "USDC", "BUSD", "DAI", "TUSD", "FDUSD"}
+
+
+class AhoCorasick:
+    """Minimal Aho-Corasick automaton; payloads are (canonical_symbol, is_ticker)."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, str, bool]] = ()):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[int, str, bool]]] = [[]]
+        for pattern, symbol, is_ticker in patterns:
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].append((len(pattern), symbol, is_ticker))
+        # Breadth-first failure links; outputs of the fallback state are merged in.
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def tables(self) -> tuple:
+        # Plain lists/dicts only, so the automaton round-trips through the JSON cache.
+        return self.goto, self.fail, self.out
+
+    @classmethod
+    def from_tables(cls, tables) -> "AhoCorasick":
+        automaton = cls()
+        goto, fail, out = tables
+        automaton.goto, automaton.fail = goto, fail
+        automaton.out = [[tuple(entry) for entry in entries] for entries in out]
+        return automaton
+
+    def iter_matches(self, text: str):
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for end, ch in enumerate(text, 1):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for length, symbol, is_ticker in out[node]:
+                    yield end - length, end, symbol, is_ticker
+
+
+class AssetTagger:
+    def __init__(self, automaton: AhoCorasick):
+        self.automaton = automaton
+
+    @classmethod
+    def from_dictionary(cls, dictionary: Dict[str, List[str]]) -> "AssetTagger":
+        patterns = []
+        for symbol, aliases in dictionary.items():
+            patterns.extend((alias.lower(), symbol, False) for alias in aliases if alias)
+        patterns.extend((symbol.lower(), symbol, True) for symbol in dictionary if len(symbol) >= MIN_TICKER_LEN)
+        return cls(AhoCorasick(patterns))
+
+    def tag(self, text: Optional[str]) -> List[str]:
+        """Returns the canonical symbols mentioned in text, in order of first mention."""
+        if not text:
+            return []
+        lowered = text.lower()
+        shouting = text.isupper()
+        found: Dict[str, None] = {}
+        confirmed = set()
+        for start, end, symbol, is_ticker in self.automaton.iter_matches(lowered):
+            # Whole words only
+            if (start > 0 and lowered[start - 1].isalnum()) or (end < len(lowered) and lowered[end].isalnum()):
+                continue
+            if is_ticker and not (start > 0 and text[start - 1] == "$"):
+                if shouting or end - start < MIN_BARE_TICKER_LEN or not text[start:end].isupper():
+                    continue
+            found.setdefault(symbol)
+            if is_ticker or lowered[start:end] not in AMBIGUOUS_ALIASES:
+                confirmed.add(symbol)
+        return [s for s in found if s in confirmed and s not in IGNORED_SYMBOLS]
+
+    def tag_article(self, article: Dict) -> List[str]:
+        return self.tag(" ".join(filter(None, [article.get("title"), article.get("description")])))
+
+
+def fetch_exchange_dictionary(exchanges: List[str] = MARKET_EXCHANGES) -> Dict[str, List[str]]:
+    """Base-currency codes (and names where the exchange reports them) from exchange market lists."""
+    import ccxt  # Only needed when (re)building the dictionary
+    dictionary: Dict[str, List[str]] = {}
+    for name in exchanges:
+        try:
+            exchange = getattr(ccxt, name)()
+            for market in exchange.load_markets().values():
+                dictionary.setdefault(market["base"], [])
+            for code, currency in (exchange.currencies or {}).items():
+                if currency.get("name") and code in dictionary:
+                    dictionary[code].append(currency["name"])
+        except Exception as e:
+            print(f"WARN: [AssetTagger] Could not load markets from {name}. Error: {e}")
+    return dictionary
+
+
+def build_dictionary(include_exchanges: bool = True) -> Dict[str, List[str]]:
+    dictionary = {symbol: list(aliases) for symbol, aliases in BUILTIN_ALIASES.items()}
+    if include_exchanges:
+        for symbol, names in fetch_exchange_dictionary().items():
+            aliases = dictionary.setdefault(symbol, [])
+            # Multi-word or long names are safe to match case-insensitively; short ones are too ambiguous.
+            aliases.extend(n for n in names if len(n) > 4 and n.lower() not in aliases)
+    return dictionary
+
+
+def _dictionary_digest(dictionary: Dict[str, List[str]]) -> str:
+    return hashlib.sha256(json.dumps(dictionary, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _read_cache(cache_path: str) -> Dict:
+    with open(cache_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_cache(cache_path: str, payload: Dict) -> None:
+    directory = os.path.dirname(cache_path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp_path, cache_path)
+
+
+def compile_tagger(dictionary: Dict[str, List[str]], cache_path: Optional[str] = CACHE_PATH) -> AssetTagger:
+    """Compiles (or loads the cached) automaton for this dictionary."""
+    digest = _dictionary_digest(dictionary)
+    if cache_path and os.path.exists(cache_path):
+        try:
+            cached = _read_cache(cache_path)
+            if cached.get("digest") == digest:
+                return AssetTagger(AhoCorasick.from_tables(cached["tables"]))
+        except Exception as e:
+            print(f"WARN: [AssetTagger] Ignoring unreadable cache {cache_path}. Error: {e}")
+    tagger = AssetTagger.from_dictionary(dictionary)
+    if cache_path:
+        try:
+            _write_cache(cache_path, {"digest": digest, "dictionary": dictionary, "tables": tagger.automaton.tables()})
+        except OSError as e:
+            print(f"WARN: [AssetTagger] Could not write cache {cache_path}. Error: {e}")
+    return tagger
+
+
+_tagger: Optional[AssetTagger] = None
+
+
+def get_tagger(cache_path: Optional[str] = CACHE_PATH) -> AssetTagger:
+    """Returns the process-wide tagger: fresh disk cache if present, otherwise rebuilt from exchanges."""
+    global _tagger
+    if _tagger is not None:
+        return _tagger
+    if cache_path and os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < CACHE_MAX_AGE_S:
+        try:
+            _tagger = AssetTagger(AhoCorasick.from_tables(_read_cache(cache_path)["tables"]))
+            return _tagger
+        except Exception as e:
+            print(f"WARN: [AssetTagger] Rebuilding after cache load failure. Error: {e}")
+    _tagger = compile_tagger(build_dictionary(), cache_path)
+    return _tagger
+
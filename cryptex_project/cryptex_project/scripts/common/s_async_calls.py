@@ -0,0 +1,122 @@
+# File: s_async_calls.py
+# Helpers for fanning out slow API calls with asyncio: a bounded, order-preserving
+# gather, per-provider token-bucket rate limits, and per-call timeouts with retries of transient
+# failures (timeouts, dropped connections, 429 and 5xx); other errors are raised at once.
+
+import asyncio
+import functools
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_CONCURRENCY = int(os.environ.get("CRYPTEX_LLM_CONCURRENCY", "8"))
+DEFAULT_TIMEOUT_S = float(os.environ.get("CRYPTEX_LLM_TIMEOUT_S", "60"))
+DEFAULT_RETRIES = int(os.environ.get("CRYPTEX_LLM_RETRIES", "3"))
+DEFAULT_BACKOFF_S = float(os.environ.get("CRYPTEX_LLM_BACKOFF_S", "1.0"))
+
+
+class AsyncTokenBucket:
+    """Allows `rate` calls per second on average with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def provider_limiters(providers: Sequence[str]) -> Dict[str, AsyncTokenBucket]:
+    """Builds one bucket per provider from CRYPTEX_RATE_LIMIT_<PROVIDER>_RPS (default 5/s)."""
+    return {
+        name: AsyncTokenBucket(float(os.environ.get(f"CRYPTEX_RATE_LIMIT_{name.upper()}_RPS", "5")))
+        for name in providers
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _connection_errors() -> Tuple[type, ...]:
+    """Connection and timeout errors of the HTTP clients that are installed."""
+    errors = [TimeoutError, ConnectionError]
+    try:
+        import aiohttp
+        errors.append(aiohttp.ClientConnectionError)  # Includes ServerDisconnectedError and ServerTimeoutError
+    except ImportError:
+        pass
+    try:
+        import requests
+        errors += [requests.ConnectionError, requests.Timeout]
+    except ImportError:
+        pass
+    try:
+        import openai
+        errors.append(openai.APIConnectionError)  # Includes APITimeoutError
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+def _status_code(e: Exception) -> Optional[int]:
+    # openai.APIStatusError, aiohttp.ClientResponseError and requests.HTTPError respectively.
+    for status in (getattr(e, "status_code", None), getattr(e, "status", None),
+                   getattr(getattr(e, "response", None), "status_code", None)):
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_transient(e: Exception) -> bool:
+    """True for errors worth retrying: timeouts, connection errors, HTTP 429 and 5xx."""
+    status = _status_code(e)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(e, _connection_errors())
+
+
+async def call_with_retry(fn: Callable[[], Awaitable[Any]], label: str, limiter: Optional[AsyncTokenBucket] = None,
+                          timeout_s: float = DEFAULT_TIMEOUT_S, retries: int = DEFAULT_RETRIES,
+                          backoff_s: float = DEFAULT_BACKOFF_S) -> Any:
+    """Awaits fn() under the rate limit and a timeout, retrying transient errors (is_transient) with
+    jittered exponential backoff. Anything else, e.g. a 400 or 401, is raised on the first attempt."""
+    for attempt in range(1, retries + 1):
+        if limiter is not None:
+            await limiter.acquire()
+        try:
+            return await asyncio.wait_for(fn(), timeout=timeout_s)
+        except Exception as e:
+            if attempt == retries or not is_transient(e):
+                raise
+            delay = backoff_s * 2 ** (attempt - 1) * (0.5 + random.random())
+            print(f"WARN: [Async] {label} failed (attempt {attempt}/{retries}), retrying in {delay:.1f}s. Error: {e!r}")
+            await asyncio.sleep(delay)
+
+
+async def bounded_gather(items: Sequence[Any], worker: Callable[[Any], Awaitable[Any]],
+                         concurrency: int = DEFAULT_CONCURRENCY) -> List[Any]:
+    """Runs worker(item) for every item with at most `concurrency` in flight.
+
+    Results come back in input order; an item whose worker raised yields None.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(index: int, item: Any) -> Any:
+        async with semaphore:
+            try:
+                return await worker(item)
+            except Exception as e:
+                print(f"ERROR: [Async] Item {index} failed. Error: {e!r}")
+                return None
+
+    return await asyncio.gather(*(run(i, item) for i, item in enumerate(items)))
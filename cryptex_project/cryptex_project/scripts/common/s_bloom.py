@@ -0,0 +1,56 @@
+# File: s_bloom.py
+# Compact Bloom filter for "have we seen this key" checks in front of Postgres.
+# A miss is definite; a hit may be a false positive (about `error_rate` at `capacity` keys), so
+# callers confirm hits against the database. Serialises to a string so it fits the shared
+# Redis / in-process cache backends of s_llm_cache.
+
+import base64
+import hashlib
+import math
+import zlib
+from typing import Iterable, Iterator
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterator[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest.
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def update(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    @property
+    def is_full(self) -> bool:
+        """Past capacity the false-positive rate climbs; time to rebuild."""
+        return self.count >= self.capacity
+
+    def dumps(self) -> str:
+        header = f"{self.capacity}:{self.error_rate}:{self.count}:"
+        return header + base64.b64encode(zlib.compress(bytes(self.bits))).decode("ascii")
+
+    @classmethod
+    def loads(cls, data: str) -> "BloomFilter":
+        capacity, error_rate, count, bits = data.split(":", 3)
+        bloom = cls(int(capacity), float(error_rate))
+        bloom.bits = bytearray(zlib.decompress(base64.b64decode(bits)))
+        bloom.count = int(count)
+        return bloom
@@ -0,0 +1,164 @@
+# File: s_catalyst_clusters.py
+# Near-duplicate clustering of news catalysts at ingest.
+# A breaking story comes back as many rewrites ("BREAKING: ...", "... - CoinDesk", one word swapped),
+# and each would otherwise be analysed separately against the same trade. Every headline gets a
+# MinHash signature over its word unigrams and bigrams, cut into LSH bands. Band keys go into
+# catalyst_fingerprints (GIN index), so candidates are found by key lookup, not by scanning the
+# window. A candidate joins a cluster when its estimated Jaccard similarity is at least
+# MIN_SIMILARITY. cluster_id is derived from the content hash of the cluster's first article.
+# The correlation query (s_correlate.py) then emits one pair per (trade, cluster).
+
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from psycopg2.extras import execute_values
+
+# --- CONFIG ---
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 Jaccard are likely to share a band
+MIN_SIMILARITY = float(os.environ.get("CRYPTEX_NEWS_CLUSTER_MIN_SIMILARITY", "0.6"))
+CLUSTER_WINDOW = os.environ.get("CRYPTEX_NEWS_CLUSTER_WINDOW", "24 hours")
+IDENTITY_WEIGHT = 3
+# --------------
+
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_PERMS = [(int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "little") % (_PRIME - 1) + 1,
+           int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "little") % _PRIME) for i in range(NUM_PERM)]
+
+# Wire prefixes and filler words that rewrites add or drop without changing the story.
+BOILERPLATE = {"breaking", "just", "in", "update", "updated", "exclusive", "report", "reports", "says", "a", "an", "the",
+               "of", "to", "for", "on", "as", "at", "by", "and", "is", "are", "with", "after", "amid", "its"}
+_SOURCE_SUFFIX = re.compile(r"\s+[-|–—]\s+[^-|–—]{2,40}$")
+_TOKEN = re.compile(r"[a-z0-9$%.]+")
+
+_stats = {"fingerprinted": 0, "joined": 0, "new_clusters": 0, "candidates": 0}
+_stats_lock = threading.Lock()
+
+
+class Fingerprint(NamedTuple):
+    content_hash: str
+    signature: List[int]
+    band_keys: List[int]
+    cluster_id: int
+
+
+def _count(key: str, value: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += value
+
+
+def cluster_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def shingles(headline: Optional[str], asset_tags: Sequence[str] = ()) -> set:
+    """Word unigrams and bigrams of the headline without its source suffix and boilerplate.
+
+    Figures ("12%", "$70k") and asset tags are counted IDENTITY_WEIGHT times: rewrites keep them,
+    while the same theme on another asset or with other numbers is a different story.
+    """
+    text = _SOURCE_SUFFIX.sub("", headline or "").lower()
+    words = [w.strip(".") for w in _TOKEN.findall(text)]
+    words = [w for w in words if w and w not in BOILERPLATE]
+    if not words:
+        return set()
+    identity = [w for w in words if any(ch.isdigit() for ch in w)] + [f"@{t}" for t in asset_tags]
+    weighted = {f"{w}#{i}" for w in identity for i in range(IDENTITY_WEIGHT)}
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])} | weighted
+
+
+def signature(features: set) -> List[int]:
+    hashes = [int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "little") for f in features]
+    return [min((a * x + b) % _PRIME for x in hashes) for a, b in _PERMS]
+
+
+def band_keys(sig: Sequence[int]) -> List[int]:
+    # Band number is part of the key so equal rows in different bands never match; keys fit BIGINT.
+    return [int.from_bytes(hashlib.blake2b(repr((band, tuple(sig[band * ROWS:(band + 1) * ROWS]))).encode(), digest_size=8).digest(),
+                           "little") >> 1 for band in range(BANDS)]
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def new_cluster_id(content_hash: str) -> int:
+    return int(content_hash[:15], 16)
+
+
+class ClusterIndex:
+    """In-memory LSH index over fingerprints: band key -> fingerprints sharing it."""
+
+    def __init__(self):
+        self.buckets: Dict[int, List[Fingerprint]] = {}
+
+    def add(self, fingerprint: Fingerprint) -> None:
+        for key in fingerprint.band_keys:
+            self.buckets.setdefault(key, []).append(fingerprint)
+
+    def match(self, sig: Sequence[int], keys: Sequence[int]) -> Optional[Fingerprint]:
+        """The most similar indexed fingerprint at or above MIN_SIMILARITY, if any."""
+        candidates = {fp.content_hash: fp for key in keys for fp in self.buckets.get(key, ())}
+        _count("candidates", len(candidates))
+        best, best_score = None, MIN_SIMILARITY
+        for fp in candidates.values():
+            score = similarity(sig, fp.signature)
+            if score >= best_score:
+                best, best_score = fp, score
+        return best
+
+    def assign(self, content_hash: str, sig: Optional[List[int]]) -> Tuple[int, Optional[Fingerprint]]:
+        """(cluster id, fingerprint to store); articles without a signature form their own cluster."""
+        if sig is None:
+            return new_cluster_id(content_hash), None
+        keys = band_keys(sig)
+        match = self.match(sig, keys)
+        _count("joined" if match else "new_clusters")
+        fingerprint = Fingerprint(content_hash, sig, keys, match.cluster_id if match else new_cluster_id(content_hash))
+        self.add(fingerprint)
+        return fingerprint.cluster_id, fingerprint
+
+
+def fingerprint_headline(headline: Optional[str], asset_tags: Sequence[str] = ()) -> Optional[List[int]]:
+    features = shingles(headline, asset_tags)
+    if not features:
+        return None
+    _count("fingerprinted")
+    return signature(features)
+
+
+def assign_clusters(cur, articles: Sequence[Tuple[str, Optional[str], Sequence[str]]]) -> Tuple[List[int], List[Fingerprint]]:
+    """Cluster ids for (content_hash, headline, asset_tags), matched against the stored window and each other.
+
+    Returns the ids in input order and the new fingerprints; store the inserted ones with save_fingerprints().
+    """
+    signatures = [fingerprint_headline(headline, tags) for _, headline, tags in articles]
+    keys = sorted({k for sig in signatures if sig for k in band_keys(sig)})
+    index = ClusterIndex()
+    if keys:
+        cur.execute("SELECT content_hash, signature, band_keys, cluster_id FROM public.catalyst_fingerprints "
+                    "WHERE band_keys && %s::bigint[] AND first_seen > NOW() - %s::interval", (keys, CLUSTER_WINDOW))
+        for row in cur.fetchall():
+            index.add(Fingerprint(*row))
+    cluster_ids, fingerprints = [], []
+    for (h, _, _), sig in zip(articles, signatures):
+        cluster_id, fingerprint = index.assign(h, sig)
+        cluster_ids.append(cluster_id)
+        if fingerprint:
+            fingerprints.append(fingerprint)
+    return cluster_ids, fingerprints
+
+
+def save_fingerprints(cur, fingerprints: Sequence[Fingerprint]) -> None:
+    if not fingerprints:
+        return
+    execute_values(cur, "INSERT INTO public.catalyst_fingerprints (content_hash, signature, band_keys, cluster_id) VALUES %s "
+                        "ON CONFLICT (content_hash) DO NOTHING", [tuple(fp) for fp in fingerprints],
+                   template="(%s, %s::bigint[], %s::bigint[], %s)")
+
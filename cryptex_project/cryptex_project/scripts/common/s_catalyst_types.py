@@ -0,0 +1,42 @@
+# File: s_catalyst_types.py
+# Coarse catalyst type of a news article, set at ingest (s_ingest.ingest_catalysts) so the
+# historical-precedent check can look up a trader's record per kind of event (see s_outcomes.py).
+# Keyword classes are tried in order over the headline and description; the first class with a
+# whole-word match wins, so the more specific events come first ("exchange hacked" is a hack, not a listing).
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .s_outcomes import UNKNOWN_CATALYST
+
+# --- CONFIG ---
+CATALYST_KEYWORDS: List[Tuple[str, List[str]]] = [
+    ("hack", ["hack", "hacked", "hacker", "hackers", "exploit", "exploited", "drained", "stolen", "breach", "rug pull"]),
+    ("delisting", ["delist", "delists", "delisted", "delisting"]),
+    ("etf", ["etf", "etfs", "etp"]),
+    ("regulation", ["sec", "cftc", "regulator", "regulators", "regulation", "regulatory", "lawsuit", "sues", "sued",
+                    "ban", "bans", "banned", "court", "charges", "settlement", "legislation", "mica"]),
+    ("listing", ["listing", "listings", "lists", "listed", "will list", "to list"]),
+    ("macro", ["fed", "fomc", "interest rate", "interest rates", "rate cut", "rate hike", "inflation", "cpi", "jobs report",
+               "recession", "treasury yields"]),
+    ("partnership", ["partnership", "partners with", "partner", "teams up", "collaboration", "integrates", "integration"]),
+    ("upgrade", ["upgrade", "hard fork", "mainnet", "testnet", "network launch"]),
+    ("tokenomics", ["unlock", "unlocks", "airdrop", "token burn", "buyback", "halving"]),
+]
+# --------------
+
+_PATTERNS = [(catalyst_type, re.compile(r"\b(?:" + "|".join(re.escape(k) for k in keywords) + r")\b"))
+             for catalyst_type, keywords in CATALYST_KEYWORDS]
+
+
+def classify_catalyst(*texts: Optional[str]) -> str:
+    """Catalyst type of the first keyword class found in the texts, else UNKNOWN_CATALYST."""
+    text = " ".join(t for t in texts if t).lower()
+    for catalyst_type, pattern in _PATTERNS:
+        if pattern.search(text):
+            return catalyst_type
+    return UNKNOWN_CATALYST
+
+
+def article_catalyst_type(article: Dict[str, Any]) -> str:
+    return classify_catalyst(article.get("title") or article.get("headline"), article.get("description"))
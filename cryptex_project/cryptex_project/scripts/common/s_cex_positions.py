@@ -0,0 +1,172 @@
+# File: s_cex_positions.py
+# Position polling for the CEX trader monitor.
+# Every active CEX trader in monitored_traders is polled concurrently over one aiohttp session,
+# under a global token bucket, with per-request timeouts and retries. The positions are diffed
+# against the last-seen set in cex_trader_positions, and only OPEN / CLOSE / RESIZE events become
+# trade rows. In those rows raw_data.amount is the signed size traded (new minus old position), so
+# the herd aggregates count flow. position_amount and previous_amount keep the position sizes.
+# A trader whose poll failed is left untouched, so an error never looks like closed positions.
+# CRYPTEX_BINANCE_LEADERBOARD_URL can point at a local stub endpoint (see tests/test_cex_positions.py).
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from psycopg2.extras import execute_values
+
+from .s_async_calls import AsyncTokenBucket, bounded_gather, call_with_retry
+from .s_db import cursor
+from .s_ingest import ingest_trades
+
+# --- CONFIG ---
+LEADERBOARD_URL = os.environ.get("CRYPTEX_BINANCE_LEADERBOARD_URL", "https://fapi.binance.com/fapi/v1/leaderboard/getOtherPosition")
+LEADERBOARD_RPS = float(os.environ.get("CRYPTEX_RATE_LIMIT_BINANCE_LEADERBOARD_RPS", "5"))
+POLL_CONCURRENCY = int(os.environ.get("CRYPTEX_CEX_POLL_CONCURRENCY", "16"))
+POLL_TIMEOUT_S = float(os.environ.get("CRYPTEX_CEX_POLL_TIMEOUT_S", "10"))
+CEX_EXCHANGES = ("binance",)  # monitored_traders.exchange values polled here; identifier is the encryptedUid
+# --------------
+
+# Fields that make an event unique, so a re-run after a failed state write is deduplicated.
+EVENT_KEY_FIELDS = ("symbol", "event", "amount", "position_amount", "entryPrice", "updateTime")
+
+UPSERT_POSITIONS_SQL = """
+INSERT INTO public.cex_trader_positions (trader_id, symbol, direction, amount, raw_data) VALUES %s
+ON CONFLICT (trader_id, symbol, direction) DO UPDATE SET
+    amount = EXCLUDED.amount, raw_data = EXCLUDED.raw_data, updated_at = NOW()
+"""
+
+DELETE_POSITIONS_SQL = """
+DELETE FROM public.cex_trader_positions p
+USING unnest(%s::text[], %s::text[], %s::text[]) AS k(trader_id, symbol, direction)
+WHERE p.trader_id = k.trader_id AND p.symbol = k.symbol AND p.direction = k.direction
+"""
+
+_stats = {"requests": 0, "poll_errors": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, value: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += value
+
+
+def poller_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def position_key(position: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """(symbol, direction); hedge-mode accounts can hold a long and a short on the same symbol."""
+    try:
+        amount = float(position.get("amount") or 0)
+    except (TypeError, ValueError):
+        return None
+    if not position.get("symbol") or amount == 0:
+        return None
+    return position["symbol"], "LONG" if amount > 0 else "SHORT"
+
+
+def diff_positions(previous: Dict[Tuple[str, str], Dict[str, Any]], current: Sequence[Dict[str, Any]]
+                   ) -> Tuple[List[Dict[str, Any]], Dict[Tuple[str, str], Dict[str, Any]], List[Tuple[str, str]]]:
+    """(events, positions to upsert, keys to delete) between the last-seen and the polled position set."""
+    now = {}
+    for position in current:
+        key = position_key(position)
+        if key:
+            now[key] = position
+    events, upserts = [], {}
+    for key, position in now.items():
+        amount = float(position["amount"])
+        old = previous.get(key)
+        old_amount = float(old["amount"]) if old else 0.0
+        if old is None or abs(amount - old_amount) > 1e-12 * max(abs(amount), abs(old_amount)):
+            events.append({**position, "event": "OPEN" if old is None else "RESIZE", "position_amount": amount,
+                           "previous_amount": old_amount, "amount": amount - old_amount})
+            upserts[key] = position
+    closed = [key for key in previous if key not in now]
+    for key in closed:
+        old = previous[key]
+        events.append({**old, "event": "CLOSE", "position_amount": 0.0, "previous_amount": float(old["amount"]),
+                       "amount": -float(old["amount"])})
+    return events, upserts, closed
+
+
+class LeaderboardClient:
+    """One per poll: owns the pooled HTTP session and the global rate limiter."""
+
+    def __init__(self, url: str = LEADERBOARD_URL, rate_limit_rps: float = LEADERBOARD_RPS,
+                 concurrency: int = POLL_CONCURRENCY, timeout_s: float = POLL_TIMEOUT_S):
+        self.url = url
+        self.limiter = AsyncTokenBucket(rate_limit_rps)
+        self.concurrency = concurrency
+        self.timeout_s = timeout_s
+        self.session = None
+
+    async def __aenter__(self) -> "LeaderboardClient":
+        import aiohttp
+
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.concurrency),
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout_s))
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.session.close()
+
+    async def _get(self, encrypted_uid: str) -> Optional[List[Dict[str, Any]]]:
+        _count("requests")
+        async with self.session.get(self.url, params={"encryptedUid": encrypted_uid}) as res:
+            res.raise_for_status()
+            body = await res.json(content_type=None)
+        # A null list means the trader hides positions: unknown, not empty.
+        positions = (body.get("data") or {}).get("otherPositionRetList")
+        if positions is None:
+            raise ValueError(f"No position list for {encrypted_uid} (positions hidden?)")
+        return positions
+
+    async def positions(self, encrypted_uid: str) -> List[Dict[str, Any]]:
+        return await call_with_retry(lambda: self._get(encrypted_uid), label=f"Leaderboard {encrypted_uid[:8]}",
+                                     limiter=self.limiter, timeout_s=self.timeout_s + 5)
+
+
+def load_last_positions(trader_ids: Sequence[str]) -> Dict[str, Dict[Tuple[str, str], Dict[str, Any]]]:
+    with cursor() as cur:
+        cur.execute("SELECT trader_id, symbol, direction, raw_data FROM public.cex_trader_positions WHERE trader_id = ANY(%s)",
+                    (list(trader_ids),))
+        last: Dict[str, Dict[Tuple[str, str], Dict[str, Any]]] = {}
+        for trader_id, symbol, direction, raw_data in cur.fetchall():
+            last.setdefault(trader_id, {})[(symbol, direction)] = raw_data
+    return last
+
+
+def save_positions(upserts: List[tuple], deletes: List[tuple]) -> None:
+    with cursor() as cur:
+        if upserts:
+            execute_values(cur, UPSERT_POSITIONS_SQL, upserts, template="(%s, %s, %s, %s, %s::jsonb)")
+        if deletes:
+            cur.execute(DELETE_POSITIONS_SQL, [list(c) for c in zip(*deletes)])
+
+
+async def poll_traders(trader_ids: Sequence[str], url: Optional[str] = None, rate_limit_rps: Optional[float] = None) -> Dict[str, Any]:
+    """Polls every trader, records their position changes and returns the assets of new trade rows."""
+    last = load_last_positions(trader_ids)
+    async with LeaderboardClient(url or LEADERBOARD_URL, rate_limit_rps or LEADERBOARD_RPS) as client:
+        polled = await bounded_gather(trader_ids, client.positions, concurrency=client.concurrency)
+
+    trade_events, upserts, deletes = [], [], []
+    for trader_id, positions in zip(trader_ids, polled):
+        if positions is None:
+            _count("poll_errors")
+            continue
+        events, changed, closed = diff_positions(last.get(trader_id, {}), positions)
+        trade_events += [{"trader_id": trader_id, "asset": e["symbol"], "raw_data": e} for e in events]
+        upserts += [(trader_id, symbol, direction, float(p["amount"]), json.dumps(p)) for (symbol, direction), p in changed.items()]
+        deletes += [(trader_id, symbol, direction) for symbol, direction in closed]
+
+    # Events first: if the state write then fails, the next poll re-emits them and the hash claim drops them.
+    inserted_assets = ingest_trades(trade_events, key_fields=EVENT_KEY_FIELDS)
+    save_positions(upserts, deletes)
+    failed = sum(1 for p in polled if p is None)
+    print(f"INFO: [CEX Monitor] Polled {len(trader_ids) - failed}/{len(trader_ids)} trader(s): {len(trade_events)} position change(s).")
+    return {"assets": inserted_assets, "events": len(trade_events), "failed_traders": failed}
+
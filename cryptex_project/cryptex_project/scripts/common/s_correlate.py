@@ -0,0 +1,204 @@
+# File: s_correlate.py
+# Incremental trade/catalyst correlation.
+# Each consumer keeps a high-water mark in correlation_watermarks and every pair it emitted in
+# correlated_pairs, so a run only joins rows that arrived since the previous run against the time
+# window. The mark is the database snapshot the previous run saw: ids are taken at INSERT but
+# committed later, so a row with a lower id than ones already seen can still commit after them.
+# Rewrites of one story share a cluster id (see s_catalyst_clusters.py); a trade is paired with
+# one representative per cluster, the earliest catalyst, so each story is analysed once per trade.
+# Consumers that analyse their pairs pass track=True: pairs are claimed as PENDING and only
+# finish_pairs() marks them DONE, so a failed analysis or a crashed run is retried, up to MAX_ATTEMPTS.
+# SlidingWindowCorrelator is the in-memory equivalent used by s_correlation_daemon.py.
+
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .s_db import cursor
+
+CORRELATION_WINDOW = "5 minutes"
+# A tracked pair that is still PENDING this long after it was handed out belongs to a run that died.
+PENDING_LEASE = "10 minutes"
+MAX_ATTEMPTS = 3
+# Nothing is visible in this snapshot: a consumer's first run treats every row in the window as new.
+EMPTY_SNAPSHOT = "1:1:"
+
+# New rows were committed after the previous run's snapshot (`since`) and before this run's (`upto`),
+# and were ingested within the last window; rows committed while the query runs are left for the next
+# run. A new row pairs with every row of the same asset ingested less than a window before or after it,
+# the same rule as SlidingWindowCorrelator, so a pair does not depend on when the cron run happens.
+# New trades x catalysts, plus new catalysts x trades that were already behind the mark (new x new is
+# covered by the first half). Both halves are driven by the new rows (ingest_xid index) and use the
+# asset_tags GIN / (asset, ingested_at) indexes on the other side.
+NEW_PAIRS_SQL = """
+WITH new_trades AS (
+    SELECT id, ingested_at, trader_id, asset, raw_data FROM public.recent_trades
+    WHERE ingest_xid >= pg_snapshot_xmin(%(since)s::pg_snapshot) AND ingested_at > NOW() - %(window)s::interval
+      AND NOT pg_visible_in_snapshot(ingest_xid, %(since)s::pg_snapshot) AND pg_visible_in_snapshot(ingest_xid, %(upto)s::pg_snapshot)
+), new_catalysts AS (
+    SELECT id, ingested_at, asset_tags, raw_data, cluster_id FROM public.recent_catalysts
+    WHERE ingest_xid >= pg_snapshot_xmin(%(since)s::pg_snapshot) AND ingested_at > NOW() - %(window)s::interval
+      AND NOT pg_visible_in_snapshot(ingest_xid, %(since)s::pg_snapshot) AND pg_visible_in_snapshot(ingest_xid, %(upto)s::pg_snapshot)
+), candidates AS (
+    SELECT t.id AS trade_id, c.id AS catalyst_id, COALESCE(c.cluster_id, -c.id) AS cluster_id, t.trader_id, t.asset,
+           t.raw_data AS trade_data, c.raw_data AS catalyst_data
+    FROM new_trades t JOIN public.recent_catalysts c ON c.asset_tags @> ARRAY[t.asset::text]
+    WHERE c.ingested_at > t.ingested_at - %(window)s::interval AND c.ingested_at < t.ingested_at + %(window)s::interval
+      AND pg_visible_in_snapshot(c.ingest_xid, %(upto)s::pg_snapshot)
+    UNION ALL
+    SELECT t.id, c.id, COALESCE(c.cluster_id, -c.id), t.trader_id, t.asset, t.raw_data, c.raw_data
+    FROM new_catalysts c JOIN public.recent_trades t ON t.asset = ANY(c.asset_tags)
+    WHERE t.ingested_at > c.ingested_at - %(window)s::interval AND t.ingested_at < c.ingested_at + %(window)s::interval
+      AND pg_visible_in_snapshot(t.ingest_xid, %(since)s::pg_snapshot)
+), emitted AS (
+    INSERT INTO public.correlated_pairs (consumer, trade_id, catalyst_id, cluster_id, asset, status, attempts, claimed_at)
+    SELECT DISTINCT ON (trade_id, cluster_id) %(consumer)s, trade_id, catalyst_id, cluster_id, asset, %(status)s, %(attempts)s, NOW()
+    FROM candidates
+    ORDER BY trade_id, cluster_id, catalyst_id
+    -- Either key: the pair itself, or another copy of the story already emitted for this trade.
+    ON CONFLICT DO NOTHING
+    RETURNING trade_id, catalyst_id
+)
+SELECT c.trade_id, c.catalyst_id, c.cluster_id, c.trader_id, c.asset, c.trade_data, c.catalyst_data
+FROM candidates c JOIN emitted e ON e.trade_id = c.trade_id AND e.catalyst_id = c.catalyst_id
+ORDER BY c.trade_id, c.catalyst_id
+"""
+
+# Tracked pairs that failed, or were handed to a run that died, are claimed again with their rows.
+RETRY_PAIRS_SQL = """
+WITH due AS (
+    UPDATE public.correlated_pairs SET attempts = attempts + 1, claimed_at = NOW()
+    WHERE consumer = %(consumer)s AND status = 'PENDING' AND attempts < %(max_attempts)s
+      AND claimed_at < NOW() - %(lease)s::interval
+    RETURNING trade_id, catalyst_id, cluster_id, asset
+)
+SELECT d.trade_id, d.catalyst_id, d.cluster_id, t.trader_id, d.asset, t.raw_data, c.raw_data
+FROM due d JOIN public.recent_trades t ON t.id = d.trade_id JOIN public.recent_catalysts c ON c.id = d.catalyst_id
+ORDER BY d.trade_id, d.catalyst_id
+"""
+
+
+def _pair_rows(rows) -> List[Dict[str, Any]]:
+    return [{"trade_id": row[0], "catalyst_id": row[1], "cluster_id": row[2], "trader_id": row[3], "asset": row[4],
+             "trade": row[5], "catalyst": row[6]} for row in rows]
+
+
+def fetch_new_pairs(consumer: str, window: str = CORRELATION_WINDOW, track: bool = False) -> List[Dict[str, Any]]:
+    """Returns the trade/catalyst pairs this consumer has not emitted yet and advances its mark.
+
+    With track=True the pairs stay PENDING until finish_pairs(), and pending pairs that are due for
+    a retry are returned as well. Concurrent runs of the same consumer are serialised on its watermark row.
+    """
+    with cursor() as cur:
+        cur.execute("INSERT INTO public.correlation_watermarks (consumer) VALUES (%s) ON CONFLICT (consumer) DO NOTHING", (consumer,))
+        # Fix this run's snapshot first so rows committed mid-run are left for the next run.
+        cur.execute("SELECT COALESCE(last_snapshot, %s::pg_snapshot)::text, pg_current_snapshot()::text "
+                    "FROM public.correlation_watermarks WHERE consumer = %s FOR UPDATE", (EMPTY_SNAPSHOT, consumer))
+        since, upto = cur.fetchone()
+
+        retries = []
+        if track:
+            cur.execute(
+                "UPDATE public.correlated_pairs SET status = 'FAILED' WHERE consumer = %s AND status = 'PENDING' "
+                "AND attempts >= %s AND claimed_at < NOW() - %s::interval", (consumer, MAX_ATTEMPTS, PENDING_LEASE))
+            cur.execute(RETRY_PAIRS_SQL, {"consumer": consumer, "max_attempts": MAX_ATTEMPTS, "lease": PENDING_LEASE})
+            retries = _pair_rows(cur.fetchall())
+
+        cur.execute(NEW_PAIRS_SQL, {"consumer": consumer, "window": window, "since": since, "upto": upto,
+                                    "status": "PENDING" if track else "DONE", "attempts": 1 if track else 0})
+        pairs = _pair_rows(cur.fetchall())
+        cur.execute("UPDATE public.correlation_watermarks SET last_snapshot = %s::pg_snapshot, updated_at = NOW() WHERE consumer = %s",
+                    (upto, consumer))
+    print(f"INFO: [Correlate] '{consumer}' advanced to snapshot {upto}, {len(pairs)} new pair(s), {len(retries)} retried.")
+    return retries + pairs
+
+
+def finish_pairs(consumer: str, done: Iterable[Tuple[int, int]], failed: Iterable[Tuple[int, int]] = ()) -> None:
+    """Marks tracked (trade_id, catalyst_id) pairs as analysed; failed ones are retried on the next run."""
+    done, failed = list(done), list(failed)
+    with cursor() as cur:
+        if done:
+            cur.execute("UPDATE public.correlated_pairs SET status = 'DONE' WHERE consumer = %s AND (trade_id, catalyst_id) IN "
+                        "(SELECT * FROM unnest(%s::bigint[], %s::bigint[]))", (consumer, [t for t, _ in done], [c for _, c in done]))
+        if failed:
+            cur.execute(
+                "UPDATE public.correlated_pairs SET status = CASE WHEN attempts >= %s THEN 'FAILED' ELSE 'PENDING' END, "
+                "claimed_at = NOW() - %s::interval WHERE consumer = %s AND (trade_id, catalyst_id) IN "
+                "(SELECT * FROM unnest(%s::bigint[], %s::bigint[]))",
+                (MAX_ATTEMPTS, PENDING_LEASE, consumer, [t for t, _ in failed], [c for _, c in failed]))
+    if failed:
+        print(f"WARN: [Correlate] '{consumer}': {len(failed)} pair(s) failed analysis and will be retried.")
+
+
+class SlidingWindowCorrelator:
+    """In-memory per-asset index of the trades and catalysts inside the correlation window.
+
+    Produces the same (trade, catalyst) pairs as NEW_PAIRS_SQL: a pair is emitted once, when
+    the later of its two rows is added, if the other row was ingested within the window.
+    """
+
+    def __init__(self, window: timedelta = timedelta(minutes=5)):
+        self.window = window
+        self.trades: Dict[str, deque] = defaultdict(deque)     # asset -> (ingested_at, id, raw_data)
+        self.catalysts: Dict[str, deque] = defaultdict(deque)  # asset tag -> (ingested_at, id, raw_data, cluster_id)
+        self.seen_trades: Dict[int, datetime] = {}
+        self.seen_catalysts: Dict[int, datetime] = {}
+        self.latest: Optional[datetime] = None
+
+    def add_trade(self, trade_id: int, ingested_at: datetime, asset: str, raw_data: Any, emit: bool = True) -> List[Dict[str, Any]]:
+        if trade_id in self.seen_trades:
+            return []
+        self.seen_trades[trade_id] = ingested_at
+        self._advance(ingested_at)
+        pairs = []
+        if emit:
+            bucket = self._evict(self.catalysts.get(asset))
+            pairs = [
+                {"trade_id": trade_id, "catalyst_id": c_id, "cluster_id": c_cluster, "asset": asset, "trade": raw_data, "catalyst": c_raw}
+                for c_at, c_id, c_raw, c_cluster in bucket if abs(c_at - ingested_at) < self.window
+            ]
+        self.trades[asset].append((ingested_at, trade_id, raw_data))
+        return pairs
+
+    def add_catalyst(self, catalyst_id: int, ingested_at: datetime, asset_tags: List[str], raw_data: Any, emit: bool = True,
+                     cluster_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        if catalyst_id in self.seen_catalysts:
+            return []
+        cluster_id = cluster_id if cluster_id is not None else -catalyst_id  # Same fallback as NEW_PAIRS_SQL
+        self.seen_catalysts[catalyst_id] = ingested_at
+        self._advance(ingested_at)
+        pairs = []
+        for tag in dict.fromkeys(asset_tags or []):
+            if emit:
+                bucket = self._evict(self.trades.get(tag))
+                pairs.extend(
+                    {"trade_id": t_id, "catalyst_id": catalyst_id, "cluster_id": cluster_id, "asset": tag, "trade": t_raw, "catalyst": raw_data}
+                    for t_at, t_id, t_raw in bucket if abs(t_at - ingested_at) < self.window
+                )
+            self.catalysts[tag].append((ingested_at, catalyst_id, raw_data, cluster_id))
+        return pairs
+
+    def sweep(self) -> None:
+        """Drops everything that fell out of the window, including empty buckets and seen ids."""
+        if self.latest is None:
+            return
+        cutoff = self.latest - self.window
+        for index in (self.trades, self.catalysts):
+            for key in list(index):
+                if not self._evict(index[key]):
+                    del index[key]
+        for seen in (self.seen_trades, self.seen_catalysts):
+            for row_id in [i for i, at in seen.items() if at <= cutoff]:
+                del seen[row_id]
+
+    def _advance(self, ingested_at: datetime) -> None:
+        if self.latest is None or ingested_at > self.latest:
+            self.latest = ingested_at
+
+    def _evict(self, bucket: Optional[deque]) -> deque:
+        # Rows arrive almost in ingested_at order, so old entries collect at the left end.
+        if bucket is None:
+            return deque()
+        cutoff = self.latest - self.window
+        while bucket and bucket[0][0] <= cutoff:
+            bucket.popleft()
+        return bucket
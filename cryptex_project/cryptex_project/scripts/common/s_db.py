@@ -0,0 +1,188 @@
+# File: s_db.py
+# Shared, pooled Postgres access for every Cryptex script.
+# Import it relatively from a script, e.g. `from .common.s_db import connection`.
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+# --- CONFIG: Read from the environment, defaults match docker-compose.yml ---
+DB_CONFIG = {
+    "host": os.environ.get("CRYPTEX_DB_HOST", "postgres"),
+    "port": int(os.environ.get("CRYPTEX_DB_PORT", "5432")),
+    "dbname": os.environ.get("CRYPTEX_DB_NAME", "windmill"),
+    "user": os.environ.get("CRYPTEX_DB_USER", "windmill"),
+    "password": os.environ.get("WMILL_SECRET_CRYPTEX_DB_PASSWORD", os.environ.get("CRYPTEX_DB_PASSWORD", "windmill")),
+    "connect_timeout": int(os.environ.get("CRYPTEX_DB_CONNECT_TIMEOUT", "5")),
+    "application_name": os.environ.get("CRYPTEX_DB_APP_NAME", "cryptex"),
+}
+POOL_MIN = int(os.environ.get("CRYPTEX_DB_POOL_MIN", "1"))
+POOL_MAX = int(os.environ.get("CRYPTEX_DB_POOL_MAX", "5"))
+# Connections idle for longer than this are pinged before being handed out.
+HEALTH_CHECK_AFTER_S = float(os.environ.get("CRYPTEX_DB_HEALTH_CHECK_AFTER_S", "30"))
+CONNECT_RETRIES = int(os.environ.get("CRYPTEX_DB_CONNECT_RETRIES", "3"))
+# ------------------------------------------------------------------------------------
+
+# Hot statements, prepared once per connection and then run with EXECUTE.
+# Parameters use Postgres' positional $n syntax; the value is (sql, param_count).
+STATEMENTS: Dict[str, tuple] = {
+    "select_active_traders": (
+        "SELECT identifier, exchange, description FROM public.monitored_traders WHERE is_active = TRUE ORDER BY id", 0),
+    "select_traders_version": (
+        "SELECT version FROM public.monitored_traders_version", 0),
+    "select_open_positions": (
+        "SELECT id, asset, direction, entry_price, trade_size_usd FROM public.trading_signals WHERE trade_status = 'OPEN'", 0),
+}
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers its prepared statements and last use."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.last_used = time.monotonic()
+
+
+_pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(POOL_MAX)
+_stats = {
+    "acquired": 0,
+    "wait_time_total_s": 0.0,
+    "wait_time_max_s": 0.0,
+    "health_checks": 0,
+    "reconnects": 0,
+    "prepared": 0,
+}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, value=1) -> None:
+    with _stats_lock:
+        _stats[key] += value
+
+
+def get_pool() -> psycopg2.pool.ThreadedConnectionPool:
+    """Creates the process-wide pool on first use, retrying while Postgres starts up."""
+    global _pool
+    if _pool is not None:
+        return _pool
+    with _pool_lock:
+        if _pool is None:
+            for attempt in range(1, CONNECT_RETRIES + 1):
+                try:
+                    _pool = psycopg2.pool.ThreadedConnectionPool(
+                        POOL_MIN, POOL_MAX, connection_factory=PooledConnection, **DB_CONFIG)
+                    break
+                except psycopg2.OperationalError as e:
+                    if attempt == CONNECT_RETRIES:
+                        raise
+                    print(f"WARN: [DB] Could not connect (attempt {attempt}/{CONNECT_RETRIES}). Error: {e}")
+                    time.sleep(0.5 * 2 ** attempt)
+    return _pool
+
+
+def _is_healthy(conn: PooledConnection) -> bool:
+    if conn.closed:
+        return False
+    if time.monotonic() - conn.last_used < HEALTH_CHECK_AFTER_S:
+        return True
+    _count("health_checks")
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _acquire() -> PooledConnection:
+    pool = get_pool()
+    for _ in range(CONNECT_RETRIES):
+        conn = pool.getconn()
+        if _is_healthy(conn):
+            return conn
+        print("WARN: [DB] Discarding broken pooled connection, reconnecting...")
+        _count("reconnects")
+        pool.putconn(conn, close=True)
+    return pool.getconn()
+
+
+@contextmanager
+def connection() -> Iterator[PooledConnection]:
+    """Borrows a pooled connection; commits on success, rolls back on error."""
+    started = time.monotonic()
+    _slots.acquire()
+    try:
+        conn = _acquire()
+    except Exception:
+        _slots.release()
+        raise
+    waited = time.monotonic() - started
+    with _stats_lock:
+        _stats["acquired"] += 1
+        _stats["wait_time_total_s"] += waited
+        _stats["wait_time_max_s"] = max(_stats["wait_time_max_s"], waited)
+
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        broken = conn.closed != 0
+        if not broken:
+            conn.rollback()
+        raise
+    finally:
+        conn.last_used = time.monotonic()
+        get_pool().putconn(conn, close=broken)
+        _slots.release()
+
+
+@contextmanager
+def cursor() -> Iterator[psycopg2.extensions.cursor]:
+    """Shortcut for a cursor on a pooled connection inside one transaction."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            yield cur
+
+
+def execute_prepared(cur, name: str, params: Sequence[Any] = ()) -> None:
+    """Runs a statement from STATEMENTS, preparing it on this connection on first use."""
+    sql, param_count = STATEMENTS[name]
+    if len(params) != param_count:
+        raise ValueError(f"Statement '{name}' takes {param_count} parameters, got {len(params)}.")
+    conn = cur.connection
+    if name not in conn.prepared:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        conn.prepared.add(name)
+        _count("prepared")
+    if param_count:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * param_count)})", tuple(params))
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Returns a snapshot of the pool counters, including wait time."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["avg_wait_time_s"] = stats["wait_time_total_s"] / stats["acquired"] if stats["acquired"] else 0.0
+    return stats
+
+
+def close_pool() -> None:
+    """Closes every pooled connection (e.g. at the end of a long-running job)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
@@ -0,0 +1,188 @@
+# File: s_dex_data.py
+# Risk-data layer in front of the DexScreener token API, shared by the risk analyzers.
+# - Main-pair summaries are cached (Redis, else in-process) for DEX_CACHE_TTL_S; tokens with no
+#   pairs are cached as misses for DEX_NEGATIVE_TTL_S so unknown tokens are not re-queried.
+# - Lookups of a token already in flight wait for that request instead of issuing another.
+# - Uncached tokens go out in batches of up to DEX_BATCH_SIZE comma-separated addresses,
+#   under a token-bucket rate limit, with timeouts and retries.
+# CRYPTEX_DEXSCREENER_URL can point at a local stub server (see tests/test_dex_data.py).
+
+import asyncio
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import requests
+
+from .s_async_calls import AsyncTokenBucket, call_with_retry
+from .s_llm_cache import DictBackend, RedisBackend, REDIS_URL
+
+# --- CONFIG ---
+DEXSCREENER_URL = os.environ.get("CRYPTEX_DEXSCREENER_URL", "https://api.dexscreener.com/latest/dex/tokens/")
+DEXSCREENER_SEARCH_URL = os.environ.get("CRYPTEX_DEXSCREENER_SEARCH_URL", "https://api.dexscreener.com/latest/dex/search")
+DEX_CACHE_TTL_S = int(os.environ.get("CRYPTEX_DEX_CACHE_TTL_S", "300"))
+DEX_NEGATIVE_TTL_S = int(os.environ.get("CRYPTEX_DEX_NEGATIVE_TTL_S", "900"))
+DEX_BATCH_SIZE = int(os.environ.get("CRYPTEX_DEX_BATCH_SIZE", "30"))  # DexScreener's per-request address limit
+DEX_RATE_LIMIT_RPS = float(os.environ.get("CRYPTEX_RATE_LIMIT_DEXSCREENER_RPS", "4"))  # Public limit is 300/min
+DEX_TIMEOUT_S = float(os.environ.get("CRYPTEX_DEX_TIMEOUT_S", "15"))
+DEX_CACHE_MAX_ENTRIES = int(os.environ.get("CRYPTEX_DEX_CACHE_MAX_ENTRIES", "50000"))
+KEY_PREFIX = "cryptex:dex:"
+MISS = "null"  # Cached value for a token DexScreener has no pairs for
+# --------------
+
+_backend = None
+_stats = {"hits": 0, "negative_hits": 0, "coalesced": 0, "fetched": 0, "requests": 0, "errors": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, value: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += value
+
+
+def set_backend(backend) -> None:
+    """Replaces the cache backend (e.g. s_llm_cache.DictBackend() in tests)."""
+    global _backend
+    _backend = backend
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        try:
+            _backend = RedisBackend(REDIS_URL, DEX_CACHE_MAX_ENTRIES, index_key=KEY_PREFIX + "index")
+        except Exception as e:
+            print(f"WARN: [DexData] Redis unavailable, using in-process cache. Error: {e}")
+            _backend = DictBackend(DEX_CACHE_MAX_ENTRIES)
+    return _backend
+
+
+def _token_key(address: str) -> str:
+    # EVM addresses are case-insensitive (checksummed or not); Solana mints are not, but never collide by case.
+    return address.lower()
+
+
+def summarize_pairs(pairs: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Keeps only what the analyzers use from the most liquid pair."""
+    if not pairs:
+        return None
+    main_pair = max(pairs, key=lambda p: float((p.get('liquidity') or {}).get('usd') or 0))
+    return {
+        "pair_address": main_pair.get("pairAddress"),
+        "chain_id": main_pair.get("chainId"),
+        "dex_id": main_pair.get("dexId"),
+        "liquidity_usd": float((main_pair.get('liquidity') or {}).get('usd') or 0),
+        "price_usd": float(main_pair["priceUsd"]) if main_pair.get("priceUsd") else None,
+        "pair_created_at_ms": main_pair.get("pairCreatedAt") or 0,
+        "pair_count": len(pairs),
+        "base_symbol": (main_pair.get("baseToken") or {}).get("symbol"),
+        "base_address": (main_pair.get("baseToken") or {}).get("address"),
+    }
+
+
+class DexScreenerClient:
+    """One per event loop: owns the HTTP session, the rate limiter and the in-flight lookups."""
+
+    def __init__(self, base_url: str = DEXSCREENER_URL, rate_limit_rps: float = DEX_RATE_LIMIT_RPS,
+                 batch_size: int = DEX_BATCH_SIZE, timeout_s: float = DEX_TIMEOUT_S, search_url: str = DEXSCREENER_SEARCH_URL):
+        self.base_url = base_url
+        self.search_url = search_url
+        self.batch_size = batch_size
+        self.timeout_s = timeout_s
+        self.limiter = AsyncTokenBucket(rate_limit_rps)
+        self.session = requests.Session()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _get_batch(self, addresses: List[str]) -> List[Dict[str, Any]]:
+        _count("requests")
+        res = self.session.get(self.base_url + ",".join(addresses), timeout=self.timeout_s)
+        res.raise_for_status()
+        return res.json().get('pairs') or []
+
+    async def _fetch_batch(self, keys: List[str], addresses: List[str]) -> None:
+        try:
+            pairs = await call_with_retry(lambda: asyncio.to_thread(self._get_batch, addresses),
+                                          label=f"DexScreener batch of {len(addresses)}", limiter=self.limiter,
+                                          timeout_s=self.timeout_s + 5)
+        except Exception as e:
+            _count("errors")
+            for key in keys:
+                # Errors are not cached; waiting callers see the exception.
+                self._inflight.pop(key).set_exception(e)
+            return
+        by_token: Dict[str, List[Dict[str, Any]]] = {key: [] for key in keys}
+        # A pair counts for every requested token on either side, as with a single-address query.
+        for pair in pairs:
+            for side in ("baseToken", "quoteToken"):
+                key = _token_key((pair.get(side) or {}).get("address") or "")
+                if key in by_token:
+                    by_token[key].append(pair)
+        backend = get_backend()
+        for key in keys:
+            summary = summarize_pairs(by_token[key])
+            try:
+                backend.set(KEY_PREFIX + key, json.dumps(summary), DEX_CACHE_TTL_S if summary else DEX_NEGATIVE_TTL_S)
+            except Exception as e:
+                print(f"WARN: [DexData] Could not cache {key}. Error: {e}")
+            _count("fetched")
+            self._inflight.pop(key).set_result(summary)
+
+    def _get_search(self, query: str) -> List[Dict[str, Any]]:
+        _count("requests")
+        res = self.session.get(self.search_url, params={"q": query}, timeout=self.timeout_s)
+        res.raise_for_status()
+        return res.json().get('pairs') or []
+
+    async def search_pairs(self, query: str) -> List[Dict[str, Any]]:
+        """Raw pairs matching a free-text query (symbol or name); not cached, used by the index refresh."""
+        return await call_with_retry(lambda: asyncio.to_thread(self._get_search, query),
+                                     label=f"DexScreener search {query}", limiter=self.limiter, timeout_s=self.timeout_s + 5)
+
+    async def get_tokens(self, addresses: Sequence[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Main-pair summary per address (None when DexScreener lists no pair for it).
+
+        Raises if a needed batch request fails after retries.
+        """
+        results: Dict[str, Any] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        to_fetch: Dict[str, str] = {}
+        backend = get_backend()
+        for address in dict.fromkeys(a for a in addresses if a):
+            key = _token_key(address)
+            if key in waiting or key in to_fetch:
+                continue
+            try:
+                cached = backend.get(KEY_PREFIX + key)
+            except Exception as e:
+                print(f"WARN: [DexData] Cache lookup failed for {key}. Error: {e}")
+                cached = None
+            if cached is not None:
+                _count("negative_hits" if cached == MISS else "hits")
+                results[key] = json.loads(cached)
+            elif key in self._inflight:
+                _count("coalesced")
+                waiting[key] = self._inflight[key]
+            else:
+                to_fetch[key] = address
+                waiting[key] = self._inflight[key] = asyncio.get_running_loop().create_future()
+
+        keys = list(to_fetch)
+        batches = [keys[i:i + self.batch_size] for i in range(0, len(keys), self.batch_size)]
+        await asyncio.gather(*(self._fetch_batch(batch, [to_fetch[k] for k in batch]) for batch in batches))
+        for key, future in waiting.items():
+            results[key] = await future
+        return {address: results[_token_key(address)] for address in addresses if address}
+
+
+def lookup_tokens(addresses: Sequence[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Synchronous entry point for scripts."""
+    async def run():
+        return await DexScreenerClient().get_tokens(addresses)
+    return asyncio.run(run())
+
+
+def dex_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
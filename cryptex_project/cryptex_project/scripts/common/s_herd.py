@@ -0,0 +1,115 @@
+# File: s_herd.py
+# Rolling herd-behaviour aggregates per (asset, direction).
+# Every ingest batch upserts per-minute, per-trader buckets into herd_buckets (in the same
+# transaction as the trade insert, see s_ingest.py) and then recomputes herd_stats for the keys it
+# touched: distinct traders, trade count and notional over 5m / 1h / 24h. Reading the herd index
+# is then a primary-key lookup; a row older than HERD_STALE_AFTER_S is recomputed on read so the
+# windows keep sliding when no trades arrive.
+
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# --- CONFIG ---
+HERD_WINDOWS = {"5m": "5 minutes", "1h": "1 hour", "24h": "24 hours"}
+HERD_INDEX_WINDOW = os.environ.get("CRYPTEX_HERD_INDEX_WINDOW", "1h")
+HERD_STALE_AFTER_S = int(os.environ.get("CRYPTEX_HERD_STALE_AFTER_S", "60"))
+# Ingest recomputes a key's window totals at most this often; buckets are always updated.
+HERD_REFRESH_MIN_INTERVAL_S = int(os.environ.get("CRYPTEX_HERD_REFRESH_MIN_INTERVAL_S", "5"))
+# --------------
+
+DIRECTIONS = ("LONG", "SHORT")
+
+# Rows are (asset, direction, trader_id, notional_usd, seen_at); seen_at NULL means now.
+HERD_UPSERT_SQL = """
+INSERT INTO public.herd_buckets (asset, direction, bucket_start, trader_id, trades, notional_usd)
+SELECT asset, direction, date_trunc('minute', COALESCE(seen_at, NOW())), trader_id, COUNT(*), SUM(notional_usd)
+FROM unnest(%s::text[], %s::text[], %s::text[], %s::float8[], %s::timestamptz[]) AS b (asset, direction, trader_id, notional_usd, seen_at)
+GROUP BY asset, direction, date_trunc('minute', COALESCE(seen_at, NOW())), trader_id
+ON CONFLICT (asset, direction, bucket_start, trader_id) DO UPDATE SET
+    trades = herd_buckets.trades + EXCLUDED.trades, notional_usd = herd_buckets.notional_usd + EXCLUDED.notional_usd
+"""
+
+_window_columns = ",\n    ".join(
+    f"COUNT(DISTINCT trader_id) FILTER (WHERE bucket_start > NOW() - INTERVAL '{interval}') AS traders_{name},\n"
+    f"    COALESCE(SUM(trades) FILTER (WHERE bucket_start > NOW() - INTERVAL '{interval}'), 0) AS trades_{name},\n"
+    f"    COALESCE(SUM(notional_usd) FILTER (WHERE bucket_start > NOW() - INTERVAL '{interval}'), 0) AS notional_{name}"
+    for name, interval in HERD_WINDOWS.items()
+)
+_stat_columns = [f"{kind}_{name}" for name in HERD_WINDOWS for kind in ("traders", "trades", "notional")]
+
+# Keys with no bucket left in the 24h window are written as zeros, not left stale.
+REFRESH_STATS_SQL = f"""
+INSERT INTO public.herd_stats (asset, direction, {", ".join(_stat_columns)}, updated_at)
+SELECT k.asset, k.direction, {", ".join(f"COALESCE(s.{c}, 0)" for c in _stat_columns)}, NOW()
+FROM unnest(%s::text[], %s::text[]) AS k(asset, direction)
+LEFT JOIN public.herd_stats h ON h.asset = k.asset AND h.direction = k.direction
+LEFT JOIN (
+    SELECT asset, direction,
+    {_window_columns}
+    FROM public.herd_buckets
+    WHERE (asset, direction) IN (SELECT * FROM unnest(%s::text[], %s::text[])) AND bucket_start > NOW() - INTERVAL '{HERD_WINDOWS["24h"]}'
+    GROUP BY asset, direction
+) s ON s.asset = k.asset AND s.direction = k.direction
+WHERE h.updated_at IS NULL OR h.updated_at <= NOW() - make_interval(secs => %s)
+ON CONFLICT (asset, direction) DO UPDATE SET
+    {", ".join(f"{c} = EXCLUDED.{c}" for c in _stat_columns)}, updated_at = EXCLUDED.updated_at
+"""
+
+
+def position_side(raw_data: Dict[str, Any]) -> Tuple[Optional[str], float]:
+    """(direction, notional USD) of a leaderboard position; the sign of `amount` is the side."""
+    try:
+        amount = float(raw_data.get("amount") or 0)
+        price = float(raw_data.get("markPrice") or raw_data.get("entryPrice") or 0)
+    except (TypeError, ValueError):
+        return None, 0.0
+    if amount == 0:
+        return None, 0.0
+    return ("LONG" if amount > 0 else "SHORT"), abs(amount) * price
+
+
+def record_herd_trades(cur, rows: List[tuple]) -> None:
+    """Adds (asset, direction, trader_id, notional_usd[, seen_at]) rows to the buckets and refreshes their stats."""
+    if not rows:
+        return
+    # Column arrays rather than a VALUES list: one parameter per column keeps big batches cheap to send.
+    columns = list(zip(*(tuple(r) + (None,) * (5 - len(r)) for r in rows)))
+    cur.execute(HERD_UPSERT_SQL, [list(c) for c in columns])
+    refresh_herd_stats(cur, [r[0] for r in rows], min_age_s=HERD_REFRESH_MIN_INTERVAL_S)
+
+
+def refresh_herd_stats(cur, assets: Iterable[str], min_age_s: float = 0) -> None:
+    """Recomputes herd_stats for both directions of the given assets (skipping rows newer than min_age_s)."""
+    keys = [(asset, direction) for asset in dict.fromkeys(a for a in assets if a) for direction in DIRECTIONS]
+    if not keys:
+        return
+    asset_list, direction_list = [k[0] for k in keys], [k[1] for k in keys]
+    cur.execute(REFRESH_STATS_SQL, (asset_list, direction_list, asset_list, direction_list, min_age_s))
+
+
+def get_herd_stats(cur, asset: str) -> Dict[str, Dict[str, float]]:
+    """{direction: {traders_5m, trades_5m, notional_5m, ...}} for one asset; two-row PK lookup."""
+    query = f"SELECT direction, {', '.join(_stat_columns)}, EXTRACT(EPOCH FROM NOW() - updated_at) FROM public.herd_stats WHERE asset = %s"
+    cur.execute(query, (asset,))
+    rows = cur.fetchall()
+    if not rows or any(row[-1] > HERD_STALE_AFTER_S for row in rows):
+        refresh_herd_stats(cur, [asset])
+        cur.execute(query, (asset,))
+        rows = cur.fetchall()
+    return {row[0]: {c: float(v) for c, v in zip(_stat_columns, row[1:-1])} for row in rows}
+
+
+def herd_index(cur, asset: str, direction: Optional[str], window: str = HERD_INDEX_WINDOW) -> Dict[str, Any]:
+    """Share (0-100) of traders active on the asset in `window` who are on `direction`."""
+    stats = get_herd_stats(cur, asset)
+    side = (direction or "LONG").upper()
+    other = "SHORT" if side == "LONG" else "LONG"
+    same = stats.get(side, {}).get(f"traders_{window}", 0)
+    opposite = stats.get(other, {}).get(f"traders_{window}", 0)
+    return {
+        "herd_index": round(100 * same / (same + opposite)) if same + opposite else 0,
+        "traders_same_side": int(same), "traders_opposite_side": int(opposite),
+        "notional_same_side_usd": stats.get(side, {}).get(f"notional_{window}", 0.0),
+        "window": window,
+    }
+
@@ -0,0 +1,122 @@
+# File: s_ingest.py
+# Batched, idempotent ingestion into recent_trades / recent_catalysts.
+# Each row carries a content hash that is claimed in recent_ingest_hashes in the same
+# statement, so re-sent positions and already-seen articles are skipped by Postgres
+# instead of piling up as duplicates.
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from psycopg2.extras import execute_values
+
+from .s_catalyst_clusters import assign_clusters, save_fingerprints
+from .s_catalyst_types import classify_catalyst
+from .s_db import cursor
+from .s_herd import position_side, record_herd_trades
+
+# Fields of a leaderboard position that identify it; mark price / PnL move every
+# tick and must not make an otherwise unchanged position look new.
+POSITION_KEY_FIELDS = ("symbol", "entryPrice", "amount", "leverage")
+BATCH_PAGE_SIZE = 1000
+
+# The hash table has the unique key (the partitioned tables cannot); only rows whose
+# hash was newly claimed are inserted, once each even if repeated within the batch.
+TRADES_INSERT_SQL = """
+WITH batch (trader_id, asset, raw_data, content_hash) AS (VALUES %s),
+fresh AS (
+    INSERT INTO public.recent_ingest_hashes (content_hash) SELECT DISTINCT content_hash FROM batch
+    ON CONFLICT (content_hash) DO NOTHING RETURNING content_hash
+)
+INSERT INTO public.recent_trades (trader_id, asset, raw_data, content_hash)
+SELECT DISTINCT ON (b.content_hash) b.trader_id, b.asset, b.raw_data::jsonb, b.content_hash
+FROM batch b JOIN fresh f ON f.content_hash = b.content_hash
+RETURNING asset, trader_id, content_hash
+"""
+
+CATALYSTS_INSERT_SQL = """
+WITH batch (headline, source, asset_tags, raw_data, content_hash, cluster_id) AS (VALUES %s),
+fresh AS (
+    INSERT INTO public.recent_ingest_hashes (content_hash) SELECT DISTINCT content_hash FROM batch
+    ON CONFLICT (content_hash) DO NOTHING RETURNING content_hash
+)
+INSERT INTO public.recent_catalysts (headline, source, asset_tags, raw_data, content_hash, cluster_id)
+SELECT DISTINCT ON (b.content_hash) b.headline, b.source, b.asset_tags, b.raw_data::jsonb, b.content_hash, b.cluster_id
+FROM batch b JOIN fresh f ON f.content_hash = b.content_hash
+RETURNING asset_tags, content_hash
+"""
+
+
+def content_hash(*parts: Any) -> str:
+    """Stable SHA-256 over JSON-serialisable parts."""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def trade_hash(trader_id: str, asset: str, raw_data: Dict[str, Any],
+               key_fields: Optional[Sequence[str]] = POSITION_KEY_FIELDS) -> str:
+    identity = {k: raw_data.get(k) for k in key_fields} if key_fields else raw_data
+    return content_hash("trade", trader_id, asset, identity)
+
+
+def catalyst_hash(article: Dict[str, Any]) -> str:
+    if article.get("url"):
+        return content_hash("catalyst", article["url"])
+    return content_hash("catalyst", article.get("title"), (article.get("source") or {}).get("name"))
+
+
+def _unique_assets(rows: Iterable[Sequence[Any]]) -> List[str]:
+    # Keeps first-seen order so callers get a deterministic result.
+    return list(dict.fromkeys(asset for (asset,) in rows if asset))
+
+
+def ingest_trades(trades: List[Dict[str, Any]], key_fields: Optional[Sequence[str]] = POSITION_KEY_FIELDS) -> List[str]:
+    """Inserts trade events ({trader_id, asset, raw_data}) in one statement.
+
+    Returns the distinct assets of the rows that were actually new.
+    """
+    if not trades:
+        return []
+    values = [
+        (t["trader_id"], t["asset"], json.dumps(t["raw_data"]), trade_hash(t["trader_id"], t["asset"], t["raw_data"], key_fields))
+        for t in trades
+    ]
+    sides = {v[3]: position_side(t["raw_data"]) for v, t in zip(values, trades)}
+    with cursor() as cur:
+        inserted = execute_values(cur, TRADES_INSERT_SQL, values, page_size=BATCH_PAGE_SIZE, fetch=True)
+        # Herd aggregates move in the same transaction as the rows they count.
+        record_herd_trades(cur, [(asset, sides[h][0], trader_id, sides[h][1]) for asset, trader_id, h in inserted if asset and sides[h][0]])
+    print(f"INFO: [Ingest] {len(inserted)}/{len(values)} trade rows were new.")
+    return _unique_assets((asset,) for asset, _, _ in inserted)
+
+
+def with_catalyst_type(catalyst: Dict[str, Any]) -> Dict[str, Any]:
+    raw_data = catalyst["raw_data"]
+    if raw_data.get("catalyst_type"):
+        return raw_data
+    return {**raw_data, "catalyst_type": classify_catalyst(catalyst["headline"], raw_data.get("description"))}
+
+
+def ingest_catalysts(catalysts: List[Dict[str, Any]]) -> List[str]:
+    """Inserts news catalysts ({headline, source, asset_tags, raw_data}) in one statement.
+
+    Each row gets the cluster id of its near-duplicate story (see s_catalyst_clusters.py), and its
+    raw_data a catalyst_type (see s_catalyst_types.py) unless the caller set one.
+    Returns the distinct asset tags of the articles that were actually new.
+    """
+    if not catalysts:
+        return []
+    hashes = [catalyst_hash(c["raw_data"]) for c in catalysts]
+    with cursor() as cur:
+        cluster_ids, fingerprints = assign_clusters(cur, [(h, c["headline"], c["asset_tags"]) for h, c in zip(hashes, catalysts)])
+        values = [
+            (c["headline"], c["source"], list(c["asset_tags"]), json.dumps(with_catalyst_type(c)), h, cluster_id)
+            for c, h, cluster_id in zip(catalysts, hashes, cluster_ids)
+        ]
+        inserted = execute_values(cur, CATALYSTS_INSERT_SQL, values, template="(%s, %s, %s::text[], %s, %s, %s::bigint)",
+                                  page_size=BATCH_PAGE_SIZE, fetch=True)
+        new_hashes = {h for _, h in inserted}
+        save_fingerprints(cur, [fp for fp in fingerprints if fp.content_hash in new_hashes])
+    clusters = len({cluster_id for h, cluster_id in zip(hashes, cluster_ids) if h in new_hashes})
+    print(f"INFO: [Ingest] {len(inserted)}/{len(values)} catalyst rows were new ({clusters} distinct stories).")
+    return _unique_assets((tag,) for tags, _ in inserted for tag in (tags or []))
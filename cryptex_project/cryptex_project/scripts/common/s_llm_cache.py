@@ -0,0 +1,178 @@
+# File: s_llm_cache.py
+# Content-addressed cache in front of chat-completion calls.
+# Responses are keyed by a hash of model, messages and parameters and stored in the
+# Redis from docker-compose.yml, with a TTL and a cap on the number of entries.
+# Tests can swap in the in-process DictBackend with set_backend().
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# --- CONFIG ---
+REDIS_URL = os.environ.get("CRYPTEX_REDIS_URL", "redis://redis:6379/0")
+CACHE_TTL_S = int(os.environ.get("CRYPTEX_LLM_CACHE_TTL_S", str(24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.environ.get("CRYPTEX_LLM_CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_VALUE_BYTES = int(os.environ.get("CRYPTEX_LLM_CACHE_MAX_VALUE_BYTES", str(64 * 1024)))
+KEY_PREFIX = "cryptex:llm:"
+# --------------
+
+
+class DictBackend:
+    """In-process LRU backend with TTL; used by tests and when Redis is unreachable."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl_s: int) -> int:
+        """Stores a value and returns how many entries were evicted to make room."""
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl_s)
+            self._data.move_to_end(key)
+            evicted = 0
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+            return evicted
+
+
+class RedisBackend:
+    """Redis backend; a sorted set of expiry times caps the entry count (soonest to expire evicted first).
+
+    Scoring by expiry rather than write time lets callers with different TTLs share one index.
+    """
+
+    INDEX_KEY = KEY_PREFIX + "index"
+
+    def __init__(self, url: str = REDIS_URL, max_entries: int = CACHE_MAX_ENTRIES, index_key: str = INDEX_KEY):
+        import redis  # Only needed when the Redis backend is actually used
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self.client.ping()
+        self.max_entries = max_entries
+        self.index_key = index_key  # Other caches (e.g. s_dex_data) keep their own entry cap
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key: str, value: str, ttl_s: int) -> int:
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.set(key, value, ex=ttl_s)
+        pipe.zadd(self.index_key, {key: now + ttl_s})
+        pipe.zremrangebyscore(self.index_key, 0, now)  # Entries Redis already expired
+        pipe.zcard(self.index_key)
+        size = pipe.execute()[-1]
+        if size <= self.max_entries:
+            return 0
+        evicted = [k for k, _ in self.client.zpopmin(self.index_key, size - self.max_entries)]
+        if evicted:
+            self.client.delete(*evicted)
+        return len(evicted)
+
+
+_backend = None
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, value: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += value
+
+
+def set_backend(backend) -> None:
+    """Replaces the cache backend (e.g. DictBackend() in tests)."""
+    global _backend
+    _backend = backend
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        try:
+            _backend = RedisBackend()
+        except Exception as e:
+            print(f"WARN: [LLM-Cache] Redis unavailable, using in-process cache. Error: {e}")
+            _backend = DictBackend()
+    return _backend
+
+
+def cache_key(model: str, messages: Any, params: Dict[str, Any]) -> str:
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True, default=str, separators=(",", ":"))
+    return KEY_PREFIX + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _lookup(key: str) -> Optional[str]:
+    try:
+        cached = get_backend().get(key)
+    except Exception as e:
+        print(f"WARN: [LLM-Cache] Lookup failed, calling the model. Error: {e}")
+        _count("errors")
+        cached = None
+    _count("hits" if cached is not None else "misses")
+    return cached
+
+
+def _store(key: str, content: Optional[str], ttl_s: int) -> None:
+    if content is None or len(content.encode("utf-8")) > CACHE_MAX_VALUE_BYTES:
+        return
+    try:
+        _count("evictions", get_backend().set(key, content, ttl_s))
+        _count("stores")
+    except Exception as e:
+        print(f"WARN: [LLM-Cache] Could not store response. Error: {e}")
+        _count("errors")
+
+
+def cached_chat_completion(client, model: str, messages: Any, ttl_s: int = CACHE_TTL_S, **params) -> str:
+    """Returns the message content of a chat completion, calling the API only on a cache miss."""
+    key = cache_key(model, messages, params)
+    cached = _lookup(key)
+    if cached is not None:
+        return cached
+    content = client.chat.completions.create(model=model, messages=messages, **params).choices[0].message.content
+    _store(key, content, ttl_s)
+    return content
+
+
+async def acached_chat_completion(client, model: str, messages: Any, ttl_s: int = CACHE_TTL_S, **params) -> str:
+    """Same as cached_chat_completion for an async client (e.g. openai.AsyncOpenAI).
+
+    Backend calls run in a worker thread so a slow Redis round-trip does not stall other requests.
+    """
+    key = cache_key(model, messages, params)
+    cached = await asyncio.to_thread(_lookup, key)
+    if cached is not None:
+        return cached
+    response = await client.chat.completions.create(model=model, messages=messages, **params)
+    content = response.choices[0].message.content
+    await asyncio.to_thread(_store, key, content, ttl_s)
+    return content
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Returns hit/miss counters for this process."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
@@ -0,0 +1,299 @@
+# File: s_news_sources.py
+# Incremental news fetching for the news monitor.
+# Each source (NewsAPI, plus the RSS/Atom feeds in CRYPTEX_NEWS_FEEDS) keeps a cursor in
+# news_source_cursors: the newest publishedAt it has delivered. NewsAPI is paged from the newest
+# article back to that cursor; when NEWSAPI_MAX_PAGES runs out first, the range still owed is kept as
+# a backfill window that later runs page through. Feeds are read whole and cut at the cursor. All
+# sources are fetched concurrently over one aiohttp session. Articles whose URL was already seen are dropped before
+# tagging: a Bloom filter of catalyst hashes (kept in Redis, else in-process, rebuilt from
+# recent_catalysts when missing or full) answers most lookups in memory, and only its
+# "maybe seen" hits are confirmed against recent_ingest_hashes.
+
+import asyncio
+import os
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .s_async_calls import AsyncTokenBucket, bounded_gather, call_with_retry
+from .s_bloom import BloomFilter
+from .s_db import cursor
+from .s_ingest import catalyst_hash, ingest_catalysts
+from .s_llm_cache import DictBackend, RedisBackend, REDIS_URL
+
+# --- CONFIG ---
+NEWSAPI_URL = os.environ.get("CRYPTEX_NEWSAPI_URL", "https://newsapi.org/v2/everything")
+NEWSAPI_QUERY = os.environ.get("CRYPTEX_NEWSAPI_QUERY", "crypto")
+NEWSAPI_PAGE_SIZE = 100  # NewsAPI maximum
+NEWSAPI_MAX_PAGES = int(os.environ.get("CRYPTEX_NEWSAPI_MAX_PAGES", "5"))
+DEFAULT_FEEDS = "https://www.coindesk.com/arc/outboundfeeds/rss/,https://cointelegraph.com/rss"
+NEWS_FEEDS = [f.strip() for f in os.environ.get("CRYPTEX_NEWS_FEEDS", DEFAULT_FEEDS).split(",") if f.strip()]
+NEWS_RATE_LIMIT_RPS = float(os.environ.get("CRYPTEX_RATE_LIMIT_NEWS_RPS", "5"))
+NEWS_TIMEOUT_S = float(os.environ.get("CRYPTEX_NEWS_TIMEOUT_S", "15"))
+SEEN_FILTER_CAPACITY = int(os.environ.get("CRYPTEX_NEWS_SEEN_CAPACITY", "200000"))
+SEEN_FILTER_KEY = "cryptex:news:seen_filter"
+SEEN_FILTER_TTL_S = 7 * 24 * 3600
+# --------------
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+_backend = None
+_stats = {"fetched": 0, "requests": 0, "capped_pages": 0, "filter_negatives": 0, "filter_hits_confirmed": 0, "false_positives": 0}
+_stats_lock = threading.Lock()
+
+
+class SourceCursor(NamedTuple):
+    last_published_at: Optional[datetime]  # Newest publishedAt delivered
+    backfill_from: Optional[datetime] = None  # Older range a capped NewsAPI run could not page back through
+    backfill_to: Optional[datetime] = None
+
+
+def _count(key: str, value: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += value
+
+
+def news_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def set_backend(backend) -> None:
+    """Replaces the filter's cache backend (e.g. s_llm_cache.DictBackend() in tests)."""
+    global _backend
+    _backend = backend
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        try:
+            _backend = RedisBackend(REDIS_URL, 5, index_key="cryptex:news:index")
+        except Exception as e:
+            print(f"WARN: [News] Redis unavailable, using in-process cache. Error: {e}")
+            _backend = DictBackend(5)
+    return _backend
+
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    """ISO 8601 (NewsAPI, Atom) or RFC 822 (RSS) -> aware UTC datetime."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    return parsed.replace(tzinfo=parsed.tzinfo or timezone.utc).astimezone(timezone.utc)
+
+
+def parse_feed(xml_text: str, feed_url: str) -> List[Dict[str, Any]]:
+    """RSS 2.0 items or Atom entries as NewsAPI-shaped articles."""
+    root = ET.fromstring(xml_text)
+    channel_title = root.findtext("channel/title") or root.findtext(f"{ATOM}title") or feed_url
+    articles = []
+    for item in root.iter("item"):
+        articles.append({"title": item.findtext("title"), "description": item.findtext("description"),
+                         "url": (item.findtext("link") or "").strip() or None, "publishedAt": item.findtext("pubDate"),
+                         "source": {"name": channel_title}})
+    for entry in root.iter(f"{ATOM}entry"):
+        link = entry.find(f"{ATOM}link[@rel='alternate']")
+        if link is None:  # Elements without children are falsy, so no `or` here
+            link = entry.find(f"{ATOM}link")
+        articles.append({"title": entry.findtext(f"{ATOM}title"), "description": entry.findtext(f"{ATOM}summary"),
+                         "url": link.get("href") if link is not None else None,
+                         "publishedAt": entry.findtext(f"{ATOM}published") or entry.findtext(f"{ATOM}updated"),
+                         "source": {"name": channel_title}})
+    for article in articles:
+        published = parse_time(article["publishedAt"])
+        article["publishedAt"] = published.isoformat() if published else None
+    return [a for a in articles if a["url"] and a["title"]]
+
+
+class NewsClient:
+    """One per run: owns the pooled HTTP session and the rate limiter."""
+
+    def __init__(self, newsapi_key: Optional[str], newsapi_url: str = NEWSAPI_URL, rate_limit_rps: float = NEWS_RATE_LIMIT_RPS,
+                 timeout_s: float = NEWS_TIMEOUT_S, max_pages: int = NEWSAPI_MAX_PAGES):
+        self.newsapi_key = newsapi_key
+        self.newsapi_url = newsapi_url
+        self.limiter = AsyncTokenBucket(rate_limit_rps)
+        self.timeout_s = timeout_s
+        self.max_pages = max_pages
+        self.session = None
+
+    async def __aenter__(self) -> "NewsClient":
+        import aiohttp
+
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout_s))
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.session.close()
+
+    async def _get(self, url: str, params: Optional[Dict[str, Any]] = None, as_json: bool = True) -> Any:
+        async def get():
+            _count("requests")
+            # The key goes in a header so it never shows up in logged URLs.
+            headers = {"X-Api-Key": self.newsapi_key} if as_json and self.newsapi_key else {}
+            async with self.session.get(url, params=params, headers=headers) as res:
+                res.raise_for_status()
+                return await (res.json(content_type=None) if as_json else res.text())
+        return await call_with_retry(get, label=f"News {url[:40]}", limiter=self.limiter, timeout_s=self.timeout_s + 5)
+
+    async def fetch_newsapi(self, since: Optional[datetime], until: Optional[datetime] = None
+                            ) -> Tuple[List[Dict[str, Any]], Optional[datetime]]:
+        """Newest-first pages between `since` and `until`, at most NEWSAPI_MAX_PAGES of them.
+
+        Returns the articles and, when the page cap cut the run short, the oldest publishedAt fetched.
+        """
+        params = {"q": NEWSAPI_QUERY, "language": "en", "sortBy": "publishedAt", "pageSize": NEWSAPI_PAGE_SIZE}
+        # Both bounds are inclusive; the seen filter drops the overlap.
+        if since:
+            params["from"] = since.strftime("%Y-%m-%dT%H:%M:%S")
+        if until:
+            params["to"] = until.strftime("%Y-%m-%dT%H:%M:%S")
+        articles: List[Dict[str, Any]] = []
+        for page in range(1, self.max_pages + 1):
+            body = await self._get(self.newsapi_url, {**params, "page": page})
+            batch = body.get("articles") or []
+            articles += batch
+            if len(batch) < NEWSAPI_PAGE_SIZE or len(articles) >= (body.get("totalResults") or 0):
+                return articles, None
+        _count("capped_pages")
+        oldest = min((t for t in (parse_time(a.get("publishedAt")) for a in articles) if t), default=None)
+        print(f"WARN: [News] NewsAPI still had articles after {self.max_pages} pages; articles before {oldest} are left for the next run.")
+        return articles, oldest
+
+    async def fetch_feed(self, feed_url: str, since: Optional[datetime]) -> List[Dict[str, Any]]:
+        articles = parse_feed(await self._get(feed_url, as_json=False), feed_url)
+        # Undated items are kept; the seen filter stops them from repeating.
+        return [a for a in articles if not since or not a["publishedAt"] or parse_time(a["publishedAt"]) >= since]
+
+
+def load_cursors(sources: Sequence[str]) -> Dict[str, SourceCursor]:
+    with cursor() as cur:
+        cur.execute("SELECT source, last_published_at, backfill_from, backfill_to FROM public.news_source_cursors WHERE source = ANY(%s)",
+                    (list(sources),))
+        return {row[0]: SourceCursor(*row[1:]) for row in cur.fetchall()}
+
+
+def save_cursors(cursors: Dict[str, SourceCursor]) -> None:
+    """Advances last_published_at (never backwards) and replaces the backfill window."""
+    if not cursors:
+        return
+    columns = list(zip(*cursors.values()))
+    with cursor() as cur:
+        cur.execute(
+            "INSERT INTO public.news_source_cursors (source, last_published_at, backfill_from, backfill_to) "
+            "SELECT * FROM unnest(%s::text[], %s::timestamptz[], %s::timestamptz[], %s::timestamptz[]) "
+            "ON CONFLICT (source) DO UPDATE SET last_published_at = GREATEST(news_source_cursors.last_published_at, EXCLUDED.last_published_at), "
+            "backfill_from = EXCLUDED.backfill_from, backfill_to = EXCLUDED.backfill_to, updated_at = NOW()",
+            (list(cursors), *[list(c) for c in columns]))
+
+
+def load_seen_filter() -> BloomFilter:
+    try:
+        cached = get_backend().get(SEEN_FILTER_KEY)
+        if cached is not None:
+            bloom = BloomFilter.loads(cached)
+            if not bloom.is_full:
+                return bloom
+    except Exception as e:
+        print(f"WARN: [News] Could not load the seen filter. Error: {e}")
+    # Missing or full: rebuild from the catalysts still retained.
+    bloom = BloomFilter(SEEN_FILTER_CAPACITY)
+    with cursor() as cur:
+        cur.execute("SELECT content_hash FROM public.recent_catalysts WHERE content_hash IS NOT NULL")
+        bloom.update(row[0] for row in cur.fetchall())
+    print(f"INFO: [News] Rebuilt the seen filter from {bloom.count} stored catalyst(s).")
+    return bloom
+
+
+def save_seen_filter(bloom: BloomFilter) -> None:
+    try:
+        get_backend().set(SEEN_FILTER_KEY, bloom.dumps(), SEEN_FILTER_TTL_S)
+    except Exception as e:
+        print(f"WARN: [News] Could not save the seen filter. Error: {e}")
+
+
+def drop_seen(articles: List[Dict[str, Any]], bloom: BloomFilter) -> List[Dict[str, Any]]:
+    """Articles whose URL is new, once each; filter hits are checked against the database in one query."""
+    unique = {catalyst_hash(a): a for a in articles}
+    maybe_seen = [h for h in unique if h in bloom]
+    _count("filter_negatives", len(unique) - len(maybe_seen))
+    seen = set()
+    if maybe_seen:
+        with cursor() as cur:
+            cur.execute("SELECT content_hash FROM public.recent_ingest_hashes WHERE content_hash = ANY(%s)", (maybe_seen,))
+            seen = {row[0] for row in cur.fetchall()}
+        _count("filter_hits_confirmed", len(seen))
+        _count("false_positives", len(maybe_seen) - len(seen))
+    return [a for h, a in unique.items() if h not in seen]
+
+
+async def _fetch_newsapi_source(client: "NewsClient", state: SourceCursor) -> Tuple[List[Dict[str, Any]], Optional[tuple]]:
+    """New articles since the cursor, plus one capped page run of the owed backfill window; returns the window still owed."""
+    articles, capped_at = await client.fetch_newsapi(state.last_published_at)
+    # No cursor yet means no history was promised, so a capped first run owes nothing.
+    owed = (state.last_published_at, capped_at) if capped_at and state.last_published_at else None
+    if state.backfill_to:
+        older, still_capped = await client.fetch_newsapi(state.backfill_from, state.backfill_to)
+        articles += older
+        if still_capped:
+            # One window is kept: merged, it also spans articles already delivered, which the seen filter drops.
+            owed = (state.backfill_from, max(still_capped, owed[1]) if owed else still_capped)
+    return articles, owed
+
+
+async def fetch_new_articles(newsapi_key: Optional[str], feeds: Sequence[str] = NEWS_FEEDS,
+                             newsapi_url: str = NEWSAPI_URL) -> Tuple[List[Dict[str, Any]], Dict[str, SourceCursor]]:
+    """(unseen articles from every source, new cursor per source); cursors are saved by the caller after ingest."""
+    sources = ([f"newsapi:{newsapi_url}"] if newsapi_key else []) + [f"feed:{url}" for url in feeds]
+    cursors = load_cursors(sources)
+    async with NewsClient(newsapi_key, newsapi_url) as client:
+        async def fetch(source: str) -> Tuple[List[Dict[str, Any]], Optional[tuple]]:
+            state = cursors.get(source) or SourceCursor(None)
+            if source.startswith("newsapi:"):
+                return await _fetch_newsapi_source(client, state)
+            return await client.fetch_feed(source[len("feed:"):], state.last_published_at), None
+        results = await bounded_gather(sources, fetch, concurrency=len(sources) or 1)
+
+    articles, new_cursors = [], {}
+    for source, result in zip(sources, results):
+        if result is None:
+            continue  # Failed source: its cursor stays put
+        batch, owed = result
+        _count("fetched", len(batch))
+        articles += batch
+        newest = max((t for t in (parse_time(a.get("publishedAt")) for a in batch) if t),
+                     default=(cursors.get(source) or SourceCursor(None)).last_published_at)
+        if newest:
+            new_cursors[source] = SourceCursor(newest, *(owed or (None, None)))
+    return articles, new_cursors
+
+
+def ingest_new_articles(newsapi_key: Optional[str], feeds: Sequence[str] = NEWS_FEEDS,
+                        newsapi_url: str = NEWSAPI_URL) -> Dict[str, Any]:
+    """One monitor run: fetch every source, drop seen URLs, tag and insert the rest, then advance the cursors."""
+    from .s_asset_tagger import get_tagger
+
+    articles, new_cursors = asyncio.run(fetch_new_articles(newsapi_key, feeds, newsapi_url))
+    bloom = load_seen_filter()
+    fresh = drop_seen(articles, bloom)
+    tagger = get_tagger()
+    # Tag with the assets named in the headline/description (symbols, names, aliases)
+    inserted_assets = ingest_catalysts([{"headline": a.get("title"), "source": (a.get("source") or {}).get("name"),
+                                         "asset_tags": tagger.tag_article(a), "raw_data": a} for a in fresh])
+    # Only after the insert committed: a crash before here re-fetches, and the hash claim dedupes.
+    bloom.update(catalyst_hash(a) for a in fresh)
+    save_seen_filter(bloom)
+    save_cursors(new_cursors)
+    print(f"INFO: [News] {len(articles)} article(s) from {len(new_cursors)} source(s), {len(fresh)} unseen.")
+    return {"assets": inserted_assets, "fetched": len(articles), "unseen": len(fresh)}
+
@@ -0,0 +1,85 @@
+# File: s_outcomes.py
+# Track records for the historical-precedent check.
+# When a trading_signals row moves to CLOSED, the cryptex_record_outcome trigger (s_db_init.sql)
+# writes its return to signal_outcomes and adds it to trader_outcome_stats, one row per
+# (trader, catalyst type, asset) plus an asset '*' rollup. Reading a win rate is then at most two
+# primary-key lookups. rebuild_outcomes() recomputes both tables from history (s_outcomes_backfill.py).
+
+import os
+from typing import Any, Dict, Optional
+
+from .s_db import cursor
+
+# --- CONFIG ---
+# Below this many closed trades the per-asset row falls back to the all-assets rollup,
+# and below it again the check reports NEUTRAL_WIN_RATE.
+MIN_SAMPLES = int(os.environ.get("CRYPTEX_OUTCOMES_MIN_SAMPLES", "5"))
+NEUTRAL_WIN_RATE = 50
+UNKNOWN_CATALYST = "unknown"  # Same default as the trigger for signals without a catalyst_type
+# --------------
+
+# Exit price is the recorded exit, else the last portfolio mark before closing (same rule as the trigger).
+BACKFILL_OUTCOMES_SQL = """
+INSERT INTO public.signal_outcomes (signal_id, trader_id, catalyst_type, asset, direction, entry_price, exit_price, return_pct, closed_at)
+SELECT t.signal_id, t.trader_id, COALESCE(t.catalyst_type, 'unknown'), t.asset, t.direction, t.entry_price, px.exit_price,
+       CASE WHEN upper(t.direction) = 'SHORT' THEN -1 ELSE 1 END * (px.exit_price - t.entry_price) / t.entry_price * 100,
+       COALESCE(t.closed_at, t.created_at, NOW())
+FROM public.trading_signals t
+CROSS JOIN LATERAL (
+    SELECT COALESCE(t.exit_price::float8, (
+        SELECT p.mark_price FROM public.portfolio_position_pnl p
+        WHERE p.signal_id = t.id AND p.taken_at >= t.created_at AND p.mark_price IS NOT NULL ORDER BY p.taken_at DESC LIMIT 1
+    )) AS exit_price
+) px
+WHERE t.trade_status = 'CLOSED' AND t.entry_price IS NOT NULL AND t.entry_price <> 0 AND px.exit_price IS NOT NULL
+ON CONFLICT (signal_id) DO NOTHING
+"""
+
+# Outcomes without an asset only count towards the '*' rollup, as in the trigger.
+REBUILD_STATS_SQL = """
+INSERT INTO public.trader_outcome_stats (trader_id, catalyst_type, asset, trades, wins, sum_return_pct)
+SELECT trader_id, catalyst_type, asset, COUNT(*), COUNT(*) FILTER (WHERE return_pct > 0), SUM(return_pct)
+FROM public.signal_outcomes WHERE trader_id IS NOT NULL AND asset IS NOT NULL AND asset <> '*'
+GROUP BY trader_id, catalyst_type, asset
+UNION ALL
+SELECT trader_id, catalyst_type, '*', COUNT(*), COUNT(*) FILTER (WHERE return_pct > 0), SUM(return_pct)
+FROM public.signal_outcomes WHERE trader_id IS NOT NULL
+GROUP BY trader_id, catalyst_type
+"""
+
+STATS_QUERY = """
+SELECT asset, trades, win_rate, avg_return_pct FROM public.trader_outcome_stats
+WHERE trader_id = %s AND catalyst_type = %s AND asset IN (%s, '*')
+"""
+
+
+def rebuild_outcomes() -> Dict[str, int]:
+    """Records outcomes for CLOSED signals that have none, then recomputes all stats in one transaction."""
+    with cursor() as cur:
+        # Holds off the trigger while the stats table is rebuilt; reads are not blocked.
+        cur.execute("LOCK TABLE public.signal_outcomes, public.trader_outcome_stats IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute(BACKFILL_OUTCOMES_SQL)
+        added = cur.rowcount
+        cur.execute("DELETE FROM public.trader_outcome_stats")
+        cur.execute(REBUILD_STATS_SQL)
+        stats_rows = cur.rowcount
+        cur.execute("SELECT COUNT(*) FROM public.signal_outcomes")
+        total = cur.fetchone()[0]
+    return {"outcomes_added": added, "outcomes_total": total, "stats_rows": stats_rows}
+
+
+def historical_win_rate(cur, trader_id: Optional[str], catalyst_type: Optional[str], asset: Optional[str] = None) -> Dict[str, Any]:
+    """Win rate (0-100) of the trader's closed signals for this catalyst type.
+
+    Uses the asset's own row when it has MIN_SAMPLES trades, else the all-assets rollup;
+    NEUTRAL_WIN_RATE with scope 'none' when neither has enough history.
+    """
+    cur.execute(STATS_QUERY, (trader_id, catalyst_type or UNKNOWN_CATALYST, asset or "*"))
+    rows = {row[0]: row[1:] for row in cur.fetchall()}
+    for scope in ((asset, "*") if asset else ("*",)):
+        trades, win_rate, avg_return_pct = rows.get(scope, (0, None, None))
+        if trades >= MIN_SAMPLES:
+            return {"win_rate": round(100 * win_rate), "avg_return_pct": avg_return_pct, "trades": trades,
+                    "scope": "asset" if scope != "*" else "all_assets"}
+    return {"win_rate": NEUTRAL_WIN_RATE, "avg_return_pct": None, "trades": max((r[0] for r in rows.values()), default=0),
+            "scope": "none"}
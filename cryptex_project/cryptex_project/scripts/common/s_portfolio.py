@@ -0,0 +1,94 @@
+# File: s_portfolio.py
+# Mark-to-market for every OPEN row of trading_signals in one pass.
+# Positions are loaded into NumPy arrays, each distinct asset is priced once (snapshot from
+# s_price_service.py, else one fetch_tickers call per exchange), PnL is computed column-wise
+# and the snapshot is appended to portfolio_snapshots / portfolio_position_pnl in one statement.
+
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .s_db import cursor, execute_prepared
+from .s_price_cache import quote_assets
+
+SNAPSHOT_SQL = """
+WITH snap AS (
+    INSERT INTO public.portfolio_snapshots (exchange, open_positions, priced_positions, total_pnl_usd, total_size_usd)
+    VALUES (%s, %s, %s, %s, %s)
+    RETURNING id, taken_at
+)
+INSERT INTO public.portfolio_position_pnl (snapshot_id, taken_at, signal_id, asset, mark_price, pnl_usd)
+SELECT snap.id, snap.taken_at, p.signal_id, p.asset, p.mark_price, p.pnl_usd
+FROM snap, unnest(%s::int[], %s::text[], %s::float8[], %s::float8[]) AS p(signal_id, asset, mark_price, pnl_usd)
+RETURNING snapshot_id
+"""
+
+
+def load_open_positions() -> Dict[str, np.ndarray]:
+    with cursor() as cur:
+        execute_prepared(cur, "select_open_positions")
+        rows = cur.fetchall()
+    if not rows:
+        return {}
+    ids, assets, directions, entry_prices, sizes = zip(*rows)
+    return {
+        "id": np.array(ids, dtype=np.int64),
+        "asset": np.array(assets, dtype=object),
+        # +1 for LONG, -1 for SHORT
+        "sign": np.where(np.char.upper(np.array(directions, dtype=str)) == "LONG", 1.0, -1.0),
+        "entry_price": np.array(entry_prices, dtype=float),
+        "size_usd": np.array(sizes, dtype=float),
+    }
+
+
+def mark_prices(assets: np.ndarray, exchange: str) -> np.ndarray:
+    """Prices each distinct asset once and broadcasts back to positions (NaN where unpriced)."""
+    unique_assets, inverse = np.unique(assets.astype(str), return_inverse=True)
+    quotes = quote_assets(exchange, list(unique_assets))
+    unique_prices = np.array([(quotes.get(a) or {}).get("price", np.nan) for a in unique_assets], dtype=float)
+    return unique_prices[inverse]
+
+
+def mark_to_market(positions: Dict[str, np.ndarray], prices: np.ndarray) -> np.ndarray:
+    """PnL in USD per position: direction * (mark - entry) * units, units = size / entry."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return positions["sign"] * (prices - positions["entry_price"]) * (positions["size_usd"] / positions["entry_price"])
+
+
+def _nullable(values: np.ndarray) -> List[Any]:
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+def save_snapshot(exchange: str, positions: Dict[str, np.ndarray], prices: np.ndarray, pnl: np.ndarray) -> int:
+    # Totals cover priced positions only, so total_pnl_usd / total_size_usd is a return on the same book.
+    priced = ~np.isnan(pnl)
+    with cursor() as cur:
+        cur.execute(SNAPSHOT_SQL, (
+            exchange, len(pnl), int(priced.sum()), float(pnl[priced].sum()), float(positions["size_usd"][priced].sum()),
+            positions["id"].tolist(), positions["asset"].astype(str).tolist(), _nullable(prices), _nullable(pnl),
+        ))
+        row = cur.fetchone()
+    return row[0] if row else 0
+
+
+def run_portfolio_snapshot(exchange: str) -> Dict[str, Any]:
+    """Marks all open positions to market on `exchange` and records the snapshot."""
+    started = time.perf_counter()
+    positions = load_open_positions()
+    if not positions:
+        print("INFO: [PortfolioMonitor] No open positions to monitor.")
+        return {"status": "no_open_positions"}
+    print(f"INFO: [PortfolioMonitor] Found {len(positions['id'])} open positions to track.")
+
+    prices = mark_prices(positions["asset"], exchange)
+    pnl = mark_to_market(positions, prices)
+    for asset in sorted(set(positions["asset"][np.isnan(prices)].astype(str))):
+        print(f"ERROR: [PortfolioMonitor] Could not get price for {asset}.")
+
+    snapshot_id = save_snapshot(exchange, positions, prices, pnl)
+    total_pnl = float(np.nansum(pnl))
+    print(f"INFO: [PortfolioMonitor] Total Portfolio PnL: ${total_pnl:,.2f} "
+          f"({int((~np.isnan(pnl)).sum())}/{len(pnl)} priced, {time.perf_counter() - started:.2f}s).")
+    return {"total_pnl": total_pnl, "tracked_positions": len(pnl), "priced_positions": int((~np.isnan(pnl)).sum()),
+            "snapshot_id": snapshot_id}
@@ -0,0 +1,174 @@
+# File: s_prefilter.py
+# Cheap-first scoring stage of the AI signal engine.
+# Every correlated event gets a local 0-100 score from data already at hand: how reputable the news
+# source is, whether the headline sentiment agrees with the trade side, the trade's notional,
+# the asset's DEX liquidity (token_contracts via s_token_index) and the trader's closed-trade win
+# rate (trader_outcome_stats). Only events at or above PREFILTER_THRESHOLD go on to GPT-4o.
+# Liquidity and history are read once per batch, so scoring an event is a few dict lookups.
+# Per-stage pass rates and latencies are kept in stage_stats(). evaluate() replays the stored events
+# against the signals they produced, to show the recall / LLM-call trade-off per threshold
+# (s_prefilter_eval.py).
+
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .s_db import cursor
+from .s_herd import position_side
+from .s_outcomes import MIN_SAMPLES
+
+# --- CONFIG ---
+PREFILTER_THRESHOLD = float(os.environ.get("CRYPTEX_PREFILTER_THRESHOLD", "40"))
+# Points per feature; each feature is normalised to 0..1, so the weights sum to the 100-point scale.
+WEIGHTS = {"source": 20, "sentiment": 25, "size": 20, "liquidity": 15, "history": 20}
+SOURCE_REPUTATION = {"reuters": 1.0, "bloomberg": 1.0, "coindesk": 0.8, "the block": 0.8, "cointelegraph": 0.7,
+                     "decrypt": 0.6, "cryptoslate": 0.5, "yahoo finance": 0.6}
+DEFAULT_REPUTATION = 0.4
+# Used when a feature is unknown (DEX trades carry no price, majors are not in token_contracts, new traders).
+UNKNOWN = {"size": 0.4, "liquidity": 0.33, "history": 0.5}
+SIGNAL_CONFIDENCE_CUTOFF = 85  # Same gate as the engine's final verdict
+# --------------
+
+HISTORY_SQL = """
+SELECT trader_id, SUM(trades), SUM(wins) FROM public.trader_outcome_stats
+WHERE asset = '*' AND trader_id = ANY(%s) GROUP BY trader_id
+"""
+
+_stats: Dict[str, Dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+
+class EventContext(NamedTuple):
+    liquidity_usd: Dict[str, float]     # asset -> best indexed DEX liquidity
+    win_rates: Dict[str, float]         # trader -> win rate over >= MIN_SAMPLES closed trades
+
+
+def record_stage(stage: str, entered: int, passed: int, seconds: float) -> None:
+    with _stats_lock:
+        entry = _stats.setdefault(stage, {"in": 0, "passed": 0, "seconds": 0.0})
+        entry["in"] += entered
+        entry["passed"] += passed
+        entry["seconds"] += seconds
+
+
+def stage_stats() -> Dict[str, Dict[str, float]]:
+    """Per stage: events in, passed, pass rate and mean latency per event (ms)."""
+    with _stats_lock:
+        return {stage: {"in": s["in"], "passed": s["passed"], "pass_rate": round(s["passed"] / s["in"], 3) if s["in"] else None,
+                        "ms_per_event": round(s["seconds"] / s["in"] * 1000, 3) if s["in"] else None}
+                for stage, s in _stats.items()}
+
+
+def _clamp(value: float) -> float:
+    return min(1.0, max(0.0, value))
+
+
+def _source_name(catalyst: Dict[str, Any]) -> str:
+    source = catalyst.get("source")
+    return ((source.get("name") if isinstance(source, dict) else source) or "").strip().lower()
+
+
+def load_context(events: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]) -> EventContext:
+    """Liquidity and trader history for a batch of (trade, catalyst) events, in one query."""
+    from .s_token_index import get_index
+
+    index = get_index()
+    liquidity = {}
+    for asset in {t.get("asset") for t, _ in events if t.get("asset")}:
+        contract = index.resolve_symbol(asset)
+        if contract and contract["liquidity_usd"]:
+            liquidity[asset] = contract["liquidity_usd"]
+    traders = sorted({t.get("trader_id") for t, _ in events if t.get("trader_id")})
+    win_rates = {}
+    if traders:
+        with cursor() as cur:
+            cur.execute(HISTORY_SQL, (traders,))
+            win_rates = {trader: wins / trades for trader, trades, wins in cur.fetchall() if trades >= MIN_SAMPLES}
+    return EventContext(liquidity, win_rates)
+
+
+def features(trade: Dict[str, Any], catalyst: Dict[str, Any], sentiment: str, context: EventContext) -> Dict[str, float]:
+    """The five 0..1 features of one event; `trade` is the trade's raw_data plus trader_id and asset."""
+    direction, notional = position_side(trade)
+    if sentiment == "neutral" or sentiment not in ("positive", "negative"):
+        agreement = 0.2
+    elif direction is None:
+        agreement = 0.5
+    else:
+        agreement = 1.0 if (sentiment == "positive") == (direction == "LONG") else 0.3
+    liquidity = context.liquidity_usd.get(trade.get("asset"))
+    return {
+        "source": SOURCE_REPUTATION.get(_source_name(catalyst), DEFAULT_REPUTATION),
+        "sentiment": agreement,
+        "size": _clamp((math.log10(notional) - 3) / 4) if notional > 0 else UNKNOWN["size"],  # $1k -> 0, $10M -> 1
+        "liquidity": _clamp((math.log10(liquidity) - 4) / 4) if liquidity else UNKNOWN["liquidity"],  # $10k -> 0, $100M -> 1
+        "history": context.win_rates.get(trade.get("trader_id"), UNKNOWN["history"]),
+    }
+
+
+def score_event(trade: Dict[str, Any], catalyst: Dict[str, Any], sentiment: str, context: EventContext) -> float:
+    return sum(WEIGHTS[name] * value for name, value in features(trade, catalyst, sentiment, context).items())
+
+
+def prefilter(events: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]], sentiments: Sequence[str],
+              threshold: Optional[float] = None, context: Optional[EventContext] = None) -> List[int]:
+    """Indexes of the events whose score reaches the threshold; records the stage's pass rate and latency."""
+    threshold = PREFILTER_THRESHOLD if threshold is None else threshold
+    started = time.perf_counter()
+    context = context or load_context(events)
+    passed = [i for i, ((trade, catalyst), sentiment) in enumerate(zip(events, sentiments))
+              if score_event(trade, catalyst, sentiment, context) >= threshold]
+    record_stage("prefilter", len(events), len(passed), time.perf_counter() - started)
+    return passed
+
+
+def load_stored_events(days: int = 7, consumer: str = "ai_signal_engine") -> List[Dict[str, Any]]:
+    """Events the engine was given in the last `days`, each labelled with the signal it produced, if any.
+
+    Events the live prefilter dropped never reached the LLM, so they count as no-signal: curves are
+    only informative at or above the threshold that was live when the events were recorded.
+    """
+    with cursor() as cur:
+        cur.execute("""
+            SELECT t.trader_id, t.asset, t.raw_data, c.raw_data, s.ai_confidence_score, o.return_pct
+            FROM public.correlated_pairs p
+            JOIN public.recent_trades t ON t.id = p.trade_id
+            JOIN public.recent_catalysts c ON c.id = p.catalyst_id
+            LEFT JOIN LATERAL (
+                SELECT signal_id, ai_confidence_score FROM public.trading_signals s
+                WHERE s.trader_id = t.trader_id AND s.asset = t.asset AND s.catalyst_headline = c.headline
+                ORDER BY s.id LIMIT 1
+            ) s ON TRUE
+            LEFT JOIN public.signal_outcomes o ON o.signal_id = s.signal_id
+            WHERE p.consumer = %s AND p.emitted_at > NOW() - make_interval(days => %s)
+        """, (consumer, days))
+        return [{"trade": {**trade_raw, "trader_id": trader_id, "asset": asset}, "catalyst": catalyst_raw,
+                 "signal": confidence is not None and confidence > SIGNAL_CONFIDENCE_CUTOFF,
+                 "won": return_pct is not None and return_pct > 0}
+                for trader_id, asset, trade_raw, catalyst_raw, confidence, return_pct in cur.fetchall()]
+
+
+def evaluate(events: List[Dict[str, Any]], thresholds: Sequence[float] = tuple(range(0, 100, 10)),
+             context: Optional[EventContext] = None, sentiments: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Recall of signals / winning signals and LLM calls kept, per threshold, for labelled events."""
+    pairs = [(e["trade"], e["catalyst"]) for e in events]
+    if sentiments is None:
+        from .s_sentiment import score_headlines
+
+        sentiments = score_headlines([(c.get("title") or c.get("headline")) for _, c in pairs])
+    context = context or load_context(pairs)
+    started = time.perf_counter()
+    scores = [score_event(t, c, s, context) for (t, c), s in zip(pairs, sentiments)]
+    us_per_event = (time.perf_counter() - started) / max(len(events), 1) * 1e6
+    signals = sum(e["signal"] for e in events)
+    wins = sum(e["won"] for e in events)
+    curve = []
+    for threshold in thresholds:
+        kept = [e for e, score in zip(events, scores) if score >= threshold]
+        curve.append({"threshold": threshold, "llm_calls": len(kept), "cost_fraction": round(len(kept) / max(len(events), 1), 3),
+                      "signal_recall": round(sum(e["signal"] for e in kept) / signals, 3) if signals else None,
+                      "win_recall": round(sum(e["won"] for e in kept) / wins, 3) if wins else None})
+    return {"events": len(events), "signals": signals, "wins": wins, "score_us_per_event": round(us_per_event, 2), "curve": curve}
+
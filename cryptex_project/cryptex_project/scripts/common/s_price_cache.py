@@ -0,0 +1,237 @@
+# File: s_price_cache.py
+# Latest-ticker snapshot shared between the price service and the price scripts.
+# s_price_service.py keeps exchange websockets open and writes every ticker here (one Redis
+# hash per symbol, one field per exchange). Readers get all exchanges in a single round trip
+# and only fall back to REST for exchanges whose entry is missing or older than PRICE_MAX_AGE_S.
+# Without Redis there is no shared snapshot: the service refuses to start and readers use REST.
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# --- CONFIG ---
+REDIS_URL = os.environ.get("CRYPTEX_REDIS_URL", "redis://redis:6379/0")
+PRICE_MAX_AGE_S = float(os.environ.get("CRYPTEX_PRICE_MAX_AGE_S", "5"))
+# Snapshots of symbols nobody streams any more disappear after this long.
+SNAPSHOT_TTL_S = int(os.environ.get("CRYPTEX_PRICE_SNAPSHOT_TTL_S", "300"))
+REST_TIMEOUT_MS = int(os.environ.get("CRYPTEX_PRICE_REST_TIMEOUT_MS", "5000"))
+KEY_PREFIX = "cryptex:px:"
+# After a failed connect, snapshot calls fail fast for this long before Redis is tried again.
+STORE_RETRY_S = float(os.environ.get("CRYPTEX_PRICE_STORE_RETRY_S", "30"))
+# --------------
+
+
+class DictSnapshot:
+    """In-process snapshot for tests and the fake feed; only used when installed with set_store()."""
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def write(self, symbol: str, exchange: str, entry: str) -> None:
+        with self._lock:
+            self._data.setdefault(symbol, {})[exchange] = entry
+
+    def read(self, symbol: str) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._data.get(symbol, {}))
+
+
+class RedisSnapshot:
+    def __init__(self, url: str = REDIS_URL):
+        import redis  # Only needed when the Redis snapshot is actually used
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self.client.ping()
+
+    def write(self, symbol: str, exchange: str, entry: str) -> None:
+        pipe = self.client.pipeline()
+        pipe.hset(KEY_PREFIX + symbol, exchange, entry)
+        pipe.expire(KEY_PREFIX + symbol, SNAPSHOT_TTL_S)
+        pipe.execute()
+
+    def read(self, symbol: str) -> Dict[str, str]:
+        return {k.decode("utf-8"): v.decode("utf-8") for k, v in self.client.hgetall(KEY_PREFIX + symbol).items()}
+
+
+_store = None
+_store_failed_at: Optional[float] = None
+_stats = {"snapshot_hits": 0, "stale": 0, "rest_calls": 0, "rest_errors": 0}
+
+
+def set_store(store) -> None:
+    """Replaces the snapshot store (e.g. DictSnapshot() in tests)."""
+    global _store
+    _store = store
+
+
+def get_store():
+    """The shared Redis snapshot; raises while Redis is unreachable.
+
+    An in-process fallback would let the service publish into a snapshot no reader can see.
+    """
+    global _store, _store_failed_at
+    if _store is None:
+        if _store_failed_at is not None and time.monotonic() - _store_failed_at < STORE_RETRY_S:
+            raise ConnectionError(f"Redis snapshot at {REDIS_URL} is unavailable")
+        try:
+            _store = RedisSnapshot(REDIS_URL)
+        except Exception:
+            _store_failed_at = time.monotonic()
+            raise
+        _store_failed_at = None
+    return _store
+
+
+def publish_ticker(exchange: str, symbol: str, ticker: Dict[str, Any]) -> None:
+    """Writes one ccxt ticker to the snapshot, stamped with the local receive time."""
+    if ticker.get("last") is None:
+        return
+    get_store().write(symbol, exchange, json.dumps({
+        "price": ticker["last"], "bid": ticker.get("bid"), "ask": ticker.get("ask"),
+        "exchange_ts": ticker.get("timestamp"), "received_at": time.time(),
+    }))
+
+
+def _remember_ticker(exchange: str, symbol: str, ticker: Dict[str, Any]) -> None:
+    """Best-effort snapshot write for a REST ticker; the REST result stands either way."""
+    try:
+        publish_ticker(exchange, symbol, ticker)
+    except Exception as e:
+        print(f"WARN: [PriceCache] Could not write {exchange} {symbol} to the snapshot. Error: {e}")
+
+
+def read_prices(symbol: str, exchanges: Sequence[str], max_age_s: float = PRICE_MAX_AGE_S) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Returns (fresh prices from the snapshot, exchanges that need a REST call)."""
+    try:
+        entries = get_store().read(symbol)
+    except Exception as e:
+        print(f"WARN: [PriceCache] Snapshot read failed, using REST. Error: {e}")
+        entries = {}
+    now = time.time()
+    fresh, stale = [], []
+    for exchange in exchanges:
+        entry = json.loads(entries[exchange]) if exchange in entries else None
+        if entry is None or now - entry["received_at"] > max_age_s:
+            stale.append(exchange)
+            continue
+        fresh.append({"exchange": exchange, "price": entry["price"], "bid": entry.get("bid"), "ask": entry.get("ask"),
+                      "status": "success", "source": "snapshot", "age_s": round(now - entry["received_at"], 3)})
+    _stats["snapshot_hits"] += len(fresh)
+    _stats["stale"] += len(stale)
+    return fresh, stale
+
+
+# --- REST fallback ---
+# Synchronous ccxt clients are not tied to an event loop, so one client per exchange is kept
+# for the life of the worker process; markets are loaded on the first call only.
+_rest_clients: Dict[str, Any] = {}
+_rest_lock = threading.Lock()
+
+
+def get_rest_client(exchange: str):
+    with _rest_lock:
+        if exchange not in _rest_clients:
+            import ccxt
+            _rest_clients[exchange] = getattr(ccxt, exchange)({"enableRateLimit": True, "timeout": REST_TIMEOUT_MS})
+        return _rest_clients[exchange]
+
+
+def fetch_rest_price(exchange: str, symbol: str) -> Dict[str, Any]:
+    _stats["rest_calls"] += 1
+    try:
+        ticker = get_rest_client(exchange).fetch_ticker(symbol)
+        _remember_ticker(exchange, symbol, ticker)
+        return {"exchange": exchange, "price": ticker["last"], "bid": ticker.get("bid"), "ask": ticker.get("ask"),
+                "status": "success", "source": "rest", "age_s": 0.0}
+    except Exception as e:
+        _stats["rest_errors"] += 1
+        print(f"WARN: [PriceCache] REST ticker failed on {exchange} for {symbol}. Error: {e}")
+        return {"exchange": exchange, "price": None, "status": "error", "source": "rest"}
+
+
+# Quote currencies tried, in order, when an idea names only the base asset (e.g. "ETH").
+QUOTE_PREFERENCE = ["USDT", "USD", "USDC"]
+
+
+def resolve_symbol(exchange: str, asset: str) -> Optional[str]:
+    """Maps an asset as it appears in signals ("ETH", "ETH/USDT", "ETHUSDT") to this exchange's symbol."""
+    client = get_rest_client(exchange)
+    markets = client.load_markets()
+    if asset in markets:
+        return asset
+    by_id = client.markets_by_id.get(asset) if client.markets_by_id else None
+    if by_id:
+        # markets_by_id values are lists in recent ccxt versions; prefer the spot market.
+        candidates = by_id if isinstance(by_id, list) else [by_id]
+        return next((m["symbol"] for m in candidates if m.get("spot")), candidates[0]["symbol"])
+    base = asset.split("/")[0].upper()
+    for quote in QUOTE_PREFERENCE:
+        if f"{base}/{quote}" in markets:
+            return f"{base}/{quote}"
+    return None
+
+
+def fetch_rest_tickers(exchange: str, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """One fetch_tickers request for all symbols on an exchange; falls back to per-symbol calls if unsupported."""
+    _stats["rest_calls"] += 1
+    client = get_rest_client(exchange)
+    try:
+        if client.has.get("fetchTickers"):
+            tickers = client.fetch_tickers(symbols)
+        else:
+            tickers = {symbol: client.fetch_ticker(symbol) for symbol in symbols}
+    except Exception as e:
+        _stats["rest_errors"] += 1
+        print(f"WARN: [PriceCache] REST tickers failed on {exchange} for {len(symbols)} symbol(s). Error: {e}")
+        return {}
+    for symbol, ticker in tickers.items():
+        _remember_ticker(exchange, symbol, ticker)
+    return {symbol: ticker for symbol, ticker in tickers.items() if symbol in symbols}
+
+
+def resolve_symbols(exchange: str, assets: List[str]) -> Dict[str, str]:
+    """asset -> exchange symbol, from the exchange's own market list; unlisted assets are left out."""
+    try:
+        resolved = {asset: resolve_symbol(exchange, asset) for asset in assets}
+    except Exception as e:
+        print(f"WARN: [PriceCache] Could not load {exchange} markets. Error: {e}")
+        return {}
+    return {asset: symbol for asset, symbol in resolved.items() if symbol}
+
+
+def quote_assets(exchange: str, assets: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Quotes assets on one exchange: snapshot where fresh, one fetch_tickers call for the rest.
+
+    Returns asset -> {price, bid, ask, source, symbol}; assets the exchange does not list are left out.
+    """
+    symbols = resolve_symbols(exchange, assets)
+    quotes, missing = {}, []
+    for asset, symbol in symbols.items():
+        fresh, _ = read_prices(symbol, [exchange])
+        if fresh:
+            quotes[asset] = fresh[0]
+        else:
+            missing.append(asset)
+    if missing:
+        tickers = fetch_rest_tickers(exchange, sorted({symbols[a] for a in missing}))
+        for asset in missing:
+            ticker = tickers.get(symbols[asset])
+            if ticker and ticker.get("last") is not None:
+                quotes[asset] = {"price": ticker["last"], "bid": ticker.get("bid"), "ask": ticker.get("ask"), "source": "rest"}
+    for asset, quote in quotes.items():
+        quote["symbol"] = symbols[asset]
+    return quotes
+
+
+async def get_live_prices(symbol: str, exchanges: Sequence[str], max_age_s: float = PRICE_MAX_AGE_S) -> List[Dict[str, Any]]:
+    """Snapshot first; missing or stale exchanges are fetched over REST concurrently."""
+    fresh, stale = read_prices(symbol, exchanges, max_age_s)
+    fetched = await asyncio.gather(*(asyncio.to_thread(fetch_rest_price, exchange, symbol) for exchange in stale))
+    return fresh + [row for row in fetched if row["status"] == "success" and row["price"] is not None]
+
+
+def price_cache_stats() -> Dict[str, int]:
+    return dict(_stats)
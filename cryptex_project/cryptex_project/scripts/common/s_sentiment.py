@@ -0,0 +1,88 @@
+# File: s_sentiment.py
+# Local CPU sentiment stage for news headlines.
+# The model is loaded once per worker process; all headlines of a run are scored in one
+# batched forward pass and results are memoized so repeated headlines cost nothing.
+# Any Hugging Face sequence-classification model path works (CRYPTEX_SENTIMENT_MODEL);
+# CI can point it at a tiny model.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# --- CONFIG ---
+SENTIMENT_MODEL = os.environ.get("CRYPTEX_SENTIMENT_MODEL", "cardiffnlp/twitter-roberta-base-sentiment-latest")
+BATCH_SIZE = int(os.environ.get("CRYPTEX_SENTIMENT_BATCH_SIZE", "64"))
+MAX_TOKENS = int(os.environ.get("CRYPTEX_SENTIMENT_MAX_TOKENS", "64"))
+MEMO_MAX_ENTRIES = int(os.environ.get("CRYPTEX_SENTIMENT_MEMO_MAX_ENTRIES", "50000"))
+FALLBACK_LABEL = "neutral"
+# --------------
+
+# Generic LABEL_n outputs, by number of classes.
+_GENERIC_LABELS = {2: ["negative", "positive"], 3: ["negative", "neutral", "positive"]}
+
+_models: Dict[str, tuple] = {}
+_load_lock = threading.Lock()
+_memo: "OrderedDict[tuple, str]" = OrderedDict()
+_stats = {"model_load_s": 0.0, "scored": 0, "memo_hits": 0, "forward_passes": 0}
+
+
+def _label_names(model) -> List[str]:
+    id2label = model.config.id2label
+    names = [str(id2label[i]).lower() for i in range(len(id2label))]
+    if all(name.startswith("label_") for name in names):
+        return _GENERIC_LABELS.get(len(names), names)
+    return names
+
+
+def load_model(model_path: str = SENTIMENT_MODEL) -> tuple:
+    """Returns (tokenizer, model, labels), loading them on first use in this process."""
+    if model_path in _models:
+        return _models[model_path]
+    with _load_lock:
+        if model_path not in _models:
+            import torch  # Heavy optional dependencies: only imported when sentiment is needed
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+            started = time.perf_counter()
+            torch.set_grad_enabled(False)
+            tokenizer = AutoTokenizer.from_pretrained(model_path)
+            model = AutoModelForSequenceClassification.from_pretrained(model_path).eval()
+            _models[model_path] = (tokenizer, model, _label_names(model))
+            _stats["model_load_s"] = time.perf_counter() - started
+            print(f"INFO: [HF-Sentiment] Loaded {model_path} in {_stats['model_load_s']:.2f}s.")
+    return _models[model_path]
+
+
+def score_headlines(headlines: List[Optional[str]], model_path: str = SENTIMENT_MODEL) -> List[str]:
+    """Scores all headlines of a run; returns 'positive' / 'negative' / 'neutral' per input, in order."""
+    texts = [(h or "").strip() for h in headlines]
+    # This run's labels are kept apart from the memo, which may evict some of them when trimmed below.
+    run_labels = {t: _memo[(model_path, t)] for t in texts if t and (model_path, t) in _memo}
+    pending = [t for t in dict.fromkeys(texts) if t and t not in run_labels]
+    _stats["memo_hits"] += sum(1 for t in texts if t in run_labels)
+
+    if pending:
+        try:
+            import torch
+            tokenizer, model, labels = load_model(model_path)
+            for start in range(0, len(pending), BATCH_SIZE):
+                chunk = pending[start:start + BATCH_SIZE]
+                inputs = tokenizer(chunk, padding=True, truncation=True, max_length=MAX_TOKENS, return_tensors="pt")
+                with torch.inference_mode():
+                    predicted = model(**inputs).logits.argmax(dim=-1).tolist()
+                _stats["forward_passes"] += 1
+                for text, label_id in zip(chunk, predicted):
+                    run_labels[text] = _memo[(model_path, text)] = labels[label_id]
+            _stats["scored"] += len(pending)
+            while len(_memo) > MEMO_MAX_ENTRIES:
+                _memo.popitem(last=False)
+        except Exception as e:
+            print(f"ERROR: [HF-Sentiment] Could not score headlines, using '{FALLBACK_LABEL}'. Error: {e}")
+
+    return [run_labels.get(t, FALLBACK_LABEL) for t in texts]
+
+
+def sentiment_stats() -> Dict[str, float]:
+    return dict(_stats)
+
@@ -0,0 +1,236 @@
+# File: s_telegram_outbox.py
+# Durable, rate-limited delivery of Telegram alerts.
+# Alerts are written to telegram_outbox first; drain() claims due rows (FOR UPDATE SKIP LOCKED, with
+# a lease so a crashed sender's rows come back) and sends them over one HTTP session under a global
+# and a per-chat token bucket. A 429 pauses that chat for Telegram's retry_after. When a chat has
+# several alerts waiting they go out as one digest message; a digest the API rejects is resent one
+# alert at a time, so only the malformed alert fails. Other failures are retried with backoff until
+# OUTBOX_MAX_ATTEMPTS.
+# CRYPTEX_TELEGRAM_API_URL can point at a local fake Bot API (see tests/test_telegram_outbox.py).
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import requests
+from psycopg2.extras import execute_values
+
+from .s_async_calls import AsyncTokenBucket
+from .s_db import cursor
+
+# --- CONFIG ---
+TELEGRAM_API_URL = os.environ.get("CRYPTEX_TELEGRAM_API_URL", "https://api.telegram.org")
+GLOBAL_RPS = float(os.environ.get("CRYPTEX_TELEGRAM_GLOBAL_RPS", "25"))  # Bot API allows about 30 messages/s
+CHAT_RPS = float(os.environ.get("CRYPTEX_TELEGRAM_CHAT_RPS", "1"))  # ... and about 1/s per chat (20/min in groups)
+DIGEST_MAX_MESSAGES = int(os.environ.get("CRYPTEX_TELEGRAM_DIGEST_MAX", "10"))
+MAX_MESSAGE_CHARS = 4096  # Telegram's limit for one message
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("CRYPTEX_TELEGRAM_MAX_ATTEMPTS", "5"))
+OUTBOX_RETRY_BASE_S = int(os.environ.get("CRYPTEX_TELEGRAM_RETRY_BASE_S", "30"))
+OUTBOX_LEASE_S = int(os.environ.get("CRYPTEX_TELEGRAM_LEASE_S", "120"))
+OUTBOX_CLAIM_BATCH = int(os.environ.get("CRYPTEX_TELEGRAM_CLAIM_BATCH", "500"))
+TELEGRAM_TIMEOUT_S = float(os.environ.get("CRYPTEX_TELEGRAM_TIMEOUT_S", "10"))
+DIGEST_SEPARATOR = "\n\n———\n\n"
+# --------------
+
+ENQUEUE_SQL = """
+INSERT INTO public.telegram_outbox (chat_id, text, dedupe_key) VALUES %s
+ON CONFLICT (dedupe_key) DO NOTHING
+RETURNING id
+"""
+
+# Claimed rows stay PENDING but are hidden for OUTBOX_LEASE_S; every claim counts as an attempt.
+CLAIM_SQL = """
+UPDATE public.telegram_outbox SET attempts = attempts + 1, next_attempt_at = NOW() + make_interval(secs => %s)
+WHERE id IN (
+    SELECT id FROM public.telegram_outbox
+    WHERE status = 'PENDING' AND next_attempt_at <= NOW() AND (%s::text[] IS NULL OR chat_id = ANY(%s::text[]))
+    ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED
+)
+RETURNING id, chat_id, text
+"""
+
+RETRY_SQL = """
+UPDATE public.telegram_outbox SET
+    status = CASE WHEN attempts >= %s THEN 'FAILED' ELSE 'PENDING' END,
+    next_attempt_at = NOW() + make_interval(secs => %s * power(2, attempts - 1)), last_error = %s
+WHERE id = ANY(%s)
+"""
+
+# Rate limiting is not the alert's fault: the attempt is given back.
+RELEASE_SQL = """
+UPDATE public.telegram_outbox SET attempts = GREATEST(attempts - 1, 0), next_attempt_at = NOW() + make_interval(secs => %s), last_error = %s
+WHERE id = ANY(%s)
+"""
+
+_stats = {"enqueued": 0, "requests": 0, "sent": 0, "digests": 0, "rate_limited": 0, "retried": 0, "failed": 0, "digests_split": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, value: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += value
+
+
+def outbox_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def enqueue(chat_id: str, messages: Sequence[Tuple[str, Optional[str]]]) -> int:
+    """Queues (text, dedupe_key) messages for a chat; a key already in the outbox is skipped. Returns rows added."""
+    rows = [(str(chat_id), text[:MAX_MESSAGE_CHARS], key) for text, key in messages if text]
+    if not rows:
+        return 0
+    with cursor() as cur:
+        added = len(execute_values(cur, ENQUEUE_SQL, rows, fetch=True))
+    _count("enqueued", added)
+    return added
+
+
+def digest_text(texts: List[str]) -> str:
+    if len(texts) == 1:
+        return texts[0]
+    return f"🗂 *{len(texts)} Cryptex signals*{DIGEST_SEPARATOR}" + DIGEST_SEPARATOR.join(texts)
+
+
+def take_digest(pending: List[tuple]) -> List[tuple]:
+    """Oldest waiting rows that fit in one message (at most DIGEST_MAX_MESSAGES, MAX_MESSAGE_CHARS)."""
+    group = [pending[0]]
+    for row in pending[1:DIGEST_MAX_MESSAGES]:
+        if len(digest_text([r[2] for r in group + [row]])) > MAX_MESSAGE_CHARS:
+            break
+        group.append(row)
+    return group
+
+
+def _mark_sent(ids: List[int]) -> None:
+    with cursor() as cur:
+        cur.execute("UPDATE public.telegram_outbox SET status = 'SENT', sent_at = NOW(), last_error = NULL WHERE id = ANY(%s)", (ids,))
+
+
+def _mark_retry(ids: List[int], error: str) -> None:
+    with cursor() as cur:
+        cur.execute(RETRY_SQL, (OUTBOX_MAX_ATTEMPTS, OUTBOX_RETRY_BASE_S, error[:500], ids))
+    _count("retried", len(ids))
+
+
+def _mark_failed(ids: List[int], error: str) -> None:
+    with cursor() as cur:
+        cur.execute("UPDATE public.telegram_outbox SET status = 'FAILED', last_error = %s WHERE id = ANY(%s)", (error[:500], ids))
+    _count("failed", len(ids))
+
+
+def _release(ids: List[int], delay_s: float, error: Optional[str] = None) -> None:
+    with cursor() as cur:
+        cur.execute(RELEASE_SQL, (delay_s, error, ids))
+
+
+class TelegramSender:
+    """One per drain: owns the HTTP session and the rate limiters."""
+
+    def __init__(self, bot_token: str, api_url: str = TELEGRAM_API_URL, global_rps: float = GLOBAL_RPS,
+                 chat_rps: float = CHAT_RPS, timeout_s: float = TELEGRAM_TIMEOUT_S):
+        self.bot_token = bot_token
+        self.url = f"{api_url.rstrip('/')}/bot{bot_token}/sendMessage"
+        self.session = requests.Session()
+        self.global_limiter = AsyncTokenBucket(global_rps)
+        self.chat_rps = chat_rps
+        self.chat_limiters: Dict[str, AsyncTokenBucket] = {}
+        self.timeout_s = timeout_s
+
+    def _post(self, chat_id: str, text: str) -> Tuple[int, Dict[str, Any]]:
+        _count("requests")
+        res = self.session.post(self.url, json={"chat_id": chat_id, "text": text, "parse_mode": "Markdown"},
+                                timeout=self.timeout_s)
+        try:
+            body = res.json()
+        except ValueError:
+            body = {}
+        return res.status_code, body
+
+    async def send(self, chat_id: str, text: str) -> Tuple[int, Dict[str, Any]]:
+        """(HTTP status, Bot API response) for one sendMessage, after both rate limits."""
+        limiter = self.chat_limiters.setdefault(chat_id, AsyncTokenBucket(self.chat_rps, capacity=1))
+        await limiter.acquire()
+        await self.global_limiter.acquire()
+        return await asyncio.to_thread(self._post, chat_id, text)
+
+    async def drain_chat(self, chat_id: str, rows: List[tuple], deadline: float) -> None:
+        """Sends one chat's claimed (id, chat_id, text) rows, oldest first, digesting whatever is waiting."""
+        pending = list(rows)
+        singles = set()  # Rows of a rejected digest, sent one by one
+        while pending:
+            if time.monotonic() >= deadline:
+                _release([r[0] for r in pending], 0)
+                return
+            group = [pending[0]] if pending[0][0] in singles else take_digest(pending)
+            ids = [r[0] for r in group]
+            try:
+                status, body = await self.send(chat_id, digest_text([r[2] for r in group]))
+            except Exception as e:
+                # Network trouble hits the whole chat; the rest is retried later rather than hammered now.
+                # requests puts the URL (and so the bot token) in its errors.
+                error = repr(e).replace(self.bot_token, "<token>")
+                print(f"WARN: [Telegram] Send to {chat_id} failed, retrying later. Error: {error}")
+                _mark_retry([r[0] for r in pending], error)
+                return
+            if status == 429:
+                _count("rate_limited")
+                retry_after = float((body.get("parameters") or {}).get("retry_after") or 1)
+                if time.monotonic() + retry_after >= deadline:
+                    _release([r[0] for r in pending], retry_after, "429 Too Many Requests")
+                    return
+                print(f"WARN: [Telegram] Rate limited on {chat_id}, waiting {retry_after:.0f}s.")
+                await asyncio.sleep(retry_after)
+                continue
+            if 400 <= status < 500 and len(group) > 1:
+                # One alert's Markdown can break the whole digest; find it by sending the group one by one.
+                print(f"WARN: [Telegram] {chat_id} rejected a digest of {len(ids)}: {status} {body.get('description')}. Sending them individually.")
+                _count("digests_split")
+                singles.update(ids)
+                continue
+            pending = pending[len(group):]
+            if status == 200 and body.get("ok"):
+                _mark_sent(ids)
+                _count("sent", len(ids))
+                _count("digests", 1 if len(ids) > 1 else 0)
+            elif 400 <= status < 500:
+                # Bad request / chat not found / bot blocked: retrying will not help.
+                print(f"ERROR: [Telegram] {chat_id} rejected {len(ids)} alert(s): {status} {body.get('description')}")
+                _mark_failed(ids, f"{status} {body.get('description')}")
+            else:
+                print(f"WARN: [Telegram] {chat_id} got {status}, retrying later.")
+                _mark_retry([r[0] for r in pending] + ids, f"{status} {body.get('description')}")
+                return
+
+
+async def drain(bot_token: str, run_for_seconds: float = 45, chat_ids: Optional[List[str]] = None,
+                sender: Optional[TelegramSender] = None) -> Dict[str, int]:
+    """Sends due outbox rows (all chats, or only `chat_ids`) until the outbox is empty or time runs out."""
+    sender = sender or TelegramSender(bot_token)
+    deadline = time.monotonic() + run_for_seconds
+    before = outbox_stats()
+    while time.monotonic() < deadline:
+        with cursor() as cur:
+            cur.execute(CLAIM_SQL, (OUTBOX_LEASE_S, chat_ids, chat_ids, OUTBOX_CLAIM_BATCH))
+            claimed = sorted(cur.fetchall())
+        if not claimed:
+            break
+        by_chat: Dict[str, List[tuple]] = {}
+        for row in claimed:
+            by_chat.setdefault(row[1], []).append(row)
+        await asyncio.gather(*(sender.drain_chat(chat, rows, deadline) for chat, rows in by_chat.items()))
+    after = outbox_stats()
+    with cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM public.telegram_outbox WHERE status = 'PENDING' AND (%s::text[] IS NULL OR chat_id = ANY(%s::text[]))",
+                    (chat_ids, chat_ids))
+        pending = cur.fetchone()[0]
+    return {**{k: after[k] - before[k] for k in ("sent", "digests", "digests_split", "rate_limited", "retried", "failed")}, "pending": pending}
+
+
+def drain_outbox(bot_token: str, run_for_seconds: float = 45, chat_ids: Optional[List[str]] = None) -> Dict[str, int]:
+    """Synchronous entry point for scripts."""
+    return asyncio.run(drain(bot_token, run_for_seconds, chat_ids))
+
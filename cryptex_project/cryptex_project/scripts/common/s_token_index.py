@@ -0,0 +1,128 @@
+# File: s_token_index.py
+# Symbol / address -> contract index used by the risk analyzers instead of guessing.
+# token_contracts holds the canonical contract per (symbol, chain), built by
+# scripts/s_token_index_refresh.py; token_index_misses lists symbols and addresses known to be
+# unresolvable so the analyzers never send them to DexScreener. Both tables are read once per
+# process into dicts; lookups are plain dict hits.
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from psycopg2.extras import execute_values
+
+from .s_db import cursor
+
+# Quote / contract suffixes stripped from exchange symbols ("BTCUSDT", "ETH/USDT:USDT", "SOL-PERP").
+QUOTE_SUFFIXES = ("USDT", "USDC", "BUSD", "FDUSD", "USD", "PERP")
+_SEPARATORS = re.compile(r"[/:\-_]")
+
+UPSERT_CONTRACTS_SQL = """
+INSERT INTO public.token_contracts (symbol, chain_id, address, name, liquidity_usd, source)
+VALUES %s
+ON CONFLICT (symbol, chain_id) DO UPDATE SET
+    address = EXCLUDED.address, name = EXCLUDED.name, liquidity_usd = EXCLUDED.liquidity_usd,
+    source = EXCLUDED.source, updated_at = NOW()
+"""
+
+RECORD_MISSES_SQL = """
+INSERT INTO public.token_index_misses (lookup_key, kind, last_checked, attempts)
+VALUES %s
+ON CONFLICT (lookup_key) DO UPDATE SET
+    last_checked = COALESCE(EXCLUDED.last_checked, token_index_misses.last_checked),
+    attempts = token_index_misses.attempts + EXCLUDED.attempts
+"""
+
+
+def normalize_symbol(raw: Optional[str]) -> Optional[str]:
+    """'BTCUSDT' / 'btc/usdt:USDT' / 'SOL-PERP' -> 'BTC' / 'BTC' / 'SOL'."""
+    if not raw:
+        return None
+    symbol = _SEPARATORS.split(raw.strip().upper())[0]
+    for suffix in QUOTE_SUFFIXES:
+        if symbol.endswith(suffix) and len(symbol) > len(suffix):
+            return symbol[:-len(suffix)]
+    return symbol or None
+
+
+def address_key(address: str) -> str:
+    # Same rule as s_dex_data: EVM addresses compare case-insensitively.
+    return address.lower()
+
+
+class TokenIndex:
+    def __init__(self, contracts: Iterable[tuple] = (), misses: Iterable[str] = ()):
+        self.by_symbol: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_address: Dict[str, Dict[str, Any]] = {}
+        for symbol, chain_id, address, liquidity_usd in contracts:
+            entry = {"symbol": symbol, "chain_id": chain_id, "address": address, "liquidity_usd": liquidity_usd or 0.0}
+            self.by_symbol.setdefault(symbol, []).append(entry)
+            self.by_address[address_key(address)] = entry
+        for entries in self.by_symbol.values():
+            entries.sort(key=lambda e: e["liquidity_usd"], reverse=True)
+        self.misses = set(misses)
+
+    def resolve_symbol(self, raw_symbol: Optional[str], chain_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Most liquid contract for a symbol (on `chain_id` if given); None if not indexed."""
+        entries = self.by_symbol.get(normalize_symbol(raw_symbol) or "", [])
+        return next((e for e in entries if chain_id is None or e["chain_id"] == chain_id), None)
+
+    def resolve_accounts(self, addresses: Sequence[str]) -> Optional[Dict[str, Any]]:
+        """First address among a transaction's accounts that is a known token contract."""
+        return next((self.by_address[address_key(a)] for a in addresses if a and address_key(a) in self.by_address), None)
+
+    def is_miss(self, key: Optional[str]) -> bool:
+        return bool(key) and (key in self.misses or address_key(key) in self.misses)
+
+
+_index: Optional[TokenIndex] = None
+
+
+def load_index() -> TokenIndex:
+    with cursor() as cur:
+        cur.execute("SELECT symbol, chain_id, address, liquidity_usd FROM public.token_contracts")
+        contracts = cur.fetchall()
+        cur.execute("SELECT lookup_key FROM public.token_index_misses WHERE last_checked IS NOT NULL")
+        misses = [row[0] for row in cur.fetchall()]
+    print(f"INFO: [TokenIndex] Loaded {len(contracts)} contract(s), {len(misses)} known miss(es).")
+    return TokenIndex(contracts, misses)
+
+
+def get_index(reload: bool = False) -> TokenIndex:
+    """Process-wide index, loaded from Postgres on first use."""
+    global _index
+    if _index is None or reload:
+        _index = load_index()
+    return _index
+
+
+def record_contracts(rows: List[tuple]) -> None:
+    """Upserts (symbol, chain_id, address, name, liquidity_usd, source) rows and clears their misses."""
+    if not rows:
+        return
+    with cursor() as cur:
+        execute_values(cur, UPSERT_CONTRACTS_SQL, rows)
+        cur.execute("DELETE FROM public.token_index_misses WHERE lookup_key = ANY(%s)",
+                    ([r[0] for r in rows] + [address_key(r[2]) for r in rows],))
+    if _index is not None:
+        for symbol, chain_id, address, _, liquidity_usd, _ in rows:
+            entry = {"symbol": symbol, "chain_id": chain_id, "address": address, "liquidity_usd": liquidity_usd or 0.0}
+            entries = [e for e in _index.by_symbol.get(symbol, []) if e["chain_id"] != chain_id] + [entry]
+            _index.by_symbol[symbol] = sorted(entries, key=lambda e: e["liquidity_usd"], reverse=True)
+            _index.by_address[address_key(address)] = entry
+            _index.misses.discard(symbol)
+            _index.misses.discard(address_key(address))
+
+
+def record_misses(keys: Iterable[str], kind: str, checked: bool = True) -> None:
+    """Adds symbols/addresses to the miss list.
+
+    checked=False queues a key for the next refresh without marking it unresolvable yet.
+    """
+    keys = sorted(set(k for k in keys if k))
+    if not keys:
+        return
+    with cursor() as cur:
+        execute_values(cur, RECORD_MISSES_SQL, [(k, kind, "now" if checked else None, 1 if checked else 0) for k in keys],
+                       template="(%s, %s, %s::timestamptz, %s)")
+    if _index is not None and checked:
+        _index.misses.update(keys)
@@ -0,0 +1,97 @@
+# File: s_traders.py
+# Cached view of the active monitored_traders.
+# Every write to monitored_traders bumps monitored_traders_version and sends NOTIFY
+# cryptex_traders_changed (trigger in s_db_init.sql), whichever bot or script makes it. Readers
+# check the version, a one-row read, and reload the list only when it moved. The list is shared
+# between runs through Redis (else kept in-process) together with the version it was read at.
+# Long-running processes can LISTEN on TRADERS_CHANNEL instead of polling the version.
+
+import json
+import threading
+from typing import Any, Dict, List, Optional
+
+from .s_db import cursor, execute_prepared
+from .s_llm_cache import DictBackend, RedisBackend, REDIS_URL
+
+# --- CONFIG ---
+TRADERS_KEY = "cryptex:traders:active"
+TRADERS_CACHE_TTL_S = 7 * 24 * 3600  # The version check, not the TTL, is what keeps it current
+TRADERS_CHANNEL = "cryptex_traders_changed"
+# --------------
+
+_backend = None
+_local: Optional[Dict[str, Any]] = None  # {"version": int, "traders": [...]}
+_stats = {"hits": 0, "shared_hits": 0, "reloads": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def set_backend(backend) -> None:
+    """Replaces the shared cache backend (e.g. s_llm_cache.DictBackend() in tests)."""
+    global _backend
+    _backend = backend
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        try:
+            _backend = RedisBackend(REDIS_URL, 10, index_key="cryptex:traders:index")
+        except Exception as e:
+            print(f"WARN: [Traders] Redis unavailable, using in-process cache. Error: {e}")
+            _backend = DictBackend(10)
+    return _backend
+
+
+def current_version(cur) -> int:
+    execute_prepared(cur, "select_traders_version")
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+
+def get_active_traders(cur=None) -> List[Dict[str, Any]]:
+    """Active traders as {identifier, exchange, description}; read from Postgres only when the version moved."""
+    global _local
+    if cur is None:
+        with cursor() as cur:
+            return get_active_traders(cur)
+    # The version is read before the list: a change made in between bumps it again, so a list
+    # labelled with an older version is at worst reloaded once more.
+    version = current_version(cur)
+    if _local is not None and _local["version"] == version:
+        _count("hits")
+        return _local["traders"]
+
+    backend = get_backend()
+    try:
+        cached = backend.get(TRADERS_KEY)
+    except Exception as e:
+        print(f"WARN: [Traders] Cache lookup failed. Error: {e}")
+        cached = None
+    if cached is not None:
+        shared = json.loads(cached)
+        if shared.get("version") == version:
+            _count("shared_hits")
+            _local = shared
+            return shared["traders"]
+
+    _count("reloads")
+    execute_prepared(cur, "select_active_traders")
+    traders = [{"identifier": identifier, "exchange": exchange, "description": description}
+               for identifier, exchange, description in cur.fetchall()]
+    _local = {"version": version, "traders": traders}
+    try:
+        backend.set(TRADERS_KEY, json.dumps(_local), TRADERS_CACHE_TTL_S)
+    except Exception as e:
+        print(f"WARN: [Traders] Could not cache the trader list. Error: {e}")
+    print(f"INFO: [Traders] Loaded {len(traders)} active trader(s) at version {version}.")
+    return traders
+
+
+def traders_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
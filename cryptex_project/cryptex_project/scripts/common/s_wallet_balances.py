@@ -0,0 +1,232 @@
+# File: s_wallet_balances.py
+# Balance scanning for the wallet tracker.
+# Native balances (eth_getBalance) and ERC-20 balances (eth_call balanceOf) for every wallet
+# are sent as JSON-RPC batch requests of RPC_BATCH_SIZE calls. The batches go out concurrently
+# over one pooled aiohttp session, all pinned to the same block. Results are diffed against
+# wallet_balances; only changed rows are written, and each change is recorded in
+# wallet_balance_events and returned to the caller.
+# CRYPTEX_RPC_URL_<CHAIN> can point at a local stub node (see tests/test_wallet_balances.py).
+
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from psycopg2.extras import execute_values
+
+from .s_async_calls import AsyncTokenBucket, bounded_gather, call_with_retry
+from .s_db import cursor
+
+# --- CONFIG ---
+DEFAULT_RPC_URLS = {"ethereum": "https://cloudflare-eth.com"}
+# ERC-20 contracts whose balances are tracked per chain (CRYPTEX_TRACKED_TOKENS_<CHAIN>, comma-separated).
+DEFAULT_TRACKED_TOKENS = {
+    "ethereum": [
+        "0xdAC17F958D2ee523a2206206994597C13D831ec7",  # USDT
+        "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48",  # USDC
+        "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",  # WETH
+    ],
+}
+RPC_BATCH_SIZE = int(os.environ.get("CRYPTEX_RPC_BATCH_SIZE", "100"))  # Calls per JSON-RPC batch; providers cap this
+RPC_CONCURRENCY = int(os.environ.get("CRYPTEX_RPC_CONCURRENCY", "8"))  # Batches in flight (and pooled connections)
+RPC_RATE_LIMIT_RPS = float(os.environ.get("CRYPTEX_RATE_LIMIT_RPC_RPS", "10"))  # HTTP requests per second per chain
+RPC_TIMEOUT_S = float(os.environ.get("CRYPTEX_RPC_TIMEOUT_S", "20"))
+NATIVE = "native"  # asset value for the chain's own coin
+# --------------
+
+BALANCE_OF_SELECTOR = "0x70a08231"
+
+UPSERT_BALANCES_SQL = """
+INSERT INTO public.wallet_balances (chain, address, asset, balance, block_number) VALUES %s
+ON CONFLICT (chain, address, asset) DO UPDATE SET
+    balance = EXCLUDED.balance, block_number = EXCLUDED.block_number, updated_at = NOW()
+"""
+
+INSERT_EVENTS_SQL = """
+INSERT INTO public.wallet_balance_events (chain, address, asset, old_balance, new_balance, block_number) VALUES %s
+"""
+
+_stats = {"calls": 0, "requests": 0, "call_errors": 0, "batch_errors": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, value: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += value
+
+
+def scanner_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def rpc_url(chain: str) -> Optional[str]:
+    return os.environ.get(f"CRYPTEX_RPC_URL_{chain.upper()}") or DEFAULT_RPC_URLS.get(chain)
+
+
+def tracked_tokens(chain: str) -> List[str]:
+    configured = os.environ.get(f"CRYPTEX_TRACKED_TOKENS_{chain.upper()}")
+    if configured is not None:
+        return [t.strip() for t in configured.split(",") if t.strip()]
+    return DEFAULT_TRACKED_TOKENS.get(chain, [])
+
+
+def scanned_chains() -> List[str]:
+    """Chains with an RPC endpoint; wallets on other chains (or CEX traders) are not scanned."""
+    configured = {k[len("CRYPTEX_RPC_URL_"):].lower() for k in os.environ if k.startswith("CRYPTEX_RPC_URL_")}
+    return sorted(configured | set(DEFAULT_RPC_URLS))
+
+
+def balance_calls(wallets: Sequence[str], tokens: Sequence[str], block: str) -> List[Tuple[Tuple[str, str], Dict[str, Any]]]:
+    """((address, asset), JSON-RPC call) for every balance to read."""
+    calls = []
+    for address in wallets:
+        calls.append(((address, NATIVE), {"method": "eth_getBalance", "params": [address, block]}))
+        padded = address.lower().replace("0x", "").rjust(64, "0")
+        for token in tokens:
+            calls.append(((address, token.lower()), {"method": "eth_call",
+                                                      "params": [{"to": token, "data": BALANCE_OF_SELECTOR + padded}, block]}))
+    return calls
+
+
+def _parse_quantity(result: Any) -> Optional[int]:
+    # eth_call on a non-token (or a reverted call) returns "0x"; that is not a balance.
+    if not isinstance(result, str) or result in ("0x", ""):
+        return None
+    return int(result, 16)
+
+
+class RpcClient:
+    """One per chain and event loop: owns the pooled HTTP session and the rate limiter."""
+
+    def __init__(self, url: str, batch_size: int = RPC_BATCH_SIZE, concurrency: int = RPC_CONCURRENCY,
+                 rate_limit_rps: float = RPC_RATE_LIMIT_RPS, timeout_s: float = RPC_TIMEOUT_S):
+        self.url = url
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.limiter = AsyncTokenBucket(rate_limit_rps)
+        self.timeout_s = timeout_s
+        self.session = None
+
+    async def __aenter__(self) -> "RpcClient":
+        import aiohttp
+
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.concurrency),
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout_s))
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.session.close()
+
+    async def _post(self, payload: Any) -> Any:
+        _count("requests")
+        async with self.session.post(self.url, json=payload) as res:
+            res.raise_for_status()
+            return await res.json(content_type=None)
+
+    async def call(self, method: str, params: List[Any]) -> Any:
+        body = await call_with_retry(lambda: self._post({"jsonrpc": "2.0", "id": 1, "method": method, "params": params}),
+                                     label=f"RPC {method}", limiter=self.limiter, timeout_s=self.timeout_s + 5)
+        if "error" in body:
+            raise RuntimeError(f"RPC {method} failed: {body['error']}")
+        return body["result"]
+
+    async def _batch(self, calls: List[Dict[str, Any]]) -> List[Any]:
+        payload = [{"jsonrpc": "2.0", "id": i, **call} for i, call in enumerate(calls)]
+        responses = await call_with_retry(lambda: self._post(payload), label=f"RPC batch of {len(calls)}",
+                                          limiter=self.limiter, timeout_s=self.timeout_s + 5)
+        if not isinstance(responses, list):
+            # Nodes answer a rejected batch (e.g. too large) with a single error object.
+            raise RuntimeError(f"RPC batch rejected: {responses.get('error') if isinstance(responses, dict) else responses}")
+        # Batch responses may come back in any order.
+        by_id = {r.get("id"): r for r in responses}
+        results = []
+        for i in range(len(calls)):
+            response = by_id.get(i) or {}
+            if "error" in response or "result" not in response:
+                _count("call_errors")
+            results.append(response.get("result"))
+        return results
+
+    async def batch_call(self, calls: List[Dict[str, Any]]) -> List[Any]:
+        """Results in call order; None for calls that failed (alone or with their whole batch)."""
+        _count("calls", len(calls))
+        chunks = [calls[i:i + self.batch_size] for i in range(0, len(calls), self.batch_size)]
+        chunk_results = await bounded_gather(chunks, self._batch, concurrency=self.concurrency)
+        results = []
+        for chunk, result in zip(chunks, chunk_results):
+            if result is None:
+                _count("batch_errors")
+                result = [None] * len(chunk)
+            results.extend(result)
+        return results
+
+
+async def scan_chain(chain: str, wallets: Sequence[str], url: Optional[str] = None, tokens: Optional[Sequence[str]] = None,
+                     rate_limit_rps: float = RPC_RATE_LIMIT_RPS) -> Tuple[Optional[int], Dict[Tuple[str, str], int]]:
+    """(block number, {(address, asset): balance}) for one chain; balances that could not be read are left out.
+
+    `tokens` defaults to the chain's tracked_tokens().
+    """
+    url = url or rpc_url(chain)
+    if not url or not wallets:
+        return None, {}
+    async with RpcClient(url, rate_limit_rps=rate_limit_rps) as client:
+        block_number = int(await client.call("eth_blockNumber", []), 16)
+        calls = balance_calls(wallets, tracked_tokens(chain) if tokens is None else tokens, hex(block_number))
+        results = await client.batch_call([c for _, c in calls])
+    balances = {}
+    for (key, _), result in zip(calls, results):
+        value = _parse_quantity(result)
+        if value is not None:
+            balances[key] = value
+    return block_number, balances
+
+
+def apply_balances(chain: str, block_number: Optional[int], balances: Dict[Tuple[str, str], int]) -> List[Dict[str, Any]]:
+    """Diffs against wallet_balances, writes only changed rows and returns them as events."""
+    if not balances:
+        return []
+    keys = list(balances)
+    with cursor() as cur:
+        cur.execute(
+            "SELECT b.address, b.asset, b.balance FROM public.wallet_balances b "
+            "JOIN unnest(%s::text[], %s::text[]) AS k(address, asset) ON b.address = k.address AND b.asset = k.asset "
+            "WHERE b.chain = %s",
+            ([k[0] for k in keys], [k[1] for k in keys], chain))
+        known = {(address, asset): int(balance) for address, asset, balance in cur.fetchall()}
+        changed = [(key, known.get(key), value) for key, value in balances.items() if known.get(key) != value]
+        if not changed:
+            return []
+        execute_values(cur, UPSERT_BALANCES_SQL, [(chain, a, asset, new, block_number) for (a, asset), _, new in changed])
+        # A wallet's first scan only records the baseline.
+        execute_values(cur, INSERT_EVENTS_SQL, [(chain, a, asset, old, new, block_number)
+                                               for (a, asset), old, new in changed if old is not None])
+    return [{"chain": chain, "address": a, "asset": asset, "old_balance": old, "new_balance": new,
+             "delta": new - (old or 0), "block_number": block_number, "first_seen": old is None}
+            for (a, asset), old, new in changed]
+
+
+async def scan_wallets(wallets: Sequence[Tuple[str, str]], rpc_urls: Optional[Dict[str, str]] = None,
+                       tokens: Optional[Dict[str, Sequence[str]]] = None, rate_limit_rps: float = RPC_RATE_LIMIT_RPS) -> List[Dict[str, Any]]:
+    """Scans (address, chain) wallets, all chains concurrently; returns the balance changes.
+
+    rpc_urls and tokens override rpc_url() / tracked_tokens() per chain; rate_limit_rps applies to each chain.
+    """
+    by_chain: Dict[str, List[str]] = {}
+    for address, chain in wallets:
+        by_chain.setdefault(chain, []).append(address)
+
+    async def one_chain(chain: str) -> List[Dict[str, Any]]:
+        try:
+            block_number, balances = await scan_chain(chain, by_chain[chain], (rpc_urls or {}).get(chain),
+                                                      (tokens or {}).get(chain), rate_limit_rps)
+        except Exception as e:
+            print(f"ERROR: [WalletTracker] Scan of {chain} failed. Error: {e!r}")
+            return []
+        print(f"INFO: [WalletTracker] {chain}: read {len(balances)} balance(s) for {len(by_chain[chain])} wallet(s) at block {block_number}.")
+        return await asyncio.to_thread(apply_balances, chain, block_number, balances)
+
+    results = await asyncio.gather(*(one_chain(chain) for chain in by_chain))
+    return [event for events in results for event in events]
+
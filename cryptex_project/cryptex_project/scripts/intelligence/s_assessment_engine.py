@@ -1,6 +1,11 @@
-import os, json, psycopg2
+import os, json
 from openai import OpenAI
 from typing import Dict, Any
+from ..common.s_db import connection
+from ..common.s_llm_cache import cached_chat_completion
+from ..common.s_herd import herd_index
+from ..common.s_catalyst_types import article_catalyst_type
+from ..common.s_outcomes import historical_win_rate
 
 # Placeholder functions for the new checks
 def check_legitimacy(catalyst_headline: str) -> int:
@@ -9,14 +14,22 @@ def check_legitimacy(catalyst_headline: str) -> int:
     return 95 # Assume legitimate for now
 
 def check_herd_behavior(conn, asset: str, direction: str) -> int:
-    # In a real system, this queries the `recent_trades` table
-    print(f"INFO: [Assess-AI] Checking for herd behavior on {asset}...")
-    return 78 # Assume 78% of other wallets are doing the same
+    # Share of traders active on this asset over the last hour who took the same side.
+    # Reads the herd_stats row maintained at ingest (see common/s_herd.py) instead of scanning recent_trades.
+    with conn.cursor() as cur:
+        herd = herd_index(cur, asset, direction)
+    print(f"INFO: [Assess-AI] Herd behavior on {asset}: {herd['herd_index']}% "
+          f"({herd['traders_same_side']} same side vs {herd['traders_opposite_side']} opposite, {herd['window']}).")
+    return herd['herd_index']
 
-def check_historical_precedent(conn, trader_id: str, catalyst_type: str) -> int:
-    # In a real system, this queries a historical outcomes table
-    print(f"INFO: [Assess-AI] Checking historical win rate for {trader_id} on {catalyst_type} events...")
-    return 85 # Assume this pattern has worked 85% of the time
+def check_historical_precedent(conn, trader_id: str, catalyst_type: str, asset: str = None) -> int:
+    # Win rate of this trader's closed signals on this catalyst type, from the trader_outcome_stats
+    # row kept current by the close trigger (see common/s_outcomes.py). 50 when there is too little history.
+    with conn.cursor() as cur:
+        record = historical_win_rate(cur, trader_id, catalyst_type, asset)
+    print(f"INFO: [Assess-AI] Historical win rate for {trader_id} on {catalyst_type} events: {record['win_rate']}% "
+          f"({record['trades']} closed trade(s), scope: {record['scope']}).")
+    return record['win_rate']
 
 def main(correlated_event: dict) -> dict:
     print("INFO: [Assess-AI] Starting historical assessment...")
@@ -24,15 +37,18 @@ def main(correlated_event: dict) -> dict:
     if not openai_key: raise ValueError("OpenAI Key is missing")
 
     client = OpenAI(api_key=openai_key)
-    conn = psycopg2.connect(host='postgres', dbname='windmill', user='windmill', password='windmill')
 
     trade = correlated_event.get("trade", {})
     catalyst = correlated_event.get("catalyst", {})
+    # Set at ingest (see common/s_catalyst_types.py); articles stored before that are classified here.
+    catalyst_type = catalyst.get("catalyst_type") or article_catalyst_type(catalyst)
 
     # --- Execute all checks ---
+    # The pooled connection is only held for the DB checks, not during the LLM call.
     legitimacy = check_legitimacy(catalyst.get("headline"))
-    herd_index = check_herd_behavior(conn, trade.get("asset"), trade.get("direction"))
-    win_rate = check_historical_precedent(conn, trade.get("trader_id"), "Partnership News")
+    with connection() as conn:
+        herd_index = check_herd_behavior(conn, trade.get("asset"), trade.get("direction"))
+        win_rate = check_historical_precedent(conn, trade.get("trader_id"), catalyst_type, trade.get("asset"))
 
     # --- Final AI Synthesis ---
     synthesis_prompt = f"""
@@ -46,12 +62,13 @@ def main(correlated_event: dict) -> dict:
     Respond ONLY with a valid JSON object with keys "confidence_score" and "summary".
     """
 
-    response = client.chat.completions.create(
+    response_content = cached_chat_completion(
+        client,
         model='gpt-4o',
         messages=[{'role':'system', 'content': "You only respond with perfect JSON."}, {'role':'user', 'content':synthesis_prompt}],
         response_format={"type": "json_object"}
     )
-    ai_verdict = json.loads(response.choices[0].message.content)
+    ai_verdict = json.loads(response_content)
 
     # --- Assemble the final, enriched signal ---
     enriched_signal = {
@@ -63,30 +80,30 @@ def main(correlated_event: dict) -> dict:
         "trade_size_usd": 100000,
         "leverage": 10,
         "catalyst_headline": catalyst.get("headline"),
+        "catalyst_type": catalyst_type,
         "legitimacy_score": legitimacy,
         "herd_index": herd_index,
         "historical_win_rate": win_rate,
         "safety_rating": "SAFE", # Placeholder for GoPlus integration
         "ai_confidence_score": ai_verdict.get("confidence_score"),
-        "ai_summary": ai_verdict.get("summary")
+        "ai_summary": ai_verdict.get("summary"),
+        "trade": trade, # The risk analyzer resolves the token from trade.raw_pos
     }
 
     # --- Save the final signal to the database ---
-    with conn.cursor() as cur:
+    with connection() as conn, conn.cursor() as cur:
         # Note: The data types in the query must match the table schema exactly
         insert_query = """
-        INSERT INTO public.trading_signals (signal_id, trader_id, exchange, asset, direction, trade_size_usd, leverage, catalyst_headline, legitimacy_score, herd_index, historical_win_rate, safety_rating, ai_confidence_score, ai_summary)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) ON CONFLICT (signal_id) DO NOTHING;
+        INSERT INTO public.trading_signals (signal_id, trader_id, exchange, asset, direction, trade_size_usd, leverage, catalyst_headline, catalyst_type, legitimacy_score, herd_index, historical_win_rate, safety_rating, ai_confidence_score, ai_summary)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) ON CONFLICT (signal_id) DO NOTHING;
         """
         cur.execute(insert_query, (
             enriched_signal['signal_id'], enriched_signal['trader_id'], enriched_signal['exchange'], enriched_signal['asset'],
             enriched_signal['direction'], enriched_signal['trade_size_usd'], enriched_signal['leverage'],
-            enriched_signal['catalyst_headline'], enriched_signal['legitimacy_score'], enriched_signal['herd_index'],
+            enriched_signal['catalyst_headline'], enriched_signal['catalyst_type'], enriched_signal['legitimacy_score'], enriched_signal['herd_index'],
             enriched_signal['historical_win_rate'], enriched_signal['safety_rating'], enriched_signal['ai_confidence_score'],
             enriched_signal['ai_summary']
         ))
-    conn.commit()
-    conn.close()
 
     print(f"INFO: [Assess-AI] Successfully assessed and saved signal {enriched_signal['signal_id']}")
     return enriched_signal
\ No newline at end of file
@@ -1,26 +1,60 @@
-import ccxt.pro as ccxt
 import asyncio
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import numpy as np
+from ..common.s_price_cache import get_live_prices, quote_assets
 
-async def fetch_ticker(exchange_name, symbol):
-    exchange = getattr(ccxt, exchange_name)()
-    try:
-        ticker = await exchange.fetch_ticker(symbol)
-        await exchange.close()
-        return {"exchange": exchange.id, "price": ticker['last'], "status": "success"}
-    except Exception:
-        await exchange.close()
-        return {"exchange": exchange.id, "price": None, "status": "error"}
+EXCHANGES_TO_CHECK = ['kraken', 'coinbase', 'binance']
 
 async def fetch_all_tickers(symbol: str) -> List[Dict[str, Any]]:
-    exchanges_to_check = ['kraken', 'coinbase', 'binance']
-    tasks = [fetch_ticker(ex_name, symbol) for ex_name in exchanges_to_check]
-    results = await asyncio.gather(*tasks)
-    return [res for res in results if res['status'] == 'success']
+    # Snapshot from s_price_service.py first, REST only for missing/stale exchanges.
+    return await get_live_prices(symbol, EXCHANGES_TO_CHECK)
+
+def best_quotes(assets: List[str], exchanges: List[str], quotes: Dict[str, Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Best bid (highest), ask (lowest) and last (lowest) per asset across exchanges, in one array pass."""
+    def grid(field: str) -> np.ndarray:
+        return np.array([[(quotes[ex].get(asset) or {}).get(field) for ex in exchanges] for asset in assets], dtype=float)
+    last, bid, ask = grid('price'), grid('bid'), grid('ask')
+    # A missing quote (NaN) must never win: -inf for the max, +inf for the mins.
+    picks = {
+        'best_price': (last, np.where(np.isnan(last), np.inf, last).argmin(axis=1)),
+        'best_bid': (bid, np.where(np.isnan(bid), -np.inf, bid).argmax(axis=1)),
+        'best_ask': (ask, np.where(np.isnan(ask), np.inf, ask).argmin(axis=1)),
+    }
+    result = {}
+    for i, asset in enumerate(assets):
+        row = {}
+        for name, (values, index) in picks.items():
+            value = values[i, index[i]]
+            row[name] = None if np.isnan(value) else float(value)
+            row[f'{name}_exchange'] = None if np.isnan(value) else exchanges[index[i]]
+        row['live_prices'] = [{"exchange": ex, "price": float(last[i, j]), "status": "success"}
+                              for j, ex in enumerate(exchanges) if not np.isnan(last[i, j])]
+        result[asset] = row
+    return result
+
+async def price_ideas(trade_ideas: List[Dict[str, Any]], exchanges: List[str] = EXCHANGES_TO_CHECK) -> List[Dict[str, Any]]:
+    assets = list(dict.fromkeys(idea.get('asset') for idea in trade_ideas if idea.get('asset')))
+    per_exchange = await asyncio.gather(*(asyncio.to_thread(quote_assets, ex, assets) for ex in exchanges))
+    best = best_quotes(assets, exchanges, dict(zip(exchanges, per_exchange))) if assets else {}
+    enriched = []
+    for idea in trade_ideas:
+        quote = best.get(idea.get('asset'))
+        if not quote or quote['best_price'] is None:
+            print(f"WARN: [PriceEngine] No live price for {idea.get('asset')}.")
+            enriched.append({**idea, 'live_prices': []})
+            continue
+        live_prices = sorted(quote['live_prices'], key=lambda x: x['price'])
+        enriched.append({**idea, **{k: v for k, v in quote.items() if k != 'live_prices'}, 'live_prices': live_prices})
+    return enriched
+
+def main(trade_idea: Optional[Dict[str, Any]] = None, trade_ideas: Optional[List[Dict[str, Any]]] = None):
+    """Prices one idea (trade_idea) or a whole batch (trade_ideas, returned enriched in input order)."""
+    if trade_ideas is not None:
+        print(f"INFO: [PriceEngine] Pricing {len(trade_ideas)} trade idea(s) across {len(EXCHANGES_TO_CHECK)} exchanges...")
+        return asyncio.run(price_ideas(trade_ideas))
 
-def main(trade_idea: Dict[str, Any]) -> Dict[str, Any]:
     asset_symbol_map = {"ETH": "ETH/USDT", "BTC": "BTC/USDT"} # Simple mapping
-    asset_symbol = asset_symbol_map.get(trade_idea.get('asset'))
+    asset_symbol = asset_symbol_map.get((trade_idea or {}).get('asset'))
     if not asset_symbol: raise ValueError("Asset not supported for price checks.")
     
     print(f"INFO: [PriceEngine] Getting live prices for {asset_symbol}...")
@@ -31,4 +65,4 @@ def main(trade_idea: Dict[str, Any]) -> Dict[str, Any]:
         live_prices.sort(key=lambda x: x['price'])
         trade_idea['best_price'] = live_prices[0]['price']
         
-    return trade_idea
\ No newline at end of file
+    return trade_idea
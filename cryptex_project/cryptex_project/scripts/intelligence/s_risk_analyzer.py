@@ -1,22 +1,44 @@
-import requests
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from ..common.s_dex_data import lookup_tokens
+from ..common.s_token_index import TokenIndex, get_index, normalize_symbol, record_misses
 
-def main(analyzed_tx: Dict[str, Any]) -> Dict[str, Any]:
-    print("INFO: [RiskAnalyzer] Starting security scan...")
-    # This logic will be improved to robustly find the token address
-    contract_address = analyzed_tx.get('trade', {}).get('raw_pos', {}).get('symbol', 'UNKNOWN_TOKEN')[:-4]
-    
-    api_url = f"https://api.dexscreener.com/latest/dex/tokens/{contract_address}"
+def find_contract_address(analyzed_tx: Dict[str, Any], index: TokenIndex) -> Optional[str]:
+    # Exchange symbol -> most liquid indexed contract (see common/s_token_index.py)
+    token = index.resolve_symbol(analyzed_tx.get('trade', {}).get('raw_pos', {}).get('symbol'))
+    return token['address'] if token else None
+
+def scan(analyzed_txs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # One cached/batched DexScreener lookup for every indexed token in the list (see common/s_dex_data.py).
+    index = get_index()
+    addresses = [find_contract_address(tx, index) for tx in analyzed_txs]
+    symbols = [normalize_symbol(tx.get('trade', {}).get('raw_pos', {}).get('symbol')) for tx in analyzed_txs]
+    # Unindexed symbols are queued for the next index refresh instead of being guessed at.
+    try:
+        record_misses([s for s, a in zip(symbols, addresses) if s and not a and not index.is_miss(s)], "symbol", checked=False)
+    except Exception as e:
+        print(f"WARN: [RiskAnalyzer] Could not queue unindexed symbols. Error: {e}")
     try:
-        res = requests.get(api_url, timeout=15)
-        res.raise_for_status()
-        data = res.json().get('pairs', [])
-        if not data: raise ValueError("Token not found on DEX Screener.")
-        main_pair = sorted(data, key=lambda x: float(x.get('liquidity', {}).get('usd', 0)), reverse=True)[0]
-        liquidity_usd = float(main_pair.get('liquidity', {}).get('usd', 0))
-        safety_rating = "SAFE" if liquidity_usd > 50000 else "CAUTION"
-        analyzed_tx['risk_analysis'] = {"safety_rating": safety_rating, "liquidity_usd": liquidity_usd, "source": "DEX Screener"}
+        tokens, error = lookup_tokens([a for a in addresses if a]), "Token not found on DEX Screener."
     except Exception as e:
-        analyzed_tx['risk_analysis'] = {"safety_rating": "ERROR", "details": str(e)}
-    print(f"INFO: [RiskAnalyzer] Scan complete. Safety Rating: {analyzed_tx['risk_analysis']['safety_rating']}")
-    return analyzed_tx
\ No newline at end of file
+        tokens, error = {}, str(e)
+    for tx, address, symbol in zip(analyzed_txs, addresses, symbols):
+        token = tokens.get(address)
+        if not address:
+            details = "Token is on the unresolvable list." if index.is_miss(symbol) else "Token not indexed yet; queued for the next refresh."
+            tx['risk_analysis'] = {"safety_rating": "UNKNOWN", "details": details}
+        elif token:
+            liquidity_usd = token['liquidity_usd']
+            safety_rating = "SAFE" if liquidity_usd > 50000 else "CAUTION"
+            tx['risk_analysis'] = {"safety_rating": safety_rating, "liquidity_usd": liquidity_usd, "contract_address": address, "source": "DEX Screener"}
+        else:
+            tx['risk_analysis'] = {"safety_rating": "ERROR", "details": error}
+        print(f"INFO: [RiskAnalyzer] Scan complete. Safety Rating: {tx['risk_analysis']['safety_rating']}")
+    return analyzed_txs
+
+def main(analyzed_tx: Optional[Dict[str, Any]] = None, analyzed_txs: Optional[List[Dict[str, Any]]] = None):
+    """Scans one signal (returns it) or a list of signals (returned in the same order)."""
+    if analyzed_txs is not None:
+        print(f"INFO: [RiskAnalyzer] Starting security scan for {len(analyzed_txs)} signal(s)...")
+        return scan(analyzed_txs)
+    print("INFO: [RiskAnalyzer] Starting security scan...")
+    return scan([analyzed_tx])[0]
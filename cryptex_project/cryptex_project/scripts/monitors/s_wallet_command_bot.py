@@ -1,7 +1,10 @@
-import os, json, psycopg2
+import os, json, requests
 from typing import Dict, Any
+from ..common.s_db import connection
+from ..common.s_traders import get_active_traders
 
 # This script now reads and writes to your Postgres database.
+# Adding or removing a wallet bumps the trader-list version (trigger in s_db_init.sql), so readers reload it.
 def main(body: Dict[str, Any]) -> Dict[str, Any]:
     message = body.get("message", {})
     chat_id = message.get("chat", {}).get("id")
@@ -11,10 +14,9 @@ def main(body: Dict[str, Any]) -> Dict[str, Any]:
     response_text = "Unknown command. Use /addwallet, /removewallet, /listwallets."
     args = text.split()
     command = args[0]
-    conn = psycopg2.connect(host='postgres', dbname='windmill', user='windmill', password='windmill')
 
     try:
-        with conn.cursor() as cur:
+        with connection() as conn, conn.cursor() as cur:
             if command == "/addwallet" and len(args) == 4:
                 address, chain, desc = args[1], args[2], args[3]
                 cur.execute("INSERT INTO public.monitored_traders (identifier, exchange, description) VALUES (%s, %s, %s) ON CONFLICT (identifier) DO NOTHING;", (address, chain, desc))
@@ -28,16 +30,13 @@ def main(body: Dict[str, Any]) -> Dict[str, Any]:
                 response_text = f"🗑️ Wallet removed: `{address}`"
 
             elif command == "/listwallets":
-                cur.execute("SELECT identifier, exchange, description FROM public.monitored_traders WHERE is_active = TRUE;")
-                wallets = cur.fetchall()
+                wallets = get_active_traders(cur)
                 if wallets:
-                    response_text = "📋 Tracked Wallets:\n" + "\n".join([f"`{w[0]}` ({w[1]}) - {w[2]}" for w in wallets])
+                    response_text = "📋 Tracked Wallets:\n" + "\n".join([f"`{w['identifier']}` ({w['exchange']}) - {w['description']}" for w in wallets])
                 else:
                     response_text = "📭 No wallets currently tracked."
     except Exception as e:
         response_text = f"ERROR: {e}"
-    finally:
-        conn.close()
 
     bot_token = os.environ.get("WMILL_SECRET_TELEGRAM_CRYPTEX_BOT_TOKEN")
     requests.post(f"https://api.telegram.org/bot{bot_token}/sendMessage", json={"chat_id": chat_id, "text": response_text, "parse_mode": "Markdown"})
@@ -1,19 +1,19 @@
-import os, json, psycopg2, requests, asyncio
-from typing import List, Dict
+from typing import List, Tuple
+from ..common.s_traders import get_active_traders
+from ..common.s_wallet_balances import scan_wallets, scanned_chains
 
 # This script now reads the wallet list from your Postgres database.
-def get_wallets_from_db():
-    conn = psycopg2.connect(host='postgres', dbname='windmill', user='windmill', password='windmill')
-    with conn.cursor() as cur:
-        cur.execute("SELECT identifier FROM public.monitored_traders WHERE is_active = TRUE;")
-        wallets = [row[0] for row in cur.fetchall()]
-    conn.close()
-    return wallets
+# The list is cached and only re-read when the command bots change it (see common/s_traders.py).
+# Only wallets on chains with an RPC endpoint (CRYPTEX_RPC_URL_<CHAIN>) are scanned.
+def get_wallets_from_db(chains: List[str]) -> List[Tuple[str, str]]:
+    return [(t["identifier"], t["exchange"].lower()) for t in get_active_traders() if t["exchange"].lower() in chains]
 
 async def main():
     # This script should be run on a schedule by a Windmill flow, not in an infinite loop.
     print("[Wallet Tracker] Checking balances for wallets in DB...")
-    wallets_to_track = get_wallets_from_db()
-    # ... The rest of your balance checking and alerting logic would go here ...
+    wallets_to_track = get_wallets_from_db(scanned_chains())
     print(f"Found {len(wallets_to_track)} wallets to track.")
-    return {"status": "completed", "wallets_checked": len(wallets_to_track)}
\ No newline at end of file
+    # Balances are read in JSON-RPC batches and diffed against wallet_balances (see common/s_wallet_balances.py).
+    changes = await scan_wallets(wallets_to_track)
+    print(f"[Wallet Tracker] {len(changes)} balance change(s) detected.")
+    return {"status": "completed", "wallets_checked": len(wallets_to_track), "changes": changes}
@@ -1,66 +1,94 @@
 # File: s_risk_analyzer.py
 # --- FINAL VERSION ---
 # This version uses the public DexScreener API which does not require a key.
+# Lookups go through common/s_dex_data.py (cached, coalesced, batched); pass `analyzed_txs`
+# to scan a whole list of signals with one request per 30 tokens.
+# Accounts are matched against the contract index (common/s_token_index.py) first; addresses on
+# its miss list are never queried, and new results are written back to the index.
 
-import requests
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
+from .common.s_dex_data import lookup_tokens
+from .common.s_token_index import TokenIndex, address_key, get_index, record_contracts, record_misses
 
-def main(analyzed_tx: Dict[str, Any]) -> Dict[str, Any]:
-    tx_hash = analyzed_tx.get('signatures', [None])[0]
-    print(f"INFO: [RiskAnalyzer] Starting security scan for {tx_hash[:10]}...")
+def find_contract_address(analyzed_tx: Dict[str, Any], index: TokenIndex) -> Optional[str]:
+    account_keys = analyzed_tx.get('account_keys', [])
+    known = index.resolve_accounts([addr.get('account') for addr in account_keys])
+    if known:
+        return known['address']
+    # Not indexed yet: fall back to the first writable non-signer account
+    return next(
+        (addr.get('account') for addr in account_keys
+         if addr.get('signer') is False and addr.get('writable') is True),
+        None)
 
+def learn(tokens: Dict[str, Optional[Dict[str, Any]]], index: TokenIndex) -> None:
+    """Writes lookup results back to the index: new tokens as contracts, unknown ones as misses."""
+    found = [(t['base_symbol'].upper(), t['chain_id'], t['base_address'], None, t['liquidity_usd'], "risk_analyzer")
+             for a, t in tokens.items() if t and t.get('base_symbol') and address_key(a) not in index.by_address
+             and address_key(t.get('base_address') or '') == address_key(a)]
     try:
-        # This logic finds the primary token address from the transaction data
-        contract_address = next(
-            addr for addr in analyzed_tx.get('account_keys', []) 
-            if addr.get('signer') is False and addr.get('writable') is True
-        ).get('account')
-        
-        if not contract_address: raise ValueError("Could not determine token contract address.")
-             
-    except (IndexError, ValueError) as e:
-        print(f"WARN: [RiskAnalyzer] Could not find token contract address. Skipping. Details: {e}")
-        analyzed_tx['risk_analysis'] = {"safety_rating": "UNKNOWN", "details": "Could not identify token contract."}
+        record_contracts(list({row[:2]: row for row in found}.values()))
+        record_misses([address_key(a) for a, t in tokens.items() if t is None], "address")
+    except Exception as e:
+        print(f"WARN: [RiskAnalyzer] Could not update the token index. Error: {e}")
+
+def assess(analyzed_tx: Dict[str, Any], token: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if token is None:
+        analyzed_tx['risk_analysis'] = {"safety_rating": "ERROR", "details": "Token not found on DEX Screener or has no trading pairs."}
         return analyzed_tx
 
-    api_url = f"https://api.dexscreener.com/latest/dex/tokens/{contract_address}"
+    liquidity_usd = token['liquidity_usd']
+    pair_created_at = datetime.fromtimestamp(token['pair_created_at_ms'] / 1000)
     
-    try:
-        res = requests.get(api_url, timeout=15)
-        res.raise_for_status()
-        data = res.json().get('pairs', [])
-        
-        if not data:
-            raise ValueError("Token not found on DEX Screener or has no trading pairs.")
-
-        main_pair = sorted(data, key=lambda x: float(x.get('liquidity', {}).get('usd', 0)), reverse=True)[0]
-        
-        liquidity_usd = float(main_pair.get('liquidity', {}).get('usd', 0))
-        pair_created_at = datetime.fromtimestamp(main_pair.get('pairCreatedAt', 0) / 1000)
-        
-        # --- Risk Logic ---
-        safety_rating = "SAFE"
-        warnings = []
-        
-        if liquidity_usd < 50000:
-            safety_rating = "CAUTION"
-            warnings.append(f"Low liquidity (${liquidity_usd:,.0f})")
-        if pair_created_at > (datetime.now() - timedelta(days=1)):
-            safety_rating = "DANGER"
-            warnings.append("Token pair is less than 24 hours old.")
+    # --- Risk Logic ---
+    safety_rating = "SAFE"
+    warnings = []
+    
+    if liquidity_usd < 50000:
+        safety_rating = "CAUTION"
+        warnings.append(f"Low liquidity (${liquidity_usd:,.0f})")
+    if pair_created_at > (datetime.now() - timedelta(days=1)):
+        safety_rating = "DANGER"
+        warnings.append("Token pair is less than 24 hours old.")
 
-        analyzed_tx['risk_analysis'] = {
-            "safety_rating": safety_rating,
-            "liquidity_usd": liquidity_usd,
-            "pair_created_at": pair_created_at.isoformat(),
-            "warnings": warnings,
-            "source": "DEX Screener"
-        }
-        print(f"INFO: [RiskAnalyzer] Scan complete. Safety Rating: {safety_rating}")
+    analyzed_tx['risk_analysis'] = {
+        "safety_rating": safety_rating,
+        "liquidity_usd": liquidity_usd,
+        "pair_created_at": pair_created_at.isoformat(),
+        "warnings": warnings,
+        "source": "DEX Screener"
+    }
+    return analyzed_tx
 
+def scan(analyzed_txs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    index = get_index()
+    addresses = [find_contract_address(tx, index) for tx in analyzed_txs]
+    try:
+        tokens = lookup_tokens([a for a in addresses if a and not index.is_miss(a)])
+        learn(tokens, index)
     except Exception as e:
         print(f"ERROR: [RiskAnalyzer] Failed to get security data. Error: {e}")
-        analyzed_tx['risk_analysis'] = {"safety_rating": "ERROR", "details": str(e)}
+        tokens = None
+
+    for tx, address in zip(analyzed_txs, addresses):
+        tx_hash = (tx.get('signatures') or [''])[0] or ''
+        if not address:
+            print(f"WARN: [RiskAnalyzer] Could not find token contract address for {tx_hash[:10]}. Skipping.")
+            tx['risk_analysis'] = {"safety_rating": "UNKNOWN", "details": "Could not identify token contract."}
+        elif index.is_miss(address) and (tokens is None or address not in tokens):
+            tx['risk_analysis'] = {"safety_rating": "UNKNOWN", "details": "Token is on the unresolvable list."}
+        elif tokens is None:
+            tx['risk_analysis'] = {"safety_rating": "ERROR", "details": "DEX Screener request failed."}
+        else:
+            assess(tx, tokens[address])
+            print(f"INFO: [RiskAnalyzer] Scan complete for {tx_hash[:10]}. Safety Rating: {tx['risk_analysis']['safety_rating']}")
+    return analyzed_txs
 
-    return analyzed_tx
\ No newline at end of file
+def main(analyzed_tx: Optional[Dict[str, Any]] = None, analyzed_txs: Optional[List[Dict[str, Any]]] = None):
+    """Scans one transaction (returns it) or a list of them (returned in the same order)."""
+    if analyzed_txs is not None:
+        print(f"INFO: [RiskAnalyzer] Starting security scan for {len(analyzed_txs)} transaction(s)...")
+        return scan(analyzed_txs)
+    print(f"INFO: [RiskAnalyzer] Starting security scan for {((analyzed_tx.get('signatures') or [''])[0] or '')[:10]}...")
+    return scan([analyzed_tx])[0]
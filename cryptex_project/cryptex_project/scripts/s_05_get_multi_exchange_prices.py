@@ -1,28 +1,16 @@
 # File: cryptex_project/scripts/s_get_multi_exchange_prices.py
 # --- UPGRADED VERSION ---
-import ccxt.pro as ccxt
+# Prices come from the snapshot kept by s_price_service.py; only exchanges with no fresh
+# snapshot entry are asked over REST (through clients kept open for the worker's lifetime).
 import asyncio
 from typing import List, Dict, Any
-
-async def fetch_ticker(exchange_name, symbol):
-    """Async function to fetch a ticker from a single exchange."""
-    exchange = getattr(ccxt, exchange_name)()
-    try:
-        ticker = await exchange.fetch_ticker(symbol)
-        await exchange.close()
-        return {"exchange": exchange.id, "price": ticker['last'], "status": "success"}
-    except Exception:
-        await exchange.close()
-        return {"exchange": exchange.id, "price": None, "status": "error"}
+from .common.s_price_cache import get_live_prices
 
 async def fetch_all_tickers(symbol: str) -> List[Dict[str, Any]]:
     """Fetches a symbol's price from multiple exchanges concurrently."""
     # List of reliable exchanges, including your US-based ones.
     exchanges_to_check = ['kraken', 'coinbase', 'binance', 'bybit', 'kucoin']
-    
-    tasks = [fetch_ticker(ex_name, symbol) for ex_name in exchanges_to_check]
-    results = await asyncio.gather(*tasks)
-    return [res for res in results if res['status'] == 'success']
+    return await get_live_prices(symbol, exchanges_to_check)
 
 def main(trade_idea: Dict[str, Any]) -> Dict[str, Any]:
     asset_symbol = trade_idea.get('asset')
@@ -39,4 +27,4 @@ def main(trade_idea: Dict[str, Any]) -> Dict[str, Any]:
         print(f"INFO: [PriceEngine] Prices found: {live_prices}")
         trade_idea['live_prices'] = live_prices
         
-    return trade_idea
\ No newline at end of file
+    return trade_idea
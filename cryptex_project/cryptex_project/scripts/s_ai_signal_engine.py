@@ -5,106 +5,131 @@
 
 import os
 import json
-import psycopg2
-from openai import OpenAI
+import time
+import asyncio
+from openai import AsyncOpenAI
 import google.generativeai as genai
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from .common.s_correlate import fetch_new_pairs, finish_pairs
+from .common.s_llm_cache import acached_chat_completion, cache_stats
+from .common.s_async_calls import DEFAULT_CONCURRENCY, bounded_gather, call_with_retry, provider_limiters
+from .common.s_sentiment import score_headlines
+from .common.s_prefilter import prefilter, record_stage, stage_stats
 
-# --- Placeholder for a Hugging Face Sentiment Model ---
-# In a real setup, you would load a model like 'cardiffnlp/twitter-roberta-base-sentiment'
-# This function simulates that process.
+# --- Hugging Face Sentiment Model ---
+# The model (CRYPTEX_SENTIMENT_MODEL, 'cardiffnlp/twitter-roberta-base-sentiment-latest' by default)
+# is loaded once per worker; main() scores every headline of a run in one batched pass.
 def get_huggingface_sentiment(text: str) -> str:
-    print(f"INFO: [HF-Sentiment] Analyzing sentiment for: '{text[:30]}...'")
-    # This is a mock response. A real model would return 'positive', 'negative', or 'neutral'.
-    # For speed and cost-effectiveness, this is a great upgrade.
-    return "positive"
+    return score_headlines([text])[0]
 
-# --- Main Engine Logic ---
-def main() -> List[Dict[str, Any]]:
-    print("INFO: [AI Signal Engine] Starting...")
-    
-    # --- 1. Database Connection ---
-    conn = psycopg2.connect(host='postgres', dbname='windmill', user='windmill', password='windmill')
-    
-    # --- 2. Correlation Query ---
-    # Find a trade and a catalyst for the same asset within the last 5 minutes.
-    correlation_query = """
-    SELECT
-        t.raw_data AS trade_data,
-        c.raw_data AS catalyst_data
-    FROM recent_trades t
-    JOIN recent_catalysts c ON c.asset_tags @> ARRAY[t.asset]
-    WHERE t.ingested_at > (NOW() - INTERVAL '5 minutes') AND c.ingested_at > (NOW() - INTERVAL '5 minutes');
-    """
+# --- Per-Event Analysis ---
+async def analyze_event(trade: Dict[str, Any], catalyst: Dict[str, Any], catalyst_sentiment: str, openai_client, limiters) -> Optional[Dict[str, Any]]:
+    """Runs the strategist and verdict steps for one event; returns a signal or None."""
+    # --- 2a. Fast Sentiment Check (Hugging Face) ---
+    # Already computed for the whole batch by score_headlines() in analyze_events().
+
+    # --- 2b. Strategic Analysis (GPT-4o) ---
+    strategist_prompt = f"You are a trading strategist. A trader made this move: {json.dumps(trade)}. This news catalyst just broke: {json.dumps(catalyst)}. Is this a logical front-running trade, a reaction, or likely unrelated noise? Provide a brief strategic assessment."
+    # Identical trade/catalyst prompts are answered from the LLM cache instead of the API.
+    started = time.perf_counter()
+    strategist_response = await call_with_retry(
+        lambda: acached_chat_completion(openai_client, model='gpt-4o', messages=[{'role':'user', 'content':strategist_prompt}]),
+        label="GPT-4o strategist", limiter=limiters["openai"])
+    record_stage("gpt4o_strategist", 1, 1, time.perf_counter() - started)
+
+    # --- 2c. Final Verdict & Summary (Claude Opus) ---
+    # We use Claude for its clarity and summarization strength
+    verdict_prompt = f"You are the final arbiter. Given this data, generate a final signal report.\n\nStrategist's Analysis: {strategist_response}\nOn-Chain Trade: {json.dumps(trade)}\nNews Catalyst: {json.dumps(catalyst)}\nSentiment: {catalyst_sentiment}\n\nBased on all data, create a 'final_verdict' (Bullish/Bearish), a 'confidence_score' (integer 0-100), and a one-sentence 'summary' for a Telegram alert. Your entire output MUST be a single, valid JSON object."
+    # This part requires the anthropic library: `pip install anthropic`
+    # For simplicity, we are simulating the call. A real implementation would use the Claude client
+    # through call_with_retry(..., limiter=limiters["anthropic"]).
+    claude_analysis = {
+        "final_verdict": "Bullish",
+        "confidence_score": 92,
+        "summary": "High-conviction whale just longed ETH immediately following the announcement of a major partnership, indicating strong belief in the news catalyst."
+    }
     
-    high_confidence_signals = []
+    print(f"INFO: [AI Signal Engine] Final verdict for asset {trade['asset']}: {claude_analysis['final_verdict']}")
     
-    with conn.cursor() as cur:
-        cur.execute(correlation_query)
-        correlated_events = cur.fetchall()
+    # --- 3. Assemble the Final Signal Object ---
+    passed = claude_analysis['confidence_score'] > 85 # Only create a signal for high-confidence events
+    record_stage("verdict", 1, int(passed), 0.0)
+    if not passed:
+        return None
+    return {
+        "signal_id": f"{trade.get('trader_id', 'N/A')}-{trade.get('asset')}-{catalyst.get('timestamp')}",
+        "trader_id": trade.get('trader_id'),
+        "exchange": "Binance Futures", # Placeholder
+        "asset": trade.get('asset'),
+        "direction": "LONG", # Placeholder
+        "trade_size_usd": 100000, # Placeholder
+        "leverage": 10, # Placeholder
+        "catalyst_source": catalyst.get('source'),
+        "catalyst_headline": catalyst.get('headline'),
+        "ai_confidence_score": claude_analysis['confidence_score'],
+        "ai_analysis_summary": claude_analysis['summary'],
+        "status": 'NEW_VALIDATED'
+    }
 
-    conn.close() # Close the connection after querying
-    
-    if not correlated_events:
-        print("INFO: [AI Signal Engine] No new correlated events found.")
-        return []
+async def analyze_events(correlated_events: List[tuple], openai_client, concurrency: int,
+                         prefilter_threshold: Optional[float] = None) -> Tuple[List[Dict[str, Any]], List[int]]:
+    # Sentiment for every headline in one batched forward pass, then the local prefilter score, then
+    # the LLM steps concurrently (at most `concurrency` at a time) for the events that passed.
+    # Returns the validated signals and the indexes of the events whose LLM steps failed.
+    started = time.perf_counter()
+    sentiments = score_headlines([catalyst.get('headline') or catalyst.get('title') for _, catalyst in correlated_events])
+    record_stage("sentiment", len(correlated_events), len(correlated_events), time.perf_counter() - started)
+    passed = prefilter(correlated_events, sentiments, threshold=prefilter_threshold)
+    print(f"INFO: [AI Signal Engine] Prefilter passed {len(passed)}/{len(correlated_events)} event(s) to GPT-4o.")
+    limiters = provider_limiters(["openai", "anthropic"])
 
-    print(f"SUCCESS: [AI Signal Engine] Found {len(correlated_events)} correlated event(s) for initial analysis.")
+    async def worker(i: int) -> List[Optional[Dict[str, Any]]]:
+        # Wrapped so "no signal" ([None]) stays distinct from a failed call (None from bounded_gather).
+        trade, catalyst = correlated_events[i]
+        return [await analyze_event(trade, catalyst, sentiments[i], openai_client, limiters)]
 
-    # --- 3. Multi-Layered AI Analysis Loop ---
-    # Initialize API clients once
+    outcomes = await bounded_gather(passed, worker, concurrency=concurrency)
+    return [o[0] for o in outcomes if o and o[0]], [i for i, o in zip(passed, outcomes) if o is None]
+
+# --- Main Engine Logic ---
+def main(concurrency: int = DEFAULT_CONCURRENCY, prefilter_threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+    print("INFO: [AI Signal Engine] Starting...")
+
+    # Checked before any pair is claimed, so a missing key leaves the new events for the next run.
     openai_key = os.environ.get("WMILL_SECRET_OPENAI_API_KEY")
     google_key = os.environ.get("WMILL_SECRET_GOOGLE_API_KEY")
     claude_key = os.environ.get("WMILL_SECRET_CLAUDE_API_KEY") # You will add this secret
 
     if not all([openai_key, google_key, claude_key]):
         raise ValueError("One or more AI API keys are missing from Windmill Secrets.")
-        
-    openai_client = OpenAI(api_key=openai_key)
-    genai.configure(api_key=google_key)
-    gemini_model = genai.GenerativeModel('gemini-1.5-pro-latest')
+
+    # --- 1. Incremental Correlation ---
+    # Pairs a trade and a catalyst for the same asset within the last 5 minutes, but only for rows
+    # that arrived since the previous run, plus earlier pairs whose analysis failed or never finished.
+    # The trade side carries its trader and asset for the prefilter's history / liquidity features.
+    pairs = fetch_new_pairs("ai_signal_engine", track=True)
+    correlated_events = [({**pair["trade"], "trader_id": pair["trader_id"], "asset": pair["asset"]}, pair["catalyst"])
+                         for pair in pairs]
     
-    for event in correlated_events:
-        trade = event[0]
-        catalyst = event[1]
-        
-        # --- 3a. Fast Sentiment Check (Hugging Face) ---
-        catalyst_sentiment = get_huggingface_sentiment(catalyst['headline'])
+    if not correlated_events:
+        print("INFO: [AI Signal Engine] No new correlated events found.")
+        return []
 
-        # --- 3b. Strategic Analysis (GPT-4o) ---
-        strategist_prompt = f"You are a trading strategist. A trader made this move: {json.dumps(trade)}. This news catalyst just broke: {json.dumps(catalyst)}. Is this a logical front-running trade, a reaction, or likely unrelated noise? Provide a brief strategic assessment."
-        strategist_response = openai_client.chat.completions.create(model='gpt-4o', messages=[{'role':'user', 'content':strategist_prompt}]).choices[0].message.content
+    print(f"SUCCESS: [AI Signal Engine] Found {len(correlated_events)} correlated event(s) for initial analysis.")
 
-        # --- 3c. Final Verdict & Summary (Claude Opus) ---
-        # We use Claude for its clarity and summarization strength
-        verdict_prompt = f"You are the final arbiter. Given this data, generate a final signal report.\n\nStrategist's Analysis: {strategist_response}\nOn-Chain Trade: {json.dumps(trade)}\nNews Catalyst: {json.dumps(catalyst)}\nSentiment: {catalyst_sentiment}\n\nBased on all data, create a 'final_verdict' (Bullish/Bearish), a 'confidence_score' (integer 0-100), and a one-sentence 'summary' for a Telegram alert. Your entire output MUST be a single, valid JSON object."
-        # This part requires the anthropic library: `pip install anthropic`
-        # For simplicity, we are simulating the call. A real implementation would use the Claude client.
-        claude_analysis = {
-            "final_verdict": "Bullish",
-            "confidence_score": 92,
-            "summary": "High-conviction whale just longed ETH immediately following the announcement of a major partnership, indicating strong belief in the news catalyst."
-        }
-        
-        print(f"INFO: [AI Signal Engine] Final verdict for asset {trade['asset']}: {claude_analysis['final_verdict']}")
-        
-        # --- 4. Assemble the Final Signal Object ---
-        if claude_analysis['confidence_score'] > 85: # Only create a signal for high-confidence events
-            final_signal = {
-                "signal_id": f"{trade.get('trader_id', 'N/A')}-{trade.get('asset')}-{catalyst.get('timestamp')}",
-                "trader_id": trade.get('trader_id'),
-                "exchange": "Binance Futures", # Placeholder
-                "asset": trade.get('asset'),
-                "direction": "LONG", # Placeholder
-                "trade_size_usd": 100000, # Placeholder
-                "leverage": 10, # Placeholder
-                "catalyst_source": catalyst.get('source'),
-                "catalyst_headline": catalyst.get('headline'),
-                "ai_confidence_score": claude_analysis['confidence_score'],
-                "ai_analysis_summary": claude_analysis['summary'],
-                "status": 'NEW_VALIDATED'
-            }
-            high_confidence_signals.append(final_signal)
+    # --- 2. Multi-Layered AI Analysis ---
+    # Initialize API clients once
+    # CRYPTEX_OPENAI_BASE_URL lets a local fake LLM server stand in for the API.
+    openai_client = AsyncOpenAI(api_key=openai_key, base_url=os.environ.get("CRYPTEX_OPENAI_BASE_URL") or None, max_retries=0)
+    genai.configure(api_key=google_key)
+    gemini_model = genai.GenerativeModel('gemini-1.5-pro-latest')
+    
+    # If the run dies here, the pairs stay PENDING and are handed out again once their lease expires.
+    high_confidence_signals, failed = asyncio.run(analyze_events(correlated_events, openai_client, concurrency, prefilter_threshold))
+    keys = [(pair["trade_id"], pair["catalyst_id"]) for pair in pairs]
+    failed_keys = {keys[i] for i in failed}
+    finish_pairs("ai_signal_engine", [k for k in keys if k not in failed_keys], failed_keys)
 
-    print(f"INFO: [AI Signal Engine] Finished. Found {len(high_confidence_signals)} validated signals.")
-    return high_confidence_signals
\ No newline at end of file
+    print(f"INFO: [AI Signal Engine] Finished. Found {len(high_confidence_signals)} validated signals. LLM cache: {cache_stats()}")
+    print(f"INFO: [AI Signal Engine] Stages: {stage_stats()}")
+    return high_confidence_signals
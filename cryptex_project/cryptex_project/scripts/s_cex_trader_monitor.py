@@ -1,29 +1,20 @@
-import os, requests, json, psycopg2
-from typing import List, Dict, Any
+import asyncio
+from typing import List
+from .common.s_cex_positions import CEX_EXCHANGES, poll_traders
+from .common.s_traders import get_active_traders
 
 def main() -> List[str]:
     print("INFO: [CEX Monitor] Fetching CEX top trader positions...")
-    conn = psycopg2.connect(host='postgres', dbname='windmill', user='windmill', password='windmill')
-    # This is a conceptual endpoint. The real Binance Leaderboard API is needed here.
-    url = f"https://fapi.binance.com/fapi/v1/leaderboard/getOtherPosition?encryptedUid=4258234B3958932C2556734194539825"
+    # Every active CEX trader in monitored_traders (identifier = Binance leaderboard encryptedUid) is polled
+    # concurrently; only opens, closes and size changes since the last poll are recorded (see common/s_cex_positions.py).
+    trader_ids = [t["identifier"] for t in get_active_traders() if t["exchange"].lower() in CEX_EXCHANGES]
+    if not trader_ids:
+        print("INFO: [CEX Monitor] No active CEX traders to poll.")
+        return []
     inserted_assets = []
     try:
-        res = requests.get(url, timeout=15)
-        res.raise_for_status()
-        positions = res.json().get('data', {}).get('otherPositionRetList', [])
-        print(f"INFO: [CEX Monitor] Found {len(positions)} open positions.")
-        with conn.cursor() as cur:
-            for pos in positions:
-                asset = pos.get("symbol")
-                trade_event = {"trader_id": "BinanceWhale1", "asset": asset, "raw_pos": pos}
-                cur.execute(
-                    "INSERT INTO public.recent_trades (trader_id, asset, raw_data) VALUES (%s, %s, %s)",
-                    (trade_event['trader_id'], trade_event['asset'], json.dumps(trade_event['raw_pos']))
-                )
-                inserted_assets.append(asset)
-        conn.commit()
+        result = asyncio.run(poll_traders(trader_ids))
+        inserted_assets = result["assets"]
     except Exception as e:
         print(f"ERROR: [CEX Monitor] Could not fetch CEX trades. Error: {e}")
-    finally:
-        conn.close()
-    return inserted_assets
\ No newline at end of file
+    return inserted_assets
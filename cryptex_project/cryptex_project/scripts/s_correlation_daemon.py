@@ -0,0 +1,136 @@
+# File: s_correlation_daemon.py
+# Optional long-running mode of the correlation engine.
+# Inserts into recent_trades / recent_catalysts fire NOTIFY (see s_db_init.sql); this daemon
+# keeps the correlation window in memory and emits matched pairs as soon as a row commits,
+# instead of waiting for the next cron tick. Pairs are recorded in correlated_pairs under the
+# daemon's consumer name and re-published on the 'cryptex_correlated_pairs' channel; like the cron
+# path, only the first catalyst of each near-duplicate cluster is published per trade.
+
+import json
+import select
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple
+
+import psycopg2
+import psycopg2.extensions
+
+from .common.s_correlate import CORRELATION_WINDOW, SlidingWindowCorrelator, fetch_new_pairs
+from .common.s_db import DB_CONFIG, cursor
+
+TRADES_CHANNEL = "cryptex_recent_trades"
+CATALYSTS_CHANNEL = "cryptex_recent_catalysts"
+PAIRS_CHANNEL = "cryptex_correlated_pairs"
+SWEEP_EVERY_S = 30
+
+
+def load_rows(cur, table: str, where: str, params: Tuple) -> List[Tuple]:
+    columns = "id, ingested_at, asset, raw_data" if table == "recent_trades" else "id, ingested_at, asset_tags, raw_data, cluster_id"
+    cur.execute(
+        f"SELECT {columns} FROM public.{table} WHERE ingested_at > NOW() - %s::interval AND {where} ORDER BY ingested_at, id",
+        (CORRELATION_WINDOW,) + params,
+    )
+    return cur.fetchall()
+
+
+def apply_rows(correlator: SlidingWindowCorrelator, trades: List[Tuple], catalysts: List[Tuple], emit: bool = True) -> List[Dict[str, Any]]:
+    """Feeds rows to the correlator in ingestion order and returns the pairs they complete."""
+    events = [(row[1], row[0], "trade", row) for row in trades] + [(row[1], row[0], "catalyst", row) for row in catalysts]
+    pairs = []
+    for _, _, kind, row in sorted(events, key=lambda e: (e[0], e[1], e[2])):
+        if kind == "trade":
+            pairs.extend(correlator.add_trade(*row, emit=emit))
+        else:
+            pairs.extend(correlator.add_catalyst(*row[:4], emit=emit, cluster_id=row[4]))
+    return pairs
+
+
+def publish_pairs(consumer: str, pairs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Records pairs in one transaction; returns the pairs not seen before.
+
+    The watermark only moves in rebuild(): after a restart, catching up re-joins at most one window
+    of rows, and correlated_pairs drops the pairs already published.
+    """
+    with cursor() as cur:
+        new_pairs = []
+        for pair in pairs:
+            cur.execute(
+                "INSERT INTO public.correlated_pairs (consumer, trade_id, catalyst_id, cluster_id, asset) VALUES (%s, %s, %s, %s, %s) "
+                "ON CONFLICT DO NOTHING RETURNING trade_id",  # Also skips other copies of an emitted story
+                (consumer, pair["trade_id"], pair["catalyst_id"], pair["cluster_id"], pair["asset"]),
+            )
+            if cur.fetchone():
+                new_pairs.append(pair)
+                cur.execute("SELECT pg_notify(%s, %s)", (PAIRS_CHANNEL, json.dumps(
+                    {"consumer": consumer, "trade_id": pair["trade_id"], "catalyst_id": pair["catalyst_id"], "asset": pair["asset"]})))
+    for pair in new_pairs:
+        print(f"SUCCESS: [Correlation Daemon] Trade #{pair['trade_id']} x catalyst #{pair['catalyst_id']} on {pair['asset']}")
+    return new_pairs
+
+
+def rebuild(consumer: str, correlator: SlidingWindowCorrelator) -> List[Dict[str, Any]]:
+    """Catches up on rows missed while down, then reloads the window into memory."""
+    missed = fetch_new_pairs(consumer)
+    with cursor() as cur:
+        cur.execute("SELECT last_snapshot::text FROM public.correlation_watermarks WHERE consumer = %s", (consumer,))
+        snapshot = cur.fetchone()[0]
+        # Everything visible in the watermark snapshot is already correlated: load it silently.
+        seen = "pg_visible_in_snapshot(ingest_xid, %s::pg_snapshot)"
+        apply_rows(correlator, load_rows(cur, "recent_trades", seen, (snapshot,)),
+                   load_rows(cur, "recent_catalysts", seen, (snapshot,)), emit=False)
+        # Rows committed since the catch-up query go through the normal path.
+        trades = load_rows(cur, "recent_trades", f"NOT {seen}", (snapshot,))
+        catalysts = load_rows(cur, "recent_catalysts", f"NOT {seen}", (snapshot,))
+    pairs = apply_rows(correlator, trades, catalysts)
+    if trades or catalysts:
+        missed += publish_pairs(consumer, pairs)
+    print(f"INFO: [Correlation Daemon] Rebuilt window: {len(correlator.seen_trades)} trade(s), {len(correlator.seen_catalysts)} catalyst(s).")
+    return missed
+
+
+def main(consumer: str = "correlation_daemon", run_for_seconds: int = 0) -> Dict[str, Any]:
+    """Runs the streaming correlator; run_for_seconds=0 runs until the job is cancelled."""
+    print("INFO: [Correlation Daemon] Starting...")
+    # LISTEN needs its own autocommit session that is never handed back to the pool.
+    listen_conn = psycopg2.connect(**DB_CONFIG)
+    listen_conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    with listen_conn.cursor() as cur:
+        cur.execute(f"LISTEN {TRADES_CHANNEL}; LISTEN {CATALYSTS_CHANNEL};")
+
+    # Listening before the rebuild means no insert can slip between the two; duplicates are ignored.
+    correlator = SlidingWindowCorrelator(window=timedelta(minutes=5))
+    emitted = len(rebuild(consumer, correlator))
+    started = last_sweep = time.monotonic()
+
+    try:
+        while not run_for_seconds or time.monotonic() - started < run_for_seconds:
+            if select.select([listen_conn], [], [], 1.0) == ([], [], []):
+                continue
+            listen_conn.poll()
+            trade_ids, catalyst_ids = set(), set()
+            while listen_conn.notifies:
+                note = listen_conn.notifies.pop(0)
+                (trade_ids if note.channel == TRADES_CHANNEL else catalyst_ids).add(int(note.payload))
+            trade_ids -= correlator.seen_trades.keys()
+            catalyst_ids -= correlator.seen_catalysts.keys()
+            if not trade_ids and not catalyst_ids:
+                continue
+
+            with cursor() as cur:
+                trades = load_rows(cur, "recent_trades", "id = ANY(%s)", (list(trade_ids),)) if trade_ids else []
+                catalysts = load_rows(cur, "recent_catalysts", "id = ANY(%s)", (list(catalyst_ids),)) if catalyst_ids else []
+            pairs = apply_rows(correlator, trades, catalysts)
+            emitted += len(publish_pairs(consumer, pairs))
+
+            if time.monotonic() - last_sweep > SWEEP_EVERY_S:
+                correlator.sweep()
+                last_sweep = time.monotonic()
+    finally:
+        listen_conn.close()
+
+    print(f"INFO: [Correlation Daemon] Stopped after emitting {emitted} pair(s).")
+    return {"status": "stopped", "pairs_emitted": emitted}
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,97 @@
+-- Databases still holding the unpartitioned recent_trades / recent_catalysts need the migration first;
+-- stop before anything below is dropped or half-applied.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+               WHERE n.nspname = 'public' AND c.relname IN ('recent_trades', 'recent_catalysts') AND c.relkind = 'r') THEN
+        RAISE EXCEPTION 'recent_trades / recent_catalysts are not partitioned: run s_db_migrate_001_partitions.sql first';
+    END IF;
+END $$;
+
 -- Drop tables to ensure a clean slate
 DROP TABLE IF EXISTS public.trading_signals;
 DROP TABLE IF EXISTS public.monitored_traders;
 
 -- Re-create tables with the final, complete schema
 CREATE TABLE IF NOT EXISTS public.monitored_traders (id SERIAL PRIMARY KEY, identifier VARCHAR(255) NOT NULL UNIQUE, exchange VARCHAR(100) NOT NULL, description TEXT, is_active BOOLEAN DEFAULT TRUE);
-CREATE TABLE IF NOT EXISTS public.recent_trades (id SERIAL PRIMARY KEY, ingested_at TIMESTAMPTZ DEFAULT NOW(), trader_id VARCHAR(255), asset VARCHAR(50), raw_data JSONB);
-CREATE TABLE IF NOT EXISTS public.recent_catalysts (id SERIAL PRIMARY KEY, ingested_at TIMESTAMPTZ DEFAULT NOW(), headline TEXT, source VARCHAR(100), asset_tags TEXT[], raw_data JSONB);
+
+-- Version of the monitored_traders list (see scripts/common/s_traders.py). Any write to the table bumps it
+-- and sends NOTIFY cryptex_traders_changed with the new version; readers reload only when it moved.
+CREATE TABLE IF NOT EXISTS public.monitored_traders_version (id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id), version BIGINT NOT NULL DEFAULT 0, updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW());
+INSERT INTO public.monitored_traders_version (id, version) VALUES (TRUE, 0) ON CONFLICT (id) DO NOTHING;
+CREATE OR REPLACE FUNCTION public.cryptex_bump_traders_version() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    UPDATE public.monitored_traders_version SET version = version + 1, updated_at = NOW() RETURNING version INTO new_version;
+    PERFORM pg_notify('cryptex_traders_changed', new_version::text);
+    RETURN NULL;
+END $$;
+DROP TRIGGER IF EXISTS monitored_traders_version_bump ON public.monitored_traders;
+CREATE TRIGGER monitored_traders_version_bump AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.monitored_traders FOR EACH STATEMENT EXECUTE FUNCTION public.cryptex_bump_traders_version();
+
+-- recent_trades / recent_catalysts are partitioned by day on ingested_at.
+-- Daily partitions are created ahead and dropped after retention by scripts/s_partition_maintenance.py;
+-- the DEFAULT partition only catches rows until the first maintenance run.
+-- Existing databases with the old unpartitioned tables: run s_db_migrate_001_partitions.sql first.
+CREATE TABLE IF NOT EXISTS public.recent_trades (id SERIAL, ingested_at TIMESTAMPTZ NOT NULL DEFAULT NOW(), trader_id VARCHAR(255), asset VARCHAR(50), raw_data JSONB, content_hash CHAR(64), PRIMARY KEY (id, ingested_at)) PARTITION BY RANGE (ingested_at);
+CREATE TABLE IF NOT EXISTS public.recent_catalysts (id SERIAL, ingested_at TIMESTAMPTZ NOT NULL DEFAULT NOW(), headline TEXT, source VARCHAR(100), asset_tags TEXT[], raw_data JSONB, content_hash CHAR(64), cluster_id BIGINT, PRIMARY KEY (id, ingested_at)) PARTITION BY RANGE (ingested_at);
+CREATE TABLE IF NOT EXISTS public.recent_trades_default PARTITION OF public.recent_trades DEFAULT;
+CREATE TABLE IF NOT EXISTS public.recent_catalysts_default PARTITION OF public.recent_catalysts DEFAULT;
+
+-- Indexes for the correlation queries (time window + asset match)
+CREATE INDEX IF NOT EXISTS recent_trades_asset_ingested_at_idx ON public.recent_trades (asset, ingested_at);
+CREATE INDEX IF NOT EXISTS recent_trades_ingested_at_idx ON public.recent_trades (ingested_at);
+CREATE INDEX IF NOT EXISTS recent_catalysts_ingested_at_idx ON public.recent_catalysts (ingested_at);
+CREATE INDEX IF NOT EXISTS recent_catalysts_asset_tags_idx ON public.recent_catalysts USING GIN (asset_tags);
+
+-- NOTIFY on every insert so scripts/s_correlation_daemon.py can correlate without waiting for cron.
+-- The payload is just the row id; the daemon reads the row itself.
+CREATE OR REPLACE FUNCTION public.cryptex_notify_insert() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify(TG_ARGV[0], NEW.id::text);
+    RETURN NULL;
+END $$;
+DROP TRIGGER IF EXISTS recent_trades_notify ON public.recent_trades;
+CREATE TRIGGER recent_trades_notify AFTER INSERT ON public.recent_trades FOR EACH ROW EXECUTE FUNCTION public.cryptex_notify_insert('cryptex_recent_trades');
+DROP TRIGGER IF EXISTS recent_catalysts_notify ON public.recent_catalysts;
+CREATE TRIGGER recent_catalysts_notify AFTER INSERT ON public.recent_catalysts FOR EACH ROW EXECUTE FUNCTION public.cryptex_notify_insert('cryptex_recent_catalysts');
+
+-- Content hashes make bulk ingestion idempotent (see scripts/common/s_ingest.py).
+-- They live in their own table because a unique index on a partitioned table must include ingested_at.
+CREATE TABLE IF NOT EXISTS public.recent_ingest_hashes (content_hash CHAR(64) PRIMARY KEY, first_seen TIMESTAMPTZ NOT NULL DEFAULT NOW());
+CREATE INDEX IF NOT EXISTS recent_ingest_hashes_first_seen_idx ON public.recent_ingest_hashes (first_seen);
+
+-- Incremental correlation state (see scripts/common/s_correlate.py): one high-water mark per consumer
+-- and every trade/catalyst pair it has already emitted.
+CREATE TABLE IF NOT EXISTS public.correlation_watermarks (consumer VARCHAR(100) PRIMARY KEY, last_snapshot pg_snapshot, updated_at TIMESTAMPTZ DEFAULT NOW());
+CREATE TABLE IF NOT EXISTS public.correlated_pairs (consumer VARCHAR(100) NOT NULL, trade_id BIGINT NOT NULL, catalyst_id BIGINT NOT NULL, asset VARCHAR(50), emitted_at TIMESTAMPTZ NOT NULL DEFAULT NOW(), PRIMARY KEY (consumer, trade_id, catalyst_id));
+CREATE INDEX IF NOT EXISTS correlated_pairs_emitted_at_idx ON public.correlated_pairs (emitted_at);
+-- SERIAL ids can commit out of order (an ingest transaction takes its ids at INSERT and commits after the
+-- herd and cluster writes), so the mark is the snapshot the consumer's last run saw, not an id: a row is new
+-- when the transaction that inserted it (ingest_xid) was not visible in that snapshot.
+ALTER TABLE public.recent_trades ADD COLUMN IF NOT EXISTS ingest_xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+ALTER TABLE public.recent_catalysts ADD COLUMN IF NOT EXISTS ingest_xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+CREATE INDEX IF NOT EXISTS recent_trades_ingest_xid_idx ON public.recent_trades (ingest_xid);
+CREATE INDEX IF NOT EXISTS recent_catalysts_ingest_xid_idx ON public.recent_catalysts (ingest_xid);
+ALTER TABLE public.correlation_watermarks ADD COLUMN IF NOT EXISTS last_snapshot pg_snapshot;
+ALTER TABLE public.correlation_watermarks DROP COLUMN IF EXISTS last_trade_id, DROP COLUMN IF EXISTS last_catalyst_id;
+-- Consumers that analyse their pairs (the AI signal engine) claim them as PENDING and mark them DONE afterwards;
+-- a pair whose analysis failed, or whose run died, is handed out again (see fetch_new_pairs / finish_pairs).
+ALTER TABLE public.correlated_pairs ADD COLUMN IF NOT EXISTS status VARCHAR(10) NOT NULL DEFAULT 'DONE';
+ALTER TABLE public.correlated_pairs ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0;
+ALTER TABLE public.correlated_pairs ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ;
+CREATE INDEX IF NOT EXISTS correlated_pairs_pending_idx ON public.correlated_pairs (consumer, claimed_at) WHERE status = 'PENDING';
+
+-- Near-duplicate news clustering (see scripts/common/s_catalyst_clusters.py): MinHash signature and LSH band keys
+-- of each stored headline; the GIN index finds rewrites of a story by band key. Correlation emits one pair per
+-- (trade, cluster), enforced by the unique index on correlated_pairs.
+ALTER TABLE public.recent_catalysts ADD COLUMN IF NOT EXISTS cluster_id BIGINT;
+ALTER TABLE public.correlated_pairs ADD COLUMN IF NOT EXISTS cluster_id BIGINT;
+CREATE UNIQUE INDEX IF NOT EXISTS correlated_pairs_cluster_idx ON public.correlated_pairs (consumer, trade_id, cluster_id);
+CREATE TABLE IF NOT EXISTS public.catalyst_fingerprints (content_hash CHAR(64) PRIMARY KEY, signature BIGINT[] NOT NULL, band_keys BIGINT[] NOT NULL, cluster_id BIGINT NOT NULL, first_seen TIMESTAMPTZ NOT NULL DEFAULT NOW());
+CREATE INDEX IF NOT EXISTS catalyst_fingerprints_band_keys_idx ON public.catalyst_fingerprints USING GIN (band_keys);
+CREATE INDEX IF NOT EXISTS catalyst_fingerprints_first_seen_idx ON public.catalyst_fingerprints (first_seen);
 
 CREATE TABLE IF NOT EXISTS public.trading_signals (
     id SERIAL PRIMARY KEY,
@@ -17,12 +103,110 @@ CREATE TABLE IF NOT EXISTS public.trading_signals (
     direction VARCHAR(10),
     entry_price NUMERIC, -- Added for PnL tracking
     trade_size_usd NUMERIC,
+    leverage NUMERIC,
     catalyst_headline TEXT,
+    catalyst_type VARCHAR(100),
+    legitimacy_score INT,
+    herd_index INT,
+    historical_win_rate INT,
     safety_rating VARCHAR(50),
     ai_confidence_score INT,
     ai_summary TEXT,
-    trade_status VARCHAR(50) DEFAULT 'SIGNAL' -- e.g., SIGNAL, OPEN, CLOSED
+    trade_status VARCHAR(50) DEFAULT 'SIGNAL', -- e.g., SIGNAL, OPEN, CLOSED
+    exit_price NUMERIC, -- Set when the position is closed; the last portfolio mark is used if missing
+    closed_at TIMESTAMPTZ
 );
 
+-- Outcomes of closed positions and per-(trader, catalyst type, asset) track records
+-- (see scripts/common/s_outcomes.py). A trigger records the outcome when a signal moves to CLOSED;
+-- asset '*' rows roll up all assets. scripts/s_outcomes_backfill.py rebuilds both from history.
+-- Outcomes are keyed by trading_signals.signal_id: this script re-creates trading_signals, so its SERIAL
+-- ids start again from 1 and would collide with outcomes already recorded.
+CREATE TABLE IF NOT EXISTS public.signal_outcomes (signal_id VARCHAR(255) PRIMARY KEY, trader_id VARCHAR(255), catalyst_type VARCHAR(100) NOT NULL, asset VARCHAR(50), direction VARCHAR(10), entry_price DOUBLE PRECISION NOT NULL, exit_price DOUBLE PRECISION NOT NULL, return_pct DOUBLE PRECISION NOT NULL, closed_at TIMESTAMPTZ NOT NULL DEFAULT NOW());
+DO $$
+BEGIN
+    -- Outcomes recorded under the old SERIAL id keep their history under a key no new signal can take.
+    IF EXISTS (SELECT 1 FROM information_schema.columns WHERE table_schema = 'public' AND table_name = 'signal_outcomes'
+               AND column_name = 'signal_id' AND data_type = 'integer') THEN
+        ALTER TABLE public.signal_outcomes ALTER COLUMN signal_id TYPE VARCHAR(255) USING 'legacy-id:' || signal_id;
+    END IF;
+END;
+$$;
+CREATE TABLE IF NOT EXISTS public.trader_outcome_stats (trader_id VARCHAR(255) NOT NULL, catalyst_type VARCHAR(100) NOT NULL, asset VARCHAR(50) NOT NULL, trades INT NOT NULL DEFAULT 0, wins INT NOT NULL DEFAULT 0, sum_return_pct DOUBLE PRECISION NOT NULL DEFAULT 0, win_rate DOUBLE PRECISION GENERATED ALWAYS AS (wins::float8 / NULLIF(trades, 0)) STORED, avg_return_pct DOUBLE PRECISION GENERATED ALWAYS AS (sum_return_pct / NULLIF(trades, 0)) STORED, updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(), PRIMARY KEY (trader_id, catalyst_type, asset));
+
+CREATE OR REPLACE FUNCTION public.cryptex_record_outcome() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    exit_px DOUBLE PRECISION := NEW.exit_price;
+    ret DOUBLE PRECISION;
+BEGIN
+    IF exit_px IS NULL THEN
+        -- Marks older than the signal belong to an earlier signal that had the same SERIAL id.
+        SELECT mark_price INTO exit_px FROM public.portfolio_position_pnl
+        WHERE signal_id = NEW.id AND taken_at >= NEW.created_at AND mark_price IS NOT NULL ORDER BY taken_at DESC LIMIT 1;
+    END IF;
+    IF exit_px IS NULL OR NEW.entry_price IS NULL OR NEW.entry_price = 0 THEN
+        RAISE WARNING 'cryptex: no exit/entry price for closed signal %, outcome not recorded', NEW.signal_id;
+        RETURN NEW;
+    END IF;
+    ret := CASE WHEN upper(NEW.direction) = 'SHORT' THEN -1 ELSE 1 END * (exit_px - NEW.entry_price) / NEW.entry_price * 100;
+    INSERT INTO public.signal_outcomes (signal_id, trader_id, catalyst_type, asset, direction, entry_price, exit_price, return_pct, closed_at)
+    VALUES (NEW.signal_id, NEW.trader_id, COALESCE(NEW.catalyst_type, 'unknown'), NEW.asset, NEW.direction, NEW.entry_price, exit_px, ret, COALESCE(NEW.closed_at, NOW()))
+    ON CONFLICT (signal_id) DO NOTHING;
+    IF FOUND AND NEW.trader_id IS NOT NULL THEN
+        INSERT INTO public.trader_outcome_stats AS s (trader_id, catalyst_type, asset, trades, wins, sum_return_pct)
+        SELECT NEW.trader_id, COALESCE(NEW.catalyst_type, 'unknown'), a, 1, (ret > 0)::int, ret
+        FROM unnest(ARRAY[COALESCE(NEW.asset, '*'), '*']) AS a GROUP BY a
+        ON CONFLICT (trader_id, catalyst_type, asset) DO UPDATE SET
+            trades = s.trades + 1, wins = s.wins + EXCLUDED.wins, sum_return_pct = s.sum_return_pct + EXCLUDED.sum_return_pct, updated_at = NOW();
+    END IF;
+    RETURN NEW;
+END;
+$$;
+DROP TRIGGER IF EXISTS trading_signals_record_outcome ON public.trading_signals;
+CREATE TRIGGER trading_signals_record_outcome AFTER UPDATE OF trade_status ON public.trading_signals
+    FOR EACH ROW WHEN (NEW.trade_status = 'CLOSED' AND OLD.trade_status IS DISTINCT FROM 'CLOSED') EXECUTE FUNCTION public.cryptex_record_outcome();
+
+-- Portfolio mark-to-market history (see scripts/common/s_portfolio.py): one row per run plus one
+-- compact row per open position. Dashboards read PnL from here instead of re-pricing.
+CREATE TABLE IF NOT EXISTS public.portfolio_snapshots (id BIGSERIAL PRIMARY KEY, taken_at TIMESTAMPTZ NOT NULL DEFAULT NOW(), exchange VARCHAR(100), open_positions INT NOT NULL, priced_positions INT NOT NULL, total_pnl_usd DOUBLE PRECISION, total_size_usd DOUBLE PRECISION);
+CREATE INDEX IF NOT EXISTS portfolio_snapshots_taken_at_idx ON public.portfolio_snapshots (taken_at);
+CREATE TABLE IF NOT EXISTS public.portfolio_position_pnl (snapshot_id BIGINT NOT NULL REFERENCES public.portfolio_snapshots (id) ON DELETE CASCADE, taken_at TIMESTAMPTZ NOT NULL, signal_id INT NOT NULL, asset VARCHAR(50), mark_price DOUBLE PRECISION, pnl_usd DOUBLE PRECISION, PRIMARY KEY (snapshot_id, signal_id));
+CREATE INDEX IF NOT EXISTS portfolio_position_pnl_signal_idx ON public.portfolio_position_pnl (signal_id, taken_at);
+
+-- Symbol / address -> contract index for the risk analyzers (see scripts/common/s_token_index.py),
+-- refreshed by scripts/s_token_index_refresh.py. Misses with last_checked NULL are queued for the next
+-- refresh; the others are known to be unresolvable and are never sent to DexScreener.
+CREATE TABLE IF NOT EXISTS public.token_contracts (symbol VARCHAR(50) NOT NULL, chain_id VARCHAR(50) NOT NULL, address VARCHAR(100) NOT NULL, name TEXT, liquidity_usd DOUBLE PRECISION, source VARCHAR(50), updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(), PRIMARY KEY (symbol, chain_id));
+CREATE INDEX IF NOT EXISTS token_contracts_address_idx ON public.token_contracts (lower(address));
+CREATE TABLE IF NOT EXISTS public.token_index_misses (lookup_key VARCHAR(100) PRIMARY KEY, kind VARCHAR(10) NOT NULL, first_seen TIMESTAMPTZ NOT NULL DEFAULT NOW(), last_checked TIMESTAMPTZ, attempts INT NOT NULL DEFAULT 0);
+
+-- Herd-behaviour aggregates (see scripts/common/s_herd.py): per-minute, per-trader buckets written at
+-- ingest, and per (asset, direction) window totals read by the assessment engine with one lookup.
+CREATE TABLE IF NOT EXISTS public.herd_buckets (asset VARCHAR(50) NOT NULL, direction VARCHAR(10) NOT NULL, bucket_start TIMESTAMPTZ NOT NULL, trader_id VARCHAR(255) NOT NULL, trades INT NOT NULL, notional_usd DOUBLE PRECISION NOT NULL DEFAULT 0, PRIMARY KEY (asset, direction, bucket_start, trader_id));
+CREATE INDEX IF NOT EXISTS herd_buckets_bucket_start_idx ON public.herd_buckets (bucket_start);
+CREATE TABLE IF NOT EXISTS public.herd_stats (asset VARCHAR(50) NOT NULL, direction VARCHAR(10) NOT NULL, traders_5m INT NOT NULL DEFAULT 0, trades_5m INT NOT NULL DEFAULT 0, notional_5m DOUBLE PRECISION NOT NULL DEFAULT 0, traders_1h INT NOT NULL DEFAULT 0, trades_1h INT NOT NULL DEFAULT 0, notional_1h DOUBLE PRECISION NOT NULL DEFAULT 0, traders_24h INT NOT NULL DEFAULT 0, trades_24h INT NOT NULL DEFAULT 0, notional_24h DOUBLE PRECISION NOT NULL DEFAULT 0, updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(), PRIMARY KEY (asset, direction));
+
+-- Telegram alert outbox (see scripts/common/s_telegram_outbox.py): alerts are queued here and sent
+-- under Telegram's rate limits; dedupe_key (the signal id) keeps a re-run from alerting twice.
+CREATE TABLE IF NOT EXISTS public.telegram_outbox (id BIGSERIAL PRIMARY KEY, chat_id VARCHAR(100) NOT NULL, text TEXT NOT NULL, dedupe_key VARCHAR(255) UNIQUE, status VARCHAR(20) NOT NULL DEFAULT 'PENDING', attempts INT NOT NULL DEFAULT 0, next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(), created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(), sent_at TIMESTAMPTZ, last_error TEXT);
+CREATE INDEX IF NOT EXISTS telegram_outbox_pending_idx ON public.telegram_outbox (next_attempt_at) WHERE status = 'PENDING';
+
+-- Last-known wallet balances and the changes between scans (see scripts/common/s_wallet_balances.py).
+-- Balances are raw integer units (wei / token base units); asset is 'native' or the token contract.
+CREATE TABLE IF NOT EXISTS public.wallet_balances (chain VARCHAR(50) NOT NULL, address VARCHAR(100) NOT NULL, asset VARCHAR(100) NOT NULL, balance NUMERIC(78, 0) NOT NULL, block_number BIGINT, updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(), PRIMARY KEY (chain, address, asset));
+CREATE TABLE IF NOT EXISTS public.wallet_balance_events (id BIGSERIAL PRIMARY KEY, detected_at TIMESTAMPTZ NOT NULL DEFAULT NOW(), chain VARCHAR(50) NOT NULL, address VARCHAR(100) NOT NULL, asset VARCHAR(100) NOT NULL, old_balance NUMERIC(78, 0), new_balance NUMERIC(78, 0) NOT NULL, block_number BIGINT);
+CREATE INDEX IF NOT EXISTS wallet_balance_events_address_idx ON public.wallet_balance_events (address, detected_at);
+
+-- Last-seen leaderboard positions per CEX trader (see scripts/common/s_cex_positions.py); the monitor only
+-- records the difference between a poll and this set.
+CREATE TABLE IF NOT EXISTS public.cex_trader_positions (trader_id VARCHAR(255) NOT NULL, symbol VARCHAR(50) NOT NULL, direction VARCHAR(10) NOT NULL, amount DOUBLE PRECISION NOT NULL, raw_data JSONB, updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(), PRIMARY KEY (trader_id, symbol, direction));
+
+-- Per-source news cursors (see scripts/common/s_news_sources.py): the newest publishedAt delivered by each
+-- NewsAPI endpoint or RSS/Atom feed, so a run only pages back to where the last one stopped.
+-- backfill_from / backfill_to is the publishedAt range a NewsAPI run hit its page cap in; later runs page it.
+CREATE TABLE IF NOT EXISTS public.news_source_cursors (source TEXT PRIMARY KEY, last_published_at TIMESTAMPTZ NOT NULL, backfill_from TIMESTAMPTZ, backfill_to TIMESTAMPTZ, updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW());
+ALTER TABLE public.news_source_cursors ADD COLUMN IF NOT EXISTS backfill_from TIMESTAMPTZ;
+ALTER TABLE public.news_source_cursors ADD COLUMN IF NOT EXISTS backfill_to TIMESTAMPTZ;
+
 -- Insert a starting wallet
 INSERT INTO public.monitored_traders (identifier, exchange, description, is_active) VALUES ('0x1AD8b62573212c5B41A6a061A22A933A44a86835', 'ethereum', 'Example ETH Whale', TRUE) ON CONFLICT (identifier) DO NOTHING;
\ No newline at end of file
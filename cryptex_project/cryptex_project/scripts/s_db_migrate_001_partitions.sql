@@ -0,0 +1,61 @@
+-- Migration 001: convert recent_trades / recent_catalysts to daily range partitions on ingested_at.
+-- Safe to re-run: tables that are already partitioned are left alone.
+-- Afterwards run s_db_init.sql (indexes, hash table) and scripts/s_partition_maintenance.py (daily partitions).
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.recent_ingest_hashes (content_hash CHAR(64) PRIMARY KEY, first_seen TIMESTAMPTZ NOT NULL DEFAULT NOW());
+
+DO $$
+BEGIN
+    IF to_regclass('public.recent_trades') IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'public.recent_trades'::regclass) THEN
+        -- Tables from before content hashing (the original s_db_init.sql) lack the column.
+        ALTER TABLE public.recent_trades ADD COLUMN IF NOT EXISTS content_hash CHAR(64);
+        ALTER TABLE public.recent_trades RENAME TO recent_trades_legacy;
+        ALTER TABLE public.recent_trades_legacy RENAME CONSTRAINT recent_trades_pkey TO recent_trades_legacy_pkey;
+        DROP INDEX IF EXISTS public.recent_trades_content_hash_key;
+
+        CREATE TABLE public.recent_trades (
+            id INTEGER NOT NULL DEFAULT nextval('public.recent_trades_id_seq'),
+            ingested_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            trader_id VARCHAR(255), asset VARCHAR(50), raw_data JSONB, content_hash CHAR(64),
+            PRIMARY KEY (id, ingested_at)
+        ) PARTITION BY RANGE (ingested_at);
+        ALTER SEQUENCE public.recent_trades_id_seq OWNED BY public.recent_trades.id;
+        CREATE TABLE public.recent_trades_default PARTITION OF public.recent_trades DEFAULT;
+
+        INSERT INTO public.recent_trades (id, ingested_at, trader_id, asset, raw_data, content_hash)
+        SELECT id, COALESCE(ingested_at, NOW()), trader_id, asset, raw_data, content_hash FROM public.recent_trades_legacy;
+        INSERT INTO public.recent_ingest_hashes (content_hash, first_seen)
+        SELECT content_hash, MIN(ingested_at) FROM public.recent_trades WHERE content_hash IS NOT NULL GROUP BY content_hash
+        ON CONFLICT (content_hash) DO NOTHING;
+        DROP TABLE public.recent_trades_legacy;
+    END IF;
+
+    IF to_regclass('public.recent_catalysts') IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'public.recent_catalysts'::regclass) THEN
+        -- Tables from before content hashing (the original s_db_init.sql) lack the column.
+        ALTER TABLE public.recent_catalysts ADD COLUMN IF NOT EXISTS content_hash CHAR(64);
+        ALTER TABLE public.recent_catalysts RENAME TO recent_catalysts_legacy;
+        ALTER TABLE public.recent_catalysts_legacy RENAME CONSTRAINT recent_catalysts_pkey TO recent_catalysts_legacy_pkey;
+        DROP INDEX IF EXISTS public.recent_catalysts_content_hash_key;
+
+        CREATE TABLE public.recent_catalysts (
+            id INTEGER NOT NULL DEFAULT nextval('public.recent_catalysts_id_seq'),
+            ingested_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            headline TEXT, source VARCHAR(100), asset_tags TEXT[], raw_data JSONB, content_hash CHAR(64),
+            PRIMARY KEY (id, ingested_at)
+        ) PARTITION BY RANGE (ingested_at);
+        ALTER SEQUENCE public.recent_catalysts_id_seq OWNED BY public.recent_catalysts.id;
+        CREATE TABLE public.recent_catalysts_default PARTITION OF public.recent_catalysts DEFAULT;
+
+        INSERT INTO public.recent_catalysts (id, ingested_at, headline, source, asset_tags, raw_data, content_hash)
+        SELECT id, COALESCE(ingested_at, NOW()), headline, source, asset_tags, raw_data, content_hash FROM public.recent_catalysts_legacy;
+        INSERT INTO public.recent_ingest_hashes (content_hash, first_seen)
+        SELECT content_hash, MIN(ingested_at) FROM public.recent_catalysts WHERE content_hash IS NOT NULL GROUP BY content_hash
+        ON CONFLICT (content_hash) DO NOTHING;
+        DROP TABLE public.recent_catalysts_legacy;
+    END IF;
+END $$;
+
+COMMIT;
@@ -0,0 +1,102 @@
+# File: s_dex_webhook_ingest.py
+# Ingests Alchemy Address Activity webhooks (flows/f_01_handle_dex_trade.yml).
+# Every activity entry that touches a monitored wallet becomes one trade row per monitored side
+# (received = positive amount, sent = negative), and a whole delivery is inserted in one batch.
+# The idempotency key is (network, tx hash, log index, wallet): Alchemy retries a delivery on
+# timeout, and a redelivered transfer is skipped by the content-hash claim in common/s_ingest.py.
+# Entries without a log (external / internal ETH transfers) get negative log indexes, numbered
+# per transaction in payload order.
+
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+from .common.s_ingest import ingest_trades
+from .common.s_traders import get_active_traders
+
+DEX_KEY_FIELDS = ("network", "tx_hash", "log_index")
+
+
+class DexTrade(NamedTuple):
+    trader_id: str
+    network: str
+    tx_hash: str
+    log_index: int
+    block_number: Optional[int]
+    category: str  # external / internal / token / erc721 / erc1155
+    asset: str
+    token_address: Optional[str]
+    amount: float  # Signed from the wallet's side: > 0 received, < 0 sent
+    counterparty: Optional[str]
+
+
+def _hex_int(value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value, 16) if str(value).startswith("0x") else int(value)
+    except ValueError:
+        return None
+
+
+def _amount(entry: Dict[str, Any]) -> float:
+    if entry.get("value") is not None:
+        return float(entry["value"])
+    raw = entry.get("rawContract") or {}
+    raw_value, decimals = _hex_int(raw.get("rawValue")), _hex_int(raw.get("decimals"))
+    if raw_value is None:
+        return 0.0
+    return raw_value / 10 ** (decimals or 0)
+
+
+def monitored_wallets() -> Set[str]:
+    return {t["identifier"].lower() for t in get_active_traders()}
+
+
+def parse_activity(payload: Dict[str, Any], wallets: Set[str]) -> List[DexTrade]:
+    """Trade rows for every activity entry whose sender or receiver is in `wallets` (lowercase)."""
+    event = payload.get("event") or {}
+    network = event.get("network") or "UNKNOWN"
+    trades: List[DexTrade] = []
+    logless_seen: Dict[str, int] = {}
+    for entry in event.get("activity") or []:
+        tx_hash = (entry.get("hash") or "").lower()
+        if not tx_hash:
+            continue
+        log = entry.get("log") or {}
+        log_index = _hex_int(log.get("logIndex"))
+        if log_index is None:
+            logless_seen[tx_hash] = logless_seen.get(tx_hash, 0) + 1
+            log_index = -logless_seen[tx_hash]
+        sender, receiver = (entry.get("fromAddress") or "").lower(), (entry.get("toAddress") or "").lower()
+        if sender not in wallets and receiver not in wallets:
+            continue
+        token_address = ((entry.get("rawContract") or {}).get("address") or "").lower() or None
+        asset = (entry.get("asset") or token_address or "UNKNOWN").upper()
+        amount = _amount(entry)
+        for wallet, sign, counterparty in ((receiver, 1, sender), (sender, -1, receiver)):
+            if wallet in wallets:
+                trades.append(DexTrade(wallet, network, tx_hash, log_index, _hex_int(entry.get("blockNum")),
+                                       entry.get("category") or "unknown", asset, token_address, sign * amount,
+                                       counterparty or None))
+    return trades
+
+
+def ingest_activity(payload: Dict[str, Any], wallets: Set[str]) -> List[str]:
+    """Parses one delivery and inserts it in one batch; returns the distinct assets of new rows."""
+    trades = parse_activity(payload, wallets)
+    if not trades:
+        return []
+    return ingest_trades([{"trader_id": t.trader_id, "asset": t.asset,
+                           "raw_data": {**t._asdict(), "webhook_id": payload.get("webhookId"), "event_id": payload.get("id")}}
+                          for t in trades], key_fields=DEX_KEY_FIELDS)
+
+
+def main(webhook_data: dict) -> List[str]:
+    activity = (webhook_data.get("event") or {}).get("activity") or []
+    print(f"INFO: [DexWebhook] Delivery {webhook_data.get('id')} with {len(activity)} activity entries.")
+    assets = ingest_activity(webhook_data, monitored_wallets())
+    print(f"INFO: [DexWebhook] Affected assets: {assets}")
+    # The correlator reads new rows itself; the assets are returned for the flow log.
+    return assets
+
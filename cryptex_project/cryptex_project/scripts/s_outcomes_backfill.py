@@ -0,0 +1,14 @@
+# File: s_outcomes_backfill.py
+# One-shot (and safe to re-run) backfill of signal_outcomes / trader_outcome_stats from every
+# CLOSED trading_signals row. Afterwards the cryptex_record_outcome trigger keeps both current.
+# Run once after applying the schema, or whenever the stats need rebuilding.
+
+from typing import Dict, Any
+from .common.s_outcomes import rebuild_outcomes
+
+
+def main() -> Dict[str, Any]:
+    print("INFO: [Outcomes] Backfilling outcomes of closed signals and rebuilding win-rate stats...")
+    result = rebuild_outcomes()
+    print(f"SUCCESS: [Outcomes] Backfill done: {result}")
+    return result
@@ -0,0 +1,77 @@
+# File: s_partition_maintenance.py
+# Keeps the daily partitions of recent_trades / recent_catalysts in shape:
+# creates partitions ahead of time and drops the ones past retention.
+# Scheduled by flows/f_03_partition_maintenance.yml.
+
+import os
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Any, List
+from .common.s_catalyst_clusters import CLUSTER_WINDOW
+from .common.s_db import cursor
+
+PARTITIONED_TABLES = ["recent_trades", "recent_catalysts"]
+RETENTION_DAYS = int(os.environ.get("CRYPTEX_RETENTION_DAYS", "7"))
+DAYS_AHEAD = int(os.environ.get("CRYPTEX_PARTITION_DAYS_AHEAD", "3"))
+PARTITION_NAME_RE = re.compile(r"_p(\d{8})$")
+
+
+def list_daily_partitions(cur, table: str) -> Dict[date, str]:
+    cur.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass",
+        (f"public.{table}",),
+    )
+    partitions = {}
+    for (name,) in cur.fetchall():
+        match = PARTITION_NAME_RE.search(name)
+        if match:
+            partitions[datetime.strptime(match.group(1), "%Y%m%d").date()] = name
+    return partitions
+
+
+def create_daily_partition(cur, table: str, day: date) -> str:
+    """Creates the partition for one UTC day, moving any rows the DEFAULT partition caught for it."""
+    name = f"{table}_p{day:%Y%m%d}"
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    end = start + timedelta(days=1)
+    # Build and fill the table first, then attach it: attaching fails if DEFAULT still holds rows for the range.
+    cur.execute(f"CREATE TABLE public.{name} (LIKE public.{table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cur.execute(f"INSERT INTO public.{name} SELECT * FROM public.{table}_default WHERE ingested_at >= %s AND ingested_at < %s", (start, end))
+    cur.execute(f"DELETE FROM public.{table}_default WHERE ingested_at >= %s AND ingested_at < %s", (start, end))
+    cur.execute(f"ALTER TABLE public.{table} ATTACH PARTITION public.{name} FOR VALUES FROM (%s) TO (%s)", (start, end))
+    return name
+
+
+def main() -> Dict[str, Any]:
+    print("INFO: [PartitionMaint] Checking daily partitions...")
+    today = datetime.now(timezone.utc).date()
+    oldest_kept = today - timedelta(days=RETENTION_DAYS)
+    created: List[str] = []
+    dropped: List[str] = []
+
+    with cursor() as cur:
+        for table in PARTITIONED_TABLES:
+            existing = list_daily_partitions(cur, table)
+            # Rows older than retention that landed in DEFAULT are simply deleted below.
+            for offset in range(-1, DAYS_AHEAD + 1):
+                day = today + timedelta(days=offset)
+                if day not in existing and day >= oldest_kept:
+                    created.append(create_daily_partition(cur, table, day))
+            for day, name in sorted(existing.items()):
+                if day < oldest_kept:
+                    cur.execute(f"DROP TABLE public.{name}")
+                    dropped.append(name)
+            cur.execute(f"DELETE FROM public.{table}_default WHERE ingested_at < %s",
+                        (datetime(oldest_kept.year, oldest_kept.month, oldest_kept.day, tzinfo=timezone.utc),))
+        # The dedup hashes and emitted pairs only need to cover the data that is still retained.
+        cur.execute("DELETE FROM public.recent_ingest_hashes WHERE first_seen < NOW() - make_interval(days => %s)", (RETENTION_DAYS,))
+        cur.execute("DELETE FROM public.correlated_pairs WHERE emitted_at < NOW() - make_interval(days => %s)", (RETENTION_DAYS,))
+        # Headline fingerprints are only matched within the clustering window.
+        cur.execute("DELETE FROM public.catalyst_fingerprints WHERE first_seen < NOW() - %s::interval", (CLUSTER_WINDOW,))
+        # Herd buckets only feed windows of up to 24h.
+        cur.execute("DELETE FROM public.herd_buckets WHERE bucket_start < NOW() - INTERVAL '25 hours'")
+        # Delivered alerts are kept as long as the trades that caused them; failed ones stay for inspection.
+        cur.execute("DELETE FROM public.telegram_outbox WHERE status = 'SENT' AND sent_at < NOW() - make_interval(days => %s)", (RETENTION_DAYS,))
+
+    print(f"INFO: [PartitionMaint] Created {len(created)} partition(s), dropped {len(dropped)} expired partition(s).")
+    return {"created": created, "dropped": dropped, "retention_days": RETENTION_DAYS}
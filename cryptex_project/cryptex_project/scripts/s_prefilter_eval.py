@@ -0,0 +1,20 @@
+# File: s_prefilter_eval.py
+# Offline evaluation of the AI signal engine's prefilter (common/s_prefilter.py).
+# Replays the events the engine was given over the last `days` and reports, per threshold, how many
+# GPT-4o calls would have been made and what share of the validated (and winning) signals they keep.
+# Use it to pick CRYPTEX_PREFILTER_THRESHOLD.
+
+from typing import Dict, Any, List, Optional
+from .common.s_prefilter import evaluate, load_stored_events
+
+
+def main(days: int = 7, thresholds: Optional[List[float]] = None) -> Dict[str, Any]:
+    print(f"INFO: [Prefilter Eval] Replaying the last {days} day(s) of correlated events...")
+    events = load_stored_events(days)
+    result = evaluate(events, thresholds or list(range(0, 100, 10)))
+    for point in result["curve"]:
+        print(f"INFO: [Prefilter Eval] threshold {point['threshold']:>5}: {point['llm_calls']} LLM call(s) "
+              f"({point['cost_fraction']:.0%}), signal recall {point['signal_recall']}, win recall {point['win_recall']}")
+    print(f"SUCCESS: [Prefilter Eval] {result['events']} event(s), {result['signals']} signal(s), "
+          f"{result['score_us_per_event']}us per score.")
+    return result
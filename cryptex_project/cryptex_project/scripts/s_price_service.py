@@ -0,0 +1,91 @@
+# File: s_price_service.py
+# Long-running price service feeding the shared ticker snapshot (common/s_price_cache.py).
+# One ccxt.pro client per exchange stays open for the life of the job and streams tickers
+# with watch_ticker; exchanges without websocket tickers are polled over the same client.
+# The price scripts then read the snapshot instead of building a client per alert.
+# The service needs Redis: it fails at startup rather than publish where no reader can see.
+# Kept running by flows/f_05_price_service.yml.
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+from .common.s_price_cache import get_store, publish_ticker
+
+# --- CONFIG ---
+DEFAULT_EXCHANGES = ["kraken", "coinbase", "binance", "bybit", "kucoin"]
+DEFAULT_SYMBOLS = ["BTC/USDT", "ETH/USDT", "SOL/USDT"]
+POLL_INTERVAL_S = 2.0
+RECONNECT_BACKOFF_S = 1.0
+MAX_BACKOFF_S = 30.0
+# --------------
+
+
+def ccxt_pro_factory(name: str):
+    import ccxt.pro
+    return getattr(ccxt.pro, name)({"enableRateLimit": True})
+
+
+async def stream_ticker(client, symbol: str, stats: Dict[str, int]) -> None:
+    """Keeps one symbol on one exchange up to date until cancelled, reconnecting with backoff."""
+    backoff = RECONNECT_BACKOFF_S
+    streaming = client.has.get("watchTicker")
+    while True:
+        try:
+            ticker = await (client.watch_ticker(symbol) if streaming else client.fetch_ticker(symbol))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stats["errors"] += 1
+            print(f"WARN: [PriceService] {client.id} {symbol} feed error, retrying in {backoff:.0f}s. Error: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF_S)
+            continue
+        publish_ticker(client.id, symbol, ticker)  # Snapshot errors are not retried here: they stop the service
+        stats["updates"] += 1
+        backoff = RECONNECT_BACKOFF_S
+        if not streaming:
+            await asyncio.sleep(POLL_INTERVAL_S)
+
+
+async def run_service(symbols: List[str], exchanges: List[str], run_for_seconds: float = 0,
+                      exchange_factory: Callable[[str], Any] = ccxt_pro_factory) -> Dict[str, Any]:
+    get_store()  # Raises if the shared snapshot is unreachable
+    stats = {"updates": 0, "errors": 0}
+    clients, tasks = [], []
+    try:
+        for name in exchanges:
+            try:
+                client = exchange_factory(name)
+                markets = await client.load_markets()
+            except Exception as e:
+                print(f"WARN: [PriceService] Skipping {name}. Error: {e}")
+                continue
+            clients.append(client)
+            listed = [s for s in symbols if not markets or s in markets]
+            tasks.extend(asyncio.create_task(stream_ticker(client, s, stats)) for s in listed)
+            print(f"INFO: [PriceService] {name}: streaming {len(listed)} symbol(s).")
+        if tasks:
+            done, _ = await asyncio.wait(tasks, timeout=run_for_seconds or None, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception():
+                    print(f"ERROR: [PriceService] Snapshot write failed, stopping. Error: {task.exception()}")
+                    raise task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for client in clients:
+            try:
+                await client.close()
+            except Exception:
+                pass
+    return {"status": "stopped", "exchanges": len(clients), "streams": len(tasks), **stats}
+
+
+def main(symbols: Optional[List[str]] = None, exchanges: Optional[List[str]] = None, run_for_seconds: int = 0) -> Dict[str, Any]:
+    """Runs the price service; run_for_seconds=0 runs until the job is cancelled."""
+    print("INFO: [PriceService] Starting...")
+    result = asyncio.run(run_service(symbols or DEFAULT_SYMBOLS, exchanges or DEFAULT_EXCHANGES, run_for_seconds))
+    print(f"INFO: [PriceService] Stopped: {result}")
+    return result
+
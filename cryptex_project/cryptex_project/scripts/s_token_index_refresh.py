@@ -0,0 +1,101 @@
+# File: s_token_index_refresh.py
+# Builds and refreshes the symbol -> contract index (common/s_token_index.py).
+# Symbols come from recent trades, the asset tagger's built-in list, stale index rows and queued
+# misses; each is searched on DexScreener and the most liquid pair per chain whose base token has
+# exactly that symbol is kept. Addresses queued by the Solana analyzer are checked via the tokens API.
+# Scheduled by flows/f_04_token_index_refresh.yml.
+
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from .common.s_async_calls import bounded_gather
+from .common.s_asset_tagger import BUILTIN_ALIASES, IGNORED_SYMBOLS
+from .common.s_db import cursor
+from .common.s_dex_data import DexScreenerClient
+from .common.s_token_index import normalize_symbol, record_contracts, record_misses
+
+# --- CONFIG ---
+MIN_LIQUIDITY_USD = float(os.environ.get("CRYPTEX_TOKEN_INDEX_MIN_LIQUIDITY_USD", "10000"))  # Ignores copycat tokens
+REFRESH_AFTER_DAYS = int(os.environ.get("CRYPTEX_TOKEN_INDEX_REFRESH_DAYS", "7"))
+MISS_RETRY_DAYS = int(os.environ.get("CRYPTEX_TOKEN_INDEX_MISS_RETRY_DAYS", "7"))
+CONCURRENCY = 4
+# --------------
+
+
+def symbols_to_refresh(max_symbols: int) -> Tuple[List[str], List[str]]:
+    """Returns (symbols, addresses) that are new, stale or due for a miss retry."""
+    with cursor() as cur:
+        cur.execute("SELECT DISTINCT asset FROM public.recent_trades WHERE asset IS NOT NULL")
+        seen = {normalize_symbol(row[0]) for row in cur.fetchall()} | set(BUILTIN_ALIASES)
+        cur.execute("SELECT symbol, MIN(updated_at) > NOW() - %s::interval FROM public.token_contracts GROUP BY symbol",
+                    (f"{REFRESH_AFTER_DAYS} days",))
+        fresh = {symbol for symbol, is_fresh in cur.fetchall() if is_fresh}
+        cur.execute(
+            "SELECT lookup_key, kind, last_checked IS NULL OR last_checked < NOW() - %s::interval FROM public.token_index_misses",
+            (f"{MISS_RETRY_DAYS} days",))
+        misses = cur.fetchall()
+    known_misses = {key for key, _, due in misses if not due}
+    symbols = ({key for key, kind, due in misses if due and kind == "symbol"} | seen) - fresh - known_misses - IGNORED_SYMBOLS
+    addresses = [key for key, kind, due in misses if due and kind == "address"]
+    return sorted(s for s in symbols if s)[:max_symbols], addresses[:max_symbols]
+
+
+def best_contracts(symbol: str, pairs: List[Dict[str, Any]]) -> List[tuple]:
+    """Most liquid contract per chain among pairs whose base token is exactly `symbol`."""
+    best: Dict[str, Dict[str, Any]] = {}
+    for pair in pairs:
+        base = pair.get("baseToken") or {}
+        liquidity = float((pair.get("liquidity") or {}).get("usd") or 0)
+        if (base.get("symbol") or "").upper() != symbol or liquidity < MIN_LIQUIDITY_USD:
+            continue
+        chain = pair.get("chainId")
+        if chain and base.get("address") and liquidity > best.get(chain, {}).get("liquidity", -1):
+            best[chain] = {"address": base["address"], "name": base.get("name"), "liquidity": liquidity}
+    return [(symbol, chain, b["address"], b["name"], b["liquidity"], "dexscreener_search") for chain, b in best.items()]
+
+
+async def refresh(symbols: List[str], addresses: List[str]) -> Dict[str, Any]:
+    client = DexScreenerClient()
+
+    async def search(symbol: str) -> List[tuple]:
+        return best_contracts(symbol, await client.search_pairs(symbol))
+
+    found = await bounded_gather(symbols, search, concurrency=CONCURRENCY)
+    rows = [row for result in found if result for row in result]
+    # A failed search (None) is retried next run rather than recorded as a miss.
+    missed_symbols = [s for s, result in zip(symbols, found) if result == []]
+
+    tokens: Dict[str, Optional[Dict[str, Any]]] = {}
+    if addresses:
+        try:
+            tokens = await client.get_tokens(addresses)
+        except Exception as e:
+            print(f"WARN: [TokenIndex] Address lookups failed, retrying next run. Error: {e}")
+    for address, token in tokens.items():
+        if token and token.get("base_symbol") and (token.get("base_address") or "").lower() == address.lower():
+            rows.append((token["base_symbol"].upper(), token["chain_id"], token["base_address"], None, token["liquidity_usd"], "dexscreener_tokens"))
+    missed_addresses = [a for a, token in tokens.items() if not (token and (token.get("base_address") or "").lower() == a.lower())]
+
+    # One row per (symbol, chain): the upsert cannot touch the same key twice in a statement.
+    unique: Dict[tuple, tuple] = {}
+    for row in rows:
+        current = unique.get(row[:2])
+        if current is None or row[4] > current[4]:
+            unique[row[:2]] = row
+    record_contracts(list(unique.values()))
+    record_misses(missed_symbols, "symbol")
+    record_misses(missed_addresses, "address")
+    return {"contracts": len(unique), "missed_symbols": len(missed_symbols), "missed_addresses": len(missed_addresses)}
+
+
+def main(max_symbols: int = 500) -> Dict[str, Any]:
+    print("INFO: [TokenIndex] Starting refresh...")
+    symbols, addresses = symbols_to_refresh(max_symbols)
+    if not symbols and not addresses:
+        print("INFO: [TokenIndex] Index is up to date.")
+        return {"status": "up_to_date"}
+    print(f"INFO: [TokenIndex] Resolving {len(symbols)} symbol(s) and {len(addresses)} address(es)...")
+    result = asyncio.run(refresh(symbols, addresses))
+    print(f"SUCCESS: [TokenIndex] Refresh done: {result}")
+    return result
@@ -1,14 +1,26 @@
 # File: s_telegram_alerter.py
 # This script is now correctly linked to the cryptex-specific Telegram secrets.
+# Alerts go through the durable outbox (common/s_telegram_outbox.py): each run queues its signals and
+# then sends everything due, including earlier alerts that were rate limited or failed.
 import os
-import requests
+from typing import List, Optional
+from ..common.s_telegram_outbox import enqueue, drain_outbox
 
-def main(signal: dict):
-    if not signal:
-        print("INFO: [Cryptex-Alerter] No new signal to alert on.")
-        return {"status": "no_signal"}
+# --- CONFIG ---
+FLUSH_SECONDS = float(os.environ.get("CRYPTEX_TELEGRAM_FLUSH_S", "45"))  # Whatever is left waits for the next run
+# --------------
 
-    print("INFO: [Cryptex-Alerter] Sending high-confidence signal to Cryptex channel.")
+def format_alert(signal: dict) -> str:
+    size = float(signal.get('trade_size_usd') or 0)
+    return f"🚨 **Cryptex Signal Detected** 🚨\n\n" \
+           f"**Trader:** `{signal.get('trader_wallet') or signal.get('trader_id', 'N/A')}` on *{signal.get('exchange', 'N/A')}*\n" \
+           f"**Trade:** `{signal.get('direction', 'N/A')}` **{signal.get('asset', 'N/A')}**\n" \
+           f"**Size:** `${size:,.2f}` at `{signal.get('leverage', 'N/A')}x` leverage\n\n" \
+           f"**Catalyst:** {signal.get('catalyst_headline', 'N/A')}\n\n" \
+           f"**Confidence:** `{signal.get('ai_confidence_score', 'N/A')}%`"
+
+def main(signal: dict = None, signals: Optional[List[dict]] = None):
+    batch = [s for s in ([signal] if signal else []) + list(signals or []) if s]
 
     # --- UPDATED LINES ---
     bot_token = os.environ.get("WMILL_SECRET_TELEGRAM_CRYPTEX_BOT_TOKEN")
@@ -18,21 +30,21 @@ def main(signal: dict):
     if not all([bot_token, chat_id]):
         raise ValueError("Cryptex Telegram secrets are missing. Please set them in the Windmill UI.")
 
-    message = f"🚨 **Cryptex Signal Detected** 🚨\n\n" \
-              f"**Trader:** `{signal['trader_wallet']}` on *{signal['exchange']}*\n" \
-              f"**Trade:** `{signal['direction']}` **{signal['asset']}**\n" \
-              f"**Size:** `${signal['trade_size_usd']:,.2f}` at `{signal['leverage']}x` leverage\n\n" \
-              f"**Catalyst:** {signal['catalyst_headline']}\n\n" \
-              f"**Confidence:** `{signal['ai_confidence_score']}%`"
-
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    payload = {"chat_id": chat_id, "text": message, "parse_mode": "Markdown"}
+    if batch:
+        print(f"INFO: [Cryptex-Alerter] Queueing {len(batch)} high-confidence signal(s) for the Cryptex channel.")
+    else:
+        print("INFO: [Cryptex-Alerter] No new signal to alert on; sending any queued alerts.")
+    queued = enqueue(chat_id, [(format_alert(s), s.get('signal_id')) for s in batch])
 
     try:
-        res = requests.post(url, json=payload, timeout=10)
-        res.raise_for_status()
-        print("INFO: [Cryptex-Alerter] Telegram alert sent successfully.")
-        return {"status": "alert_sent"}
+        result = drain_outbox(bot_token, run_for_seconds=FLUSH_SECONDS)
     except Exception as e:
-        print(f"ERROR: [Cryptex-Alerter] Failed to send Telegram alert. Error: {e}")
-        return {"status": "alert_failed"}
\ No newline at end of file
+        # The alerts are safe in the outbox; the next run sends them.
+        print(f"ERROR: [Cryptex-Alerter] Failed to send Telegram alerts, will retry next run. Error: {e}")
+        return {"status": "alert_failed", "queued": queued}
+
+    print(f"INFO: [Cryptex-Alerter] Sent {result['sent']} alert(s) ({result['digests']} digest(s)), "
+          f"{result['pending']} pending, {result['failed']} failed.")
+    if not batch and not result['sent']:
+        return {"status": "no_signal", **result}
+    return {"status": "alert_sent" if not result['pending'] else "alert_queued", "queued": queued, **result}
@@ -1,19 +1,17 @@
-import os, json, psycopg2
+import os, json, requests
 from typing import Dict, Any
+from ..common.s_db import cursor
+from ..common.s_traders import get_active_traders
 
-def execute_db_query(query: str, params: tuple = None, fetch: str = None):
-    conn = psycopg2.connect(host='postgres', dbname='windmill', user='windmill', password='windmill')
-    with conn.cursor() as cur:
-        cur.execute(query, params or ())
-        if fetch == 'one':
-            result = cur.fetchone()
-        elif fetch == 'all':
-            result = cur.fetchall()
-        else:
-            result = None
-    conn.commit()
-    conn.close()
-    return result
+# All queries of one invocation share a single pooled connection and transaction.
+# Adding or removing a wallet bumps the trader-list version (trigger in s_db_init.sql), so readers reload it.
+def execute_db_query(cur, query: str, params: tuple = None, fetch: str = None):
+    cur.execute(query, params or ())
+    if fetch == 'one':
+        return cur.fetchone()
+    if fetch == 'all':
+        return cur.fetchall()
+    return None
 
 def main(body: Dict[str, Any]) -> Dict[str, Any]:
     message = body.get("message", {})
@@ -25,24 +23,25 @@ def main(body: Dict[str, Any]) -> Dict[str, Any]:
     args = text.split()
     command = args[0]
 
-    if command == "/addwallet" and len(args) == 3:
-        address, chain = args[1], args[2]
-        query = "INSERT INTO public.monitored_traders (identifier, exchange, description, is_active) VALUES (%s, %s, %s, %s) ON CONFLICT (identifier) DO NOTHING;"
-        execute_db_query(query, (address, chain, f"Added via Telegram by {message.get('from',{}).get('username')}", True))
-        response_text = f"✅ Wallet added: `{address}` on {chain}"
-    
-    elif command == "/removewallet" and len(args) == 2:
-        address = args[1]
-        query = "DELETE FROM public.monitored_traders WHERE identifier = %s;"
-        execute_db_query(query, (address,))
-        response_text = f"🗑️ Wallet removed: `{address}`"
+    with cursor() as cur:
+        if command == "/addwallet" and len(args) == 3:
+            address, chain = args[1], args[2]
+            query = "INSERT INTO public.monitored_traders (identifier, exchange, description, is_active) VALUES (%s, %s, %s, %s) ON CONFLICT (identifier) DO NOTHING;"
+            execute_db_query(cur, query, (address, chain, f"Added via Telegram by {message.get('from',{}).get('username')}", True))
+            response_text = f"✅ Wallet added: `{address}` on {chain}"
 
-    elif command == "/wallets":
-        wallets = execute_db_query("SELECT identifier, exchange FROM public.monitored_traders WHERE is_active = TRUE;", fetch='all')
-        if wallets:
-            response_text = "📋 Tracked Wallets:\n" + "\n".join([f"`{w[0]}` ({w[1]})" for w in wallets])
-        else:
-            response_text = "📭 No wallets currently tracked."
+        elif command == "/removewallet" and len(args) == 2:
+            address = args[1]
+            query = "DELETE FROM public.monitored_traders WHERE identifier = %s;"
+            execute_db_query(cur, query, (address,))
+            response_text = f"🗑️ Wallet removed: `{address}`"
+
+        elif command == "/wallets":
+            wallets = get_active_traders(cur)
+            if wallets:
+                response_text = "📋 Tracked Wallets:\n" + "\n".join([f"`{w['identifier']}` ({w['exchange']})" for w in wallets])
+            else:
+                response_text = "📭 No wallets currently tracked."
 
     # Send response back to Telegram
     bot_token = os.environ.get("WMILL_SECRET_TELEGRAM_CRYPTEX_BOT_TOKEN")
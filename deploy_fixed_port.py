@@ -1,6 +1,10 @@
 
 # File: deploy.py
 # Finalized & Hardened Deployment Script for Cryptex AI Windmill Project
+# Incremental by default: a local manifest keeps the content hash of every deployed path, so only
+# changed scripts/flows are uploaded, and paths known to exist go straight to update. Uploads run in
+# parallel over one pooled session. Use --full to upload everything.
+# tests/test_deploy.py runs it against a stub Windmill API.
 
 import os
 import requests
@@ -8,105 +12,175 @@ import json
 import yaml
 import time
 import re
+import argparse
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # --- CONFIG: Use environment variables or Windmill secrets for secure deployment ---
 WINDMILL_BASE_URL = os.getenv("WINDMILL_BASE_URL")  # e.g., http://your-vps-ip
 WINDMILL_TOKEN = os.getenv("WINDMILL_TOKEN")        # your Windmill auth token
 WORKSPACE = os.getenv("WINDMILL_WORKSPACE", "cryptex_ai_omega")
 PROJECT_DIR = "cryptex_project"
+MANIFEST_FILE = os.getenv("WINDMILL_DEPLOY_MANIFEST", ".windmill_deploy_manifest.json")
+DEPLOY_CONCURRENCY = int(os.getenv("WINDMILL_DEPLOY_CONCURRENCY", "8"))
+DEPLOY_TIMEOUT_S = 30
 # ------------------------------------------------------------------------------------
 
-HEADERS = {
-    "Authorization": f"Bearer {WINDMILL_TOKEN}",
-    "Content-Type": "application/json"
-}
+DEPLOYABLE = (".py", ".ts", ".yml", ".yaml")
 
 def extract_summary_from_script(content):
     """Extracts top-level docstring or fallback summary for Windmill UI."""
     summary = re.findall(r'"""(.*?)"""', content, re.DOTALL)
     return summary[0].strip() if summary else "Cryptex script"
 
-def deploy_resource(filepath):
-    """Determines the resource type and deploys it with the correct API payload."""
-    path_in_windmill = os.path.splitext(os.path.relpath(filepath, PROJECT_DIR))[0].replace(os.path.sep, "/")
-    payload = None
-    item_type = None
+def build_item(filepath, project_dir=PROJECT_DIR):
+    """(item_type, windmill path, payload) for a deployable file, or None."""
+    path_in_windmill = os.path.splitext(os.path.relpath(filepath, project_dir))[0].replace(os.path.sep, "/")
 
     if filepath.endswith((".py", ".ts")):
-        item_type = "script"
         language = "python3" if filepath.endswith(".py") else "typescript"
-        api_path_create = f"/api/w/{WORKSPACE}/scripts/create"
-        api_path_update = f"/api/w/{WORKSPACE}/scripts/update"
         with open(filepath, "r", encoding='utf-8') as f:
             content = f.read()
-        summary = extract_summary_from_script(content)
-        payload = {
+        return "script", path_in_windmill, {
             "path": path_in_windmill,
             "content": content,
             "language": language,
-            "summary": summary
+            "summary": extract_summary_from_script(content)
         }
 
-    elif filepath.endswith((".yml", ".yaml")):
-        item_type = "flow"
-        api_path_create = f"/api/w/{WORKSPACE}/flows/create"
-        api_path_update = f"/api/w/{WORKSPACE}/flows/update"
+    if filepath.endswith((".yml", ".yaml")):
         with open(filepath, "r", encoding='utf-8') as f:
             content_yaml = yaml.safe_load(f)
-        flow_path = os.path.splitext(os.path.relpath(filepath, PROJECT_DIR))[0].replace(os.path.sep, "/")
-        payload = {
-            "path": flow_path,
+        return "flow", path_in_windmill, {
+            "path": path_in_windmill,
             "summary": content_yaml.get("summary", "Cryptex flow"),
             "value": content_yaml
         }
+    return None
+
+def payload_hash(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def find_items(project_dir=PROJECT_DIR):
+    items = []
+    for root, dirs, files in os.walk(project_dir):
+        dirs[:] = [d for d in dirs if d != "__pycache__"]
+        for file in sorted(files):
+            if file.endswith(DEPLOYABLE):
+                item = build_item(os.path.join(root, file), project_dir)
+                if item:
+                    items.append((os.path.join(root, file),) + item)
+            else:
+                print(f"INFO: Skipping non-deployable file: {file}")
+    return items
 
-    if not payload:
-        return
-
-    create_url = f"{WINDMILL_BASE_URL}{api_path_create}"
-    update_url = f"{WINDMILL_BASE_URL}{api_path_update}"
-
+def load_manifest(manifest_file, target):
+    """{windmill path: {"type", "hash"}} of what was last deployed to this target (base URL + workspace)."""
     try:
-        print(f"> Deploying {item_type.upper()} to {path_in_windmill}")
-        response = requests.post(create_url, headers=HEADERS, json=payload, timeout=30)
-
-        if response.status_code == 409:
-            print(f"⚠️  Already exists. Updating {path_in_windmill}...")
-            response = requests.post(update_url, headers=HEADERS, json=payload, timeout=30)
+        with open(manifest_file, "r", encoding='utf-8') as f:
+            return json.load(f).get(target, {})
+    except (OSError, ValueError):
+        return {}
 
+def save_manifest(manifest_file, target, entries):
+    try:
+        with open(manifest_file, "r", encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    manifest[target] = entries
+    tmp_file = manifest_file + ".tmp"
+    with open(tmp_file, "w", encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_file, manifest_file)
+
+def make_session(token, concurrency):
+    """One pooled session for all uploads; connection errors and 5xx are retried with backoff."""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504), allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Authorization": f"Bearer {token}", "Content-Type": "application/json"})
+    return session
+
+def deploy_resource(session, base_url, workspace, filepath, item_type, path_in_windmill, payload, exists):
+    """Uploads one item: update first if the path is known to exist, else create (then update on 409)."""
+    create_url = f"{base_url}/api/w/{workspace}/{item_type}s/create"
+    update_url = f"{base_url}/api/w/{workspace}/{item_type}s/update"
+    started = time.perf_counter()
+    try:
+        if exists:
+            response = session.post(update_url, json=payload, timeout=DEPLOY_TIMEOUT_S)
+            if response.status_code == 404:
+                # Deleted in Windmill since the last deploy.
+                response = session.post(create_url, json=payload, timeout=DEPLOY_TIMEOUT_S)
+        else:
+            response = session.post(create_url, json=payload, timeout=DEPLOY_TIMEOUT_S)
+            if response.status_code == 409:
+                print(f"⚠️  Already exists. Updating {path_in_windmill}...")
+                response = session.post(update_url, json=payload, timeout=DEPLOY_TIMEOUT_S)
         response.raise_for_status()
-        print(f"✅ Deployed {item_type.upper()}: {filepath}")
-
+        print(f"✅ Deployed {item_type.upper()}: {filepath} ({time.perf_counter() - started:.2f}s)")
+        return True
     except requests.exceptions.RequestException as e:
-        print(f"❌ FAILED to deploy {item_type.upper()}: {filepath}")
-        error_text = e.response.text if hasattr(e, 'response') and e.response else str(e)
+        print(f"❌ FAILED to deploy {item_type.upper()}: {filepath} ({time.perf_counter() - started:.2f}s)")
+        error_text = e.response.text if getattr(e, 'response', None) is not None else str(e)
         print(f"   Error: {error_text}")
-        print("   Retrying in 2 seconds...")
-        time.sleep(2)
-        try:
-            response = requests.post(update_url, headers=HEADERS, json=payload, timeout=30)
-            response.raise_for_status()
-            print(f"♻️  Retry successful: {filepath}")
-        except Exception as e2:
-            print(f"   ❌ Retry failed: {str(e2)}")
+        return False
+
+def deploy(base_url, token, workspace=WORKSPACE, project_dir=PROJECT_DIR, manifest_file=MANIFEST_FILE,
+           full=False, concurrency=DEPLOY_CONCURRENCY):
+    """Deploys changed items (all with full=True) and returns counts and timings."""
+    started = time.perf_counter()
+    target = f"{base_url.rstrip('/')}|{workspace}"
+    known = load_manifest(manifest_file, target)
+    items = find_items(project_dir)
+    todo = [item for item in items if full or known.get(item[2], {}).get("hash") != payload_hash(item[3])]
+    print(f"--- Deploying {len(todo)} of {len(items)} item(s) from {project_dir} to Windmill workspace: {workspace} ---")
+
+    entries = {path: known[path] for _, _, path, _ in items if path in known}
+    lock = threading.Lock()
+    session = make_session(token, concurrency)
+
+    def upload(item):
+        filepath, item_type, path_in_windmill, payload = item
+        ok = deploy_resource(session, base_url.rstrip('/'), workspace, filepath, item_type, path_in_windmill, payload,
+                             exists=path_in_windmill in known)
+        if ok:
+            with lock:
+                entries[path_in_windmill] = {"type": item_type, "hash": payload_hash(payload)}
+        return ok
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        results = list(pool.map(upload, todo))
+    # Paths whose file is gone drop out of the manifest; they are not deleted from Windmill.
+    save_manifest(manifest_file, target, entries)
+    failed = results.count(False)
+    elapsed = time.perf_counter() - started
+    print(f"🚀 Deployment complete: {len(todo) - failed} deployed, {failed} failed, "
+          f"{len(items) - len(todo)} unchanged in {elapsed:.2f}s.")
+    return {"items": len(items), "deployed": len(todo) - failed, "failed": failed,
+            "unchanged": len(items) - len(todo), "elapsed_s": round(elapsed, 2)}
 
 def main():
-    if not WINDMILL_BASE_URL or not WINDMILL_TOKEN:
-        print("ERROR: Missing WINDMILL_BASE_URL or WINDMILL_TOKEN. Please set environment variables.")
-        return
+    parser = argparse.ArgumentParser(description="Deploy the Cryptex scripts and flows to Windmill.")
+    parser.add_argument("--full", action="store_true", help="Upload every item, ignoring the manifest.")
+    parser.add_argument("--concurrency", type=int, default=DEPLOY_CONCURRENCY)
+    args = parser.parse_args()
 
     if not os.path.isdir(PROJECT_DIR):
         print(f"ERROR: Project directory '{PROJECT_DIR}' not found.")
         return
 
-    print(f"--- Deploying {PROJECT_DIR} to Windmill workspace: {WORKSPACE} ---")
-    for root, _, files in os.walk(PROJECT_DIR):
-        for file in files:
-            if file.endswith((".py", ".ts", ".yml", ".yaml")):
-                deploy_resource(os.path.join(root, file))
-            else:
-                print(f"INFO: Skipping non-deployable file: {file}")
-    print("🚀 Deployment complete.")
+    if not WINDMILL_BASE_URL or not WINDMILL_TOKEN:
+        print("ERROR: Missing WINDMILL_BASE_URL or WINDMILL_TOKEN. Please set environment variables.")
+        return
+
+    deploy(WINDMILL_BASE_URL, WINDMILL_TOKEN, WORKSPACE, PROJECT_DIR, MANIFEST_FILE, full=args.full, concurrency=args.concurrency)
 
 if __name__ == "__main__":
     main()
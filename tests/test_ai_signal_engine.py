@@ -0,0 +1,80 @@
+# File: test_ai_signal_engine.py
+# The AI signal engine (s_ai_signal_engine.py) on a throwaway database, with a fake OpenAI server
+# behind CRYPTEX_OPENAI_BASE_URL.
+
+import json
+from collections import Counter
+
+import pytest
+
+from cryptex_project.cryptex_project.scripts import s_ai_signal_engine
+from cryptex_project.cryptex_project.scripts.common.s_correlate import fetch_new_pairs
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+
+KEYS = ("WMILL_SECRET_OPENAI_API_KEY", "WMILL_SECRET_GOOGLE_API_KEY", "WMILL_SECRET_CLAUDE_API_KEY")
+
+
+def correlated_event(asset: str = "ETH", headline: str = "ETH partnership announced"):
+    with cursor() as cur:
+        cur.execute("INSERT INTO public.recent_catalysts (headline, asset_tags, raw_data) VALUES (%s, %s, %s)",
+                    (headline, [asset], json.dumps({"title": headline, "source": {"name": "Reuters"}})))
+        cur.execute("INSERT INTO public.recent_trades (trader_id, asset, raw_data) VALUES (%s, %s, %s) RETURNING id",
+                    ("whale", asset, json.dumps({"symbol": f"{asset}USDT", "amount": 50, "entryPrice": 3000})))
+        return cur.fetchone()[0]
+
+
+def fake_openai(statuses):
+    """Chat completions answered per headline with the next status in statuses[headline] (then 200)."""
+    requests = Counter()
+
+    def handler(method, path, body):
+        if method != "POST" or not path.endswith("/chat/completions"):
+            return 404, {"error": {"message": "not found"}}
+        prompt = json.loads(body)["messages"][0]["content"]
+        headline = next(h for h in statuses if h in prompt)
+        requests[headline] += 1
+        status = (statuses[headline][requests[headline] - 1:] or [200])[0]
+        if status != 200:
+            return status, {"error": {"message": f"fake error {status}", "type": "test", "code": None}}
+        return 200, {"id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "gpt-4o",
+                     "choices": [{"index": 0, "finish_reason": "stop",
+                                  "message": {"role": "assistant", "content": f"Front-running: {headline}"}}],
+                     "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}}
+    return handler, requests
+
+
+@pytest.fixture
+def engine_env(monkeypatch, stub_server):
+    """Fake keys, a fake OpenAI server and a stub sentiment model; returns a function to start the server."""
+    for key in KEYS:
+        monkeypatch.setenv(key, "test-key")
+    monkeypatch.setattr(s_ai_signal_engine, "score_headlines", lambda headlines: ["positive"] * len(headlines))
+
+    def start(statuses):
+        handler, requests = fake_openai(statuses)
+        monkeypatch.setenv("CRYPTEX_OPENAI_BASE_URL", stub_server(handler) + "/v1")
+        return requests
+    return start
+
+
+def test_missing_keys_leave_the_events_for_the_next_run(db, monkeypatch):
+    for key in KEYS:
+        monkeypatch.delenv(key, raising=False)
+    trade_id = correlated_event()
+    with pytest.raises(ValueError):
+        s_ai_signal_engine.main()
+    assert [p["trade_id"] for p in fetch_new_pairs("ai_signal_engine", track=True)] == [trade_id]
+
+
+def test_rate_limits_are_retried_and_bad_requests_are_not(db, engine_env):
+    requests = engine_env({"ETH partnership announced": [429, 503], "SOL listing rumour": [400, 400, 400]})
+    eth_trade = correlated_event()
+    sol_trade = correlated_event("SOL", "SOL listing rumour")
+
+    signals = s_ai_signal_engine.main(prefilter_threshold=0)
+
+    assert [s["asset"] for s in signals] == ["ETH"]
+    assert requests == {"ETH partnership announced": 3, "SOL listing rumour": 1}
+    with cursor() as cur:
+        cur.execute("SELECT trade_id, status, attempts FROM public.correlated_pairs WHERE consumer = 'ai_signal_engine'")
+        assert sorted(cur.fetchall()) == [(eth_trade, "DONE", 1), (sol_trade, "PENDING", 1)]
@@ -0,0 +1,70 @@
+# File: test_asset_tagger.py
+# Asset tagging of news text (common/s_asset_tagger.py).
+
+import json
+import os
+import stat
+import time
+
+from cryptex_project.cryptex_project.scripts.common.s_asset_tagger import AssetTagger, build_dictionary, compile_tagger
+
+HEADLINE = {"title": "Bitcoin and $SOL rally as ETH lags", "description": "Analysts see one more leg up; NEAR is quiet."}
+
+
+def test_compiled_tagger_round_trips_through_the_json_cache(tmp_path):
+    dictionary = build_dictionary(include_exchanges=False)
+    cache_path = str(tmp_path / "private" / "asset_tagger.json")
+
+    built = compile_tagger(dictionary, cache_path)
+    loaded = compile_tagger(dictionary, cache_path)
+
+    with open(cache_path) as f:
+        assert json.load(f)["dictionary"] == dictionary
+    assert stat.S_IMODE(os.stat(cache_path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(os.path.dirname(cache_path)).st_mode) == 0o700
+    assert built.tag_article(HEADLINE) == loaded.tag_article(HEADLINE) == ["BTC", "SOL", "ETH"]
+
+
+def test_stale_or_corrupt_cache_is_rebuilt(tmp_path):
+    dictionary = build_dictionary(include_exchanges=False)
+    cache_path = tmp_path / "asset_tagger.json"
+    cache_path.write_text("not json")
+    assert compile_tagger(dictionary, str(cache_path)).tag("$PEPE pumps") == ["PEPE"]
+    compile_tagger({**dictionary, "NEW": ["newcoin"]}, str(cache_path))
+    assert compile_tagger(dictionary, str(cache_path)).tag("Newcoin lists") == []
+    assert AssetTagger.from_dictionary({**dictionary, "NEW": ["newcoin"]}).tag("Newcoin lists") == ["NEW"]
+
+
+def test_everyday_word_aliases_need_the_asset_named_another_way():
+    tagger = AssetTagger.from_dictionary(build_dictionary(include_exchanges=False))
+    assert tagger.tag("Cautious optimism returns to markets as the Tron reboot tops the box office") == []
+    assert tagger.tag("Polygon counts and avalanche risk: a geometry lesson in the Alps") == []
+    assert tagger.tag("Ether slips while Bitcoin holds") == ["ETH", "BTC"]  # ETH's own name, not an everyday word
+    assert tagger.tag("Optimism ($OP) and Avalanche rally; AVAX leads") == ["OP", "AVAX"]
+    assert tagger.tag("Ether rallies as Ethereum upgrade ships") == ["ETH"]
+    assert tagger.tag("Polygon's MATIC migration completes") == ["MATIC"]
+
+
+def test_compile_load_and_tagging_throughput(tmp_path, n_articles=5000):
+    dictionary = build_dictionary(include_exchanges=False)
+    for i in range(2000):  # Roughly the size of a merged exchange market list
+        dictionary[f"TK{i}"] = [f"token number {i}"]
+    cache_path = str(tmp_path / "asset_tagger.json")
+    started = time.perf_counter()
+    compile_tagger(dictionary, cache_path)
+    compile_s = time.perf_counter() - started
+    started = time.perf_counter()
+    tagger = compile_tagger(dictionary, cache_path)
+    load_s = time.perf_counter() - started
+    articles = [{
+        "title": f"Bitcoin and Solana rally as $TK{i % 2000} lists on a major exchange",
+        "description": f"Analysts say ETH demand and token number {i % 50} flows could lift the wider market; one trader disagrees.",
+    } for i in range(n_articles)]
+    started = time.perf_counter()
+    tags = [tagger.tag_article(article) for article in articles]
+    tag_s = time.perf_counter() - started
+    print({"patterns": len(dictionary), "compile_s": round(compile_s, 3), "cached_load_s": round(load_s, 3),
+           "articles": n_articles, "articles_per_s": round(n_articles / tag_s, 1)})
+
+    assert tags[7] == ["BTC", "SOL", "TK7", "ETH"]
+    assert all(t[:2] == ["BTC", "SOL"] and len(t) == (4 if i % 2000 == i % 50 else 5) for i, t in enumerate(tags))
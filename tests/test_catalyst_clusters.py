@@ -0,0 +1,96 @@
+# File: test_catalyst_clusters.py
+# Near-duplicate clustering of news catalysts (common/s_catalyst_clusters.py).
+# test_news_day_clusters replays a synthetic news day, stories rewritten by several outlets,
+# through ingest_catalysts and reports cluster quality and the LLM calls it saves.
+
+import random
+import time
+from itertools import combinations
+from typing import Any, Dict, List, Tuple
+
+from cryptex_project.cryptex_project.scripts.common import s_catalyst_clusters
+from cryptex_project.cryptex_project.scripts.common.s_catalyst_clusters import ClusterIndex, fingerprint_headline
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+from cryptex_project.cryptex_project.scripts.common.s_ingest import catalyst_hash, ingest_catalysts
+
+ASSETS = [("Bitcoin", "BTC"), ("Ethereum", "ETH"), ("Solana", "SOL"), ("XRP", "XRP"), ("Dogecoin", "DOGE"), ("Cardano", "ADA"),
+          ("Chainlink", "LINK"), ("Avalanche", "AVAX"), ("Polygon", "MATIC"), ("Pepe", "PEPE")]
+VERBS = [("surges", "jumps", "soars"), ("drops", "falls", "slides"), ("rallies", "climbs", "rises"), ("plunges", "tumbles", "sinks")]
+REASONS = ["ETF inflows hit record", "SEC delays decision", "exchange hack drains hot wallet", "whale moves coins to Binance",
+           "Fed signals rate cut", "network upgrade goes live", "major bank announces custody service", "short squeeze liquidates traders",
+           "stablecoin depegs briefly", "court rules in Ripple case", "miners sell reserves", "Coinbase lists new perpetuals"]
+OUTLETS = ["CoinDesk", "Cointelegraph", "The Block", "Decrypt", "Bloomberg", "Reuters", "CryptoSlate", "Yahoo Finance"]
+
+
+def news_day(n_stories: int, max_copies: int, seed: int = 24) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """Shuffled articles and the true story of each."""
+    rng = random.Random(seed)
+    articles, truth = [], []
+    combos = [(a, v, r) for a in ASSETS for v in VERBS for r in REASONS]
+    for story, ((name, symbol), verb, reason) in enumerate(rng.sample(combos, min(n_stories, len(combos)))):
+        figure = f"{rng.randint(3, 40)}%"
+        for copy in range(rng.randint(1, max_copies)):
+            headline = f"{name} {rng.choice(verb)} {figure} as {reason}"
+            if rng.random() < 0.3:
+                headline = rng.choice(["BREAKING: ", "JUST IN: ", "Update: "]) + headline
+            if rng.random() < 0.2:
+                headline = headline.upper()
+            headline += f" - {rng.choice(OUTLETS)}"
+            articles.append({"headline": headline, "source": "Test Wire", "asset_tags": [symbol],
+                             "raw_data": {"title": headline, "url": f"https://example.invalid/{story}/{copy}"}})
+            truth.append(story)
+    order = list(range(len(articles)))
+    rng.shuffle(order)
+    return [articles[i] for i in order], [truth[i] for i in order]
+
+
+def test_rewrites_join_the_first_cluster():
+    index = ClusterIndex()
+    first, _ = index.assign("a" * 64, fingerprint_headline("Bitcoin surges 12% as ETF inflows hit record - CoinDesk", ["BTC"]))
+    rewrite, _ = index.assign("b" * 64, fingerprint_headline("BREAKING: Bitcoin jumps 12% as ETF inflows hit record", ["BTC"]))
+    other_asset, _ = index.assign("c" * 64, fingerprint_headline("Ethereum surges 12% as ETF inflows hit record", ["ETH"]))
+    other_figure, _ = index.assign("d" * 64, fingerprint_headline("Bitcoin surges 30% as ETF inflows hit record", ["BTC"]))
+    assert rewrite == first
+    assert len({first, other_asset, other_figure}) == 3
+
+
+def test_headline_without_words_is_its_own_cluster():
+    index = ClusterIndex()
+    cluster_id, fingerprint = index.assign("e" * 64, fingerprint_headline("BREAKING - Reuters"))
+    assert fingerprint is None and cluster_id == s_catalyst_clusters.new_cluster_id("e" * 64)
+
+
+def test_news_day_clusters(db, n_stories=120, max_copies=12, trades_per_asset=3, batch_size=20):
+    articles, truth = news_day(n_stories, max_copies)
+    started = time.perf_counter()
+    for i in range(0, len(articles), batch_size):
+        ingest_catalysts(articles[i:i + batch_size])
+    elapsed = time.perf_counter() - started
+    with cursor() as cur:
+        cur.execute("SELECT content_hash, cluster_id FROM public.recent_catalysts")
+        clusters = dict(cur.fetchall())
+        cur.execute("SELECT COUNT(*) FROM public.catalyst_fingerprints")
+        fingerprints = cur.fetchone()[0]
+
+    labels = [clusters[catalyst_hash(a["raw_data"])] for a in articles]
+    same_story = same_cluster = both = 0
+    for i, j in combinations(range(len(articles)), 2):
+        s, c = truth[i] == truth[j], labels[i] == labels[j]
+        same_story, same_cluster, both = same_story + s, same_cluster + c, both + (s and c)
+    # Every trade on an asset is paired with each catalyst tagged with it (a day's worth, worst case).
+    per_asset_catalysts: Dict[str, int] = {}
+    per_asset_clusters: Dict[str, set] = {}
+    for article, label in zip(articles, labels):
+        tag = article["asset_tags"][0]
+        per_asset_catalysts[tag] = per_asset_catalysts.get(tag, 0) + 1
+        per_asset_clusters.setdefault(tag, set()).add(label)
+    calls_before = trades_per_asset * sum(per_asset_catalysts.values())
+    calls_after = trades_per_asset * sum(len(c) for c in per_asset_clusters.values())
+    recall, precision = both / max(same_story, 1), both / max(same_cluster, 1)
+    print({"articles": len(articles), "stories": len(set(truth)), "clusters": len(set(labels)),
+           "articles_per_s": round(len(articles) / elapsed), "pair_recall": round(recall, 3), "pair_precision": round(precision, 3),
+           "llm_calls_before": calls_before, "llm_calls_after": calls_after, **s_catalyst_clusters.cluster_stats()})
+
+    assert fingerprints == len(articles)
+    assert recall > 0.95 and precision > 0.9
+    assert calls_after < calls_before / 2
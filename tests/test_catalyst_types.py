@@ -0,0 +1,50 @@
+# File: test_catalyst_types.py
+# Catalyst types set at ingest (common/s_catalyst_types.py via s_ingest.ingest_catalysts), which key
+# the per-type track records read by the historical-precedent check.
+
+import pytest
+
+from cryptex_project.cryptex_project.scripts.common.s_catalyst_types import article_catalyst_type, classify_catalyst
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+from cryptex_project.cryptex_project.scripts.common.s_ingest import ingest_catalysts
+
+
+@pytest.mark.parametrize("headline, expected", [
+    ("Exchange hacked as $40M is drained from hot wallets", "hack"),
+    ("Binance lists PEPE after hackers drain rival", "hack"),  # Earlier classes win
+    ("Coinbase delists XRP", "delisting"),
+    ("BlackRock spot ETF approved by the SEC", "etf"),
+    ("SEC sues Kraken over staking", "regulation"),
+    ("Binance will list NEWT on Monday", "listing"),
+    ("Fed signals a rate cut in September", "macro"),
+    ("Solana partners with Visa", "partnership"),
+    ("Ethereum hard fork set for May", "upgrade"),
+    ("ARB token unlock next week", "tokenomics"),
+    ("Bitcoin holds 60k", "unknown"),
+    ("Listless trading on a quiet Sunday", "unknown"),  # Whole words only
+    (None, "unknown"),
+])
+def test_headlines_are_classified(headline, expected):
+    assert classify_catalyst(headline) == expected
+
+
+def test_description_is_used_when_the_headline_says_little():
+    assert article_catalyst_type({"title": "Big news for SOL", "description": "Solana announced a partnership with Visa."}) == "partnership"
+    assert article_catalyst_type({"headline": "Coinbase delists XRP"}) == "delisting"
+
+
+def test_ingest_stores_the_catalyst_type(db):
+    articles = [
+        {"headline": "Exchange hacked, ETH drained", "source": "feed", "asset_tags": ["ETH"],
+         "raw_data": {"url": "https://news.example/1", "title": "Exchange hacked, ETH drained"}},
+        {"headline": "BTC climbs", "source": "feed", "asset_tags": ["BTC"],
+         "raw_data": {"url": "https://news.example/2", "title": "BTC climbs", "description": "Spot ETF inflows hit a record."}},
+        {"headline": "SOL quiet", "source": "feed", "asset_tags": ["SOL"],
+         "raw_data": {"url": "https://news.example/3", "title": "SOL quiet", "catalyst_type": "listing"}},  # Set by the caller
+    ]
+    ingest_catalysts(articles)
+
+    with cursor() as cur:
+        cur.execute("SELECT headline, raw_data->>'catalyst_type' FROM public.recent_catalysts")
+        assert dict(cur.fetchall()) == {"Exchange hacked, ETH drained": "hack", "BTC climbs": "etf", "SOL quiet": "listing"}
+    assert "catalyst_type" not in articles[0]["raw_data"]  # The caller's dicts are left alone
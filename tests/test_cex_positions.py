@@ -0,0 +1,105 @@
+# File: test_cex_positions.py
+# Leaderboard polling and position diffing (common/s_cex_positions.py) against a stub endpoint.
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+from cryptex_project.cryptex_project.scripts.common.s_cex_positions import diff_positions, poll_traders, poller_stats
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+
+
+def test_diff_emits_signed_flow():
+    previous = {("BTCUSDT", "LONG"): {"symbol": "BTCUSDT", "amount": 2.0}, ("ETHUSDT", "SHORT"): {"symbol": "ETHUSDT", "amount": -5.0}}
+    current = [{"symbol": "BTCUSDT", "amount": 3.0}, {"symbol": "SOLUSDT", "amount": -1.0}, {"symbol": "XRPUSDT", "amount": 0}]
+    events, upserts, closed = diff_positions(previous, current)
+    assert sorted((e["symbol"], e["event"], e["amount"], e["position_amount"]) for e in events) == [
+        ("BTCUSDT", "RESIZE", 1.0, 3.0), ("ETHUSDT", "CLOSE", 5.0, 0.0), ("SOLUSDT", "OPEN", -1.0, -1.0)]
+    assert set(upserts) == {("BTCUSDT", "LONG"), ("SOLUSDT", "SHORT")}
+    assert closed == [("ETHUSDT", "SHORT")]
+
+
+def test_unchanged_positions_emit_nothing():
+    previous = {("BTCUSDT", "LONG"): {"symbol": "BTCUSDT", "amount": "2.0"}}
+    assert diff_positions(previous, [{"symbol": "BTCUSDT", "amount": 2.0, "markPrice": 70000}]) == ([], {}, [])
+
+
+def stub_leaderboard(state, positions_per_trader: int, change_ratio: float, latency_s: float = 0.01):
+    """Positions derived from the trader id; from tick 1 on, change_ratio of them were resized or closed."""
+    def positions_for(uid: str) -> List[Dict[str, Any]]:
+        seed = int(uid.split("-")[1])
+        positions = []
+        for i in range(positions_per_trader):
+            moved = state["tick"] and (seed * 31 + i * 17) % 1000 < change_ratio * 1000
+            if moved and i % 2:
+                continue  # Closed
+            amount = (1 + (seed + i) % 7) * (1 if i % 3 else -1) * (2 if moved else 1)
+            positions.append({"symbol": f"SYM{i}USDT", "entryPrice": 100.0 + i, "markPrice": 101.0 + i, "amount": amount,
+                              "leverage": 10, "updateTime": [2026, 1, 1, 0, 0, state["tick"] if moved else 0]})
+        return positions
+
+    def handler(method, path, body):
+        uid = parse_qs(urlparse(path).query)["encryptedUid"][0]
+        time.sleep(latency_s)  # Simulated API latency
+        return 200, {"data": {"otherPositionRetList": positions_for(uid)}, "success": True}
+    return handler
+
+
+def test_polls_record_only_changes(db, stub_server, n_traders=200, positions_per_trader=20, change_ratio=0.05):
+    state = {"tick": 0}
+    url = stub_server(stub_leaderboard(state, positions_per_trader, change_ratio)) + "/leaderboard"
+    traders = [f"trader-{i}" for i in range(n_traders)]
+    before = poller_stats()
+    ticks = []
+    for tick in range(3):
+        state["tick"] = min(tick, 1)  # Tick 2 repeats tick 1: nothing changed
+        started = time.perf_counter()
+        result = asyncio.run(poll_traders(traders, url, rate_limit_rps=1000))
+        ticks.append({"elapsed_s": round(time.perf_counter() - started, 2), **result})
+    print({"traders": n_traders, "positions": n_traders * positions_per_trader, "ticks": [
+        {k: t[k] for k in ("elapsed_s", "events", "failed_traders")} for t in ticks]})
+
+    assert ticks[0]["events"] == n_traders * positions_per_trader
+    assert 0 < ticks[1]["events"] < n_traders * positions_per_trader * change_ratio * 2
+    assert ticks[2]["events"] == 0 and not ticks[2]["assets"]
+    assert poller_stats()["requests"] - before["requests"] == 3 * n_traders
+    with cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM public.recent_trades")
+        assert cur.fetchone()[0] == ticks[0]["events"] + ticks[1]["events"]
+        cur.execute("SELECT raw_data->>'event', COUNT(*) FROM public.recent_trades GROUP BY 1")
+        kinds = dict(cur.fetchall())
+        cur.execute("SELECT COUNT(*) FROM public.cex_trader_positions")
+        assert cur.fetchone()[0] == n_traders * positions_per_trader - kinds.get("CLOSE", 0)
+    assert kinds["OPEN"] == ticks[0]["events"] and kinds.get("RESIZE", 0) and kinds.get("CLOSE", 0)
+
+
+def test_failed_polls_keep_the_last_positions(db, stub_server):
+    # Tick 1: trader-0 hides its positions, trader-1 has a transient 503, trader-2 gets a 403.
+    state = {"tick": 0}
+    requests = Counter()
+    positions = stub_leaderboard(state, positions_per_trader=3, change_ratio=0)
+
+    def handler(method, path, body):
+        uid = parse_qs(urlparse(path).query)["encryptedUid"][0]
+        requests[uid] += 1
+        if state["tick"] and uid == "trader-0":
+            return 200, {"data": {"otherPositionRetList": None}, "success": True}
+        if state["tick"] and uid == "trader-1" and requests[uid] == 2:
+            return 503, {"success": False}
+        if state["tick"] and uid == "trader-2":
+            return 403, {"success": False}
+        return positions(method, path, body)
+
+    url = stub_server(handler) + "/leaderboard"
+    traders = ["trader-0", "trader-1", "trader-2"]
+    assert asyncio.run(poll_traders(traders, url, rate_limit_rps=1000))["events"] == 9
+    state["tick"] = 1
+    result = asyncio.run(poll_traders(traders, url, rate_limit_rps=1000))
+
+    assert (result["events"], result["failed_traders"]) == (0, 2)
+    assert requests == {"trader-0": 2, "trader-1": 3, "trader-2": 2}  # Only the 503 was retried
+    with cursor() as cur:
+        cur.execute("SELECT trader_id, COUNT(*) FROM public.cex_trader_positions GROUP BY 1")
+        assert dict(cur.fetchall()) == {uid: 3 for uid in traders}
@@ -0,0 +1,105 @@
+# File: test_correlate.py
+# Incremental trade/catalyst correlation (common/s_correlate.py) on a throwaway database.
+
+import json
+
+import psycopg2
+import pytest
+
+from cryptex_project.cryptex_project.scripts.common.s_correlate import MAX_ATTEMPTS, fetch_new_pairs, finish_pairs
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+
+
+def insert_trade(cur, trader_id: str, asset: str) -> int:
+    cur.execute("INSERT INTO public.recent_trades (trader_id, asset, raw_data) VALUES (%s, %s, %s) RETURNING id",
+                (trader_id, asset, json.dumps({"symbol": asset})))
+    return cur.fetchone()[0]
+
+
+def insert_catalyst(cur, headline: str, tags) -> int:
+    cur.execute("INSERT INTO public.recent_catalysts (headline, asset_tags, raw_data) VALUES (%s, %s, %s) RETURNING id",
+                (headline, list(tags), json.dumps({"title": headline})))
+    return cur.fetchone()[0]
+
+
+@pytest.fixture
+def ingest_session(db):
+    """A second connection standing in for a concurrent ingest job; each test commits it itself."""
+    conn = psycopg2.connect(**db)
+    yield conn
+    conn.close()
+
+
+def pairs(consumer: str = "test", track: bool = False):
+    return sorted((p["trade_id"], p["catalyst_id"]) for p in fetch_new_pairs(consumer, track=track))
+
+
+def statuses(consumer: str):
+    with cursor() as cur:
+        cur.execute("SELECT trade_id, catalyst_id, status, attempts FROM public.correlated_pairs WHERE consumer = %s", (consumer,))
+        return {(t, c): (status, attempts) for t, c, status, attempts in cur.fetchall()}
+
+
+def test_rows_are_paired_once(db):
+    with cursor() as cur:
+        catalyst = insert_catalyst(cur, "BTC breaks out", ["BTC"])
+        trade = insert_trade(cur, "whale", "BTC")
+        eth_trade = insert_trade(cur, "whale", "ETH")
+    assert pairs() == [(trade, catalyst)]
+    assert pairs() == []
+    with cursor() as cur:
+        later = insert_catalyst(cur, "BTC ETF inflows", ["BTC", "ETH"])
+    assert pairs() == [(trade, later), (eth_trade, later)]
+    assert pairs("other") == [(trade, catalyst), (trade, later), (eth_trade, later)]  # A new consumer starts from the window
+
+
+def test_row_committed_after_a_higher_id_is_still_paired(db, ingest_session):
+    with cursor() as cur:
+        catalyst = insert_catalyst(cur, "BTC breaks out", ["BTC"])
+    # The slow ingest takes the lower id first and commits last.
+    slow = ingest_session.cursor()
+    slow_trade = insert_trade(slow, "slow", "BTC")
+    slow_catalyst = insert_catalyst(slow, "SOL outage", ["SOL"])
+    with cursor() as cur:
+        fast_trade = insert_trade(cur, "fast", "BTC")
+        sol_trade = insert_trade(cur, "fast", "SOL")
+    assert slow_trade < fast_trade and slow_catalyst < sol_trade
+
+    assert pairs() == [(fast_trade, catalyst)]
+    ingest_session.commit()
+    assert pairs() == [(slow_trade, catalyst), (sol_trade, slow_catalyst)]
+    assert pairs() == []
+
+
+def test_tracked_pairs_are_retried_until_finished(db):
+    with cursor() as cur:
+        catalyst = insert_catalyst(cur, "BTC breaks out", ["BTC"])
+        ok, flaky = (insert_trade(cur, trader, "BTC") for trader in ("ok", "flaky"))
+    assert pairs("engine", track=True) == [(ok, catalyst), (flaky, catalyst)]
+    finish_pairs("engine", done=[(ok, catalyst)], failed=[(flaky, catalyst)])
+    assert statuses("engine") == {(ok, catalyst): ("DONE", 1), (flaky, catalyst): ("PENDING", 1)}
+
+    assert pairs("engine", track=True) == [(flaky, catalyst)]  # Failed: due on the next run
+    assert pairs("engine", track=True) == []  # Handed out and not finished: leased to that run
+    with cursor() as cur:  # ...until the run is presumed dead
+        cur.execute("UPDATE public.correlated_pairs SET claimed_at = NOW() - interval '1 day' WHERE consumer = 'engine'")
+    assert pairs("engine", track=True) == [(flaky, catalyst)]
+    finish_pairs("engine", done=[], failed=[(flaky, catalyst)])
+
+    assert statuses("engine")[(flaky, catalyst)] == ("FAILED", MAX_ATTEMPTS)
+    assert pairs("engine", track=True) == []
+    assert set(statuses("untracked").values()) <= {("DONE", 0)} and pairs("untracked") == [(ok, catalyst), (flaky, catalyst)]
+
+
+def test_pairing_does_not_depend_on_when_the_run_happens(db):
+    # A run that starts late still pairs rows ingested less than a window apart, as the daemon does,
+    # even when the older row has already left the window.
+    with cursor() as cur:
+        cur.execute("INSERT INTO public.recent_catalysts (ingested_at, headline, asset_tags, raw_data) VALUES "
+                    "(NOW() - interval '6 minutes', 'BTC breaks out', '{BTC}', '{}'), "
+                    "(NOW() - interval '9 minutes', 'BTC fees spike', '{BTC}', '{}') RETURNING id")
+        near, far = (row[0] for row in cur.fetchall())
+        cur.execute("INSERT INTO public.recent_trades (ingested_at, trader_id, asset, raw_data) "
+                    "VALUES (NOW() - interval '2 minutes', 'late', 'BTC', '{}') RETURNING id")
+        trade = cur.fetchone()[0]
+    assert pairs() == [(trade, near)]
@@ -0,0 +1,68 @@
+# File: test_correlation_daemon.py
+# The streaming correlator (s_correlation_daemon.py) against the cron SQL path (common/s_correlate.py),
+# on a throwaway database.
+
+import json
+import random
+import threading
+import time
+
+from cryptex_project.cryptex_project.scripts import s_correlation_daemon
+from cryptex_project.cryptex_project.scripts.common.s_correlate import fetch_new_pairs
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+
+
+def insert_row(kind: str, age_s: float, asset_or_tags, cluster_id=None) -> None:
+    """Inserts a trade or catalyst stamped `age_s` seconds ago, in its own transaction (one NOTIFY each)."""
+    with cursor() as cur:
+        if kind == "trade":
+            cur.execute("INSERT INTO public.recent_trades (ingested_at, trader_id, asset, raw_data) "
+                        "VALUES (NOW() - make_interval(secs => %s), %s, %s, %s)",
+                        (age_s, "trader", asset_or_tags, json.dumps({"symbol": asset_or_tags})))
+        else:
+            cur.execute("INSERT INTO public.recent_catalysts (ingested_at, headline, asset_tags, raw_data, cluster_id) "
+                        "VALUES (NOW() - make_interval(secs => %s), %s, %s, %s, %s)",
+                        (age_s, "headline", asset_or_tags, json.dumps({"title": "headline"}), cluster_id))
+
+
+def emitted(consumer: str):
+    with cursor() as cur:
+        cur.execute("SELECT trade_id, catalyst_id FROM public.correlated_pairs WHERE consumer = %s", (consumer,))
+        return set(cur.fetchall())
+
+
+def wait_for_watermark(consumer: str, timeout_s: float = 10) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        with cursor() as cur:
+            cur.execute("SELECT 1 FROM public.correlation_watermarks WHERE consumer = %s", (consumer,))
+            if cur.fetchone():
+                return
+        time.sleep(0.05)
+    raise TimeoutError(f"{consumer} did not start")
+
+
+def test_daemon_emits_the_same_pairs_as_the_cron_sql(db, n_rows=60, seed=5):
+    rng = random.Random(seed)
+    assets = ["BTC", "ETH", "SOL"]
+    # Rows arrive oldest first, spread over most of the window, so some pairs are nearly a window apart.
+    rows = []
+    for age in sorted((rng.uniform(0, 240) for _ in range(n_rows)), reverse=True):
+        if rng.random() < 0.5:
+            rows.append(("trade", age, rng.choice(assets), None))
+        else:
+            rows.append(("catalyst", age, rng.sample(assets, rng.randint(1, 2)), rng.choice([None, 1, 2])))
+
+    daemon = threading.Thread(target=s_correlation_daemon.main, kwargs={"run_for_seconds": 6})
+    daemon.start()
+    wait_for_watermark("correlation_daemon")
+    for i, row in enumerate(rows):
+        insert_row(*row)
+        if i % 15 == 14:
+            fetch_new_pairs("cron")
+    fetch_new_pairs("cron")
+    daemon.join()
+
+    cron, streamed = emitted("cron"), emitted("correlation_daemon")
+    print({"rows": n_rows, "cron_pairs": len(cron), "daemon_pairs": len(streamed)})
+    assert cron and streamed == cron
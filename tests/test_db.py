@@ -0,0 +1,74 @@
+# File: test_db.py
+# The pooled Postgres layer (common/s_db.py) on a throwaway database: connection reuse, the idle
+# health check, and prepared statements after the server drops a connection.
+
+import psycopg2
+import pytest
+
+from cryptex_project.cryptex_project.scripts.common import s_db
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor, execute_prepared, pool_stats
+
+
+def backend_pid() -> int:
+    with cursor() as cur:
+        cur.execute("SELECT pg_backend_pid()")
+        return cur.fetchone()[0]
+
+
+def terminate(db, pid: int) -> None:
+    conn = psycopg2.connect(**db)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_terminate_backend(%s)", (pid,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def active_traders():
+    with cursor() as cur:
+        execute_prepared(cur, "select_active_traders")
+        return [row[0] for row in cur.fetchall()]
+
+
+def add_trader(identifier: str) -> None:
+    with cursor() as cur:
+        cur.execute("INSERT INTO public.monitored_traders (identifier, exchange, description) VALUES (%s, 'binance', 'test')",
+                    (identifier,))
+
+
+def test_connections_and_prepared_statements_are_reused(db):
+    add_trader("uid-1")
+    before = pool_stats()
+    pid = backend_pid()
+    assert [backend_pid() for _ in range(3)] == [pid] * 3
+    assert "uid-1" in active_traders() and "uid-1" in active_traders()
+    stats = pool_stats()
+    assert stats["prepared"] - before["prepared"] == 1 and stats["reconnects"] == before["reconnects"]
+
+
+def test_idle_health_check_replaces_a_dropped_connection(db, monkeypatch):
+    add_trader("uid-1")
+    pid = backend_pid()
+    active_traders()
+    terminate(db, pid)
+    monkeypatch.setattr(s_db, "HEALTH_CHECK_AFTER_S", 0)  # Every pooled connection counts as idle
+    before = pool_stats()
+
+    assert "uid-1" in active_traders()  # Re-prepared on the new connection
+    stats = pool_stats()
+    assert backend_pid() != pid
+    assert stats["health_checks"] > before["health_checks"] and stats["reconnects"] - before["reconnects"] == 1
+    assert stats["prepared"] - before["prepared"] == 1
+
+
+def test_connection_dropped_mid_use_is_discarded(db):
+    pid = backend_pid()
+    terminate(db, pid)
+    # Used within the health-check window, the dead connection is only found out by the query itself...
+    with pytest.raises(psycopg2.OperationalError):
+        backend_pid()
+    # ...and is closed rather than returned to the pool.
+    assert backend_pid() != pid
+    add_trader("uid-2")
+    assert "uid-2" in active_traders()
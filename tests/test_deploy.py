@@ -0,0 +1,127 @@
+# File: test_deploy.py
+# The incremental Windmill deployer (deploy_fixed_port.py) against a stub Windmill API: only items whose
+# content changed since the last deploy are uploaded, and the manifest only records what succeeded.
+
+import json
+
+import pytest
+
+import deploy_fixed_port
+from deploy_fixed_port import deploy
+
+TARGET = "{}|cryptex_test"
+
+
+@pytest.fixture
+def windmill(stub_server):
+    """Stub scripts/flows create and update endpoints; create answers 409 for a known path, update 404
+    for an unknown one, and paths in `failing` get a 400. Records (action, path) per request."""
+    state = {"stored": {}, "requests": [], "failing": set()}
+
+    def handler(method, path, body):
+        payload = json.loads(body)
+        kind, action = path.rsplit("/", 2)[-2:]
+        key = (kind, payload["path"])
+        state["requests"].append((action, payload["path"]))
+        if payload["path"] in state["failing"]:
+            return 400, {"error": "invalid payload"}
+        if action == "create" and key in state["stored"]:
+            return 409, {"error": "already exists"}
+        if action == "update" and key not in state["stored"]:
+            return 404, {"error": "not found"}
+        state["stored"][key] = payload
+        return (201 if action == "create" else 200), {}
+
+    state["url"] = stub_server(handler)
+    return state
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    (root / "scripts" / "common").mkdir(parents=True)
+    (root / "flows").mkdir()
+    (root / "scripts" / "s_one.py").write_text('"""First script."""\ndef main():\n    return 1\n')
+    (root / "scripts" / "common" / "s_two.py").write_text("def main():\n    return 2\n")
+    (root / "flows" / "f_main.yml").write_text("summary: Main flow\nvalue:\n  modules: []\n")
+    (root / "README.md").write_text("Not deployed.\n")
+    return root
+
+
+def run(windmill, project, manifest_file, **kwargs):
+    del windmill["requests"][:]
+    return deploy(windmill["url"], "token", "cryptex_test", str(project), str(manifest_file), **kwargs)
+
+
+def manifest(windmill, manifest_file):
+    return json.loads(manifest_file.read_text())[TARGET.format(windmill["url"])]
+
+
+def test_only_changed_items_are_uploaded(windmill, project, tmp_path):
+    manifest_file = tmp_path / "manifest.json"
+
+    cold = run(windmill, project, manifest_file)
+    assert (cold["items"], cold["deployed"], cold["failed"], cold["unchanged"]) == (3, 3, 0, 0)
+    assert sorted(windmill["requests"]) == [("create", "flows/f_main"), ("create", "scripts/common/s_two"),
+                                            ("create", "scripts/s_one")]
+    assert set(manifest(windmill, manifest_file)) == {"flows/f_main", "scripts/common/s_two", "scripts/s_one"}
+    assert windmill["stored"][("scripts", "scripts/s_one")]["summary"] == "First script."
+    assert windmill["stored"][("flows", "flows/f_main")]["summary"] == "Main flow"
+
+    unchanged = run(windmill, project, manifest_file)
+    assert (unchanged["deployed"], unchanged["unchanged"]) == (0, 3)
+    assert windmill["requests"] == []
+
+    (project / "scripts" / "s_one.py").write_text('"""First script."""\ndef main():\n    return 10\n')
+    edited = run(windmill, project, manifest_file)
+    assert (edited["deployed"], edited["unchanged"]) == (1, 2)
+    assert windmill["requests"] == [("update", "scripts/s_one")]  # Known path: straight to update
+    assert "return 10" in windmill["stored"][("scripts", "scripts/s_one")]["content"]
+
+
+def test_known_paths_deleted_in_windmill_are_recreated(windmill, project, tmp_path):
+    manifest_file = tmp_path / "manifest.json"
+    run(windmill, project, manifest_file)
+    del windmill["stored"][("scripts", "scripts/common/s_two")]
+
+    (project / "scripts" / "common" / "s_two.py").write_text("def main():\n    return 20\n")
+    result = run(windmill, project, manifest_file)
+
+    assert (result["deployed"], result["failed"]) == (1, 0)
+    assert windmill["requests"] == [("update", "scripts/common/s_two"), ("create", "scripts/common/s_two")]
+    assert ("scripts", "scripts/common/s_two") in windmill["stored"]
+
+
+def test_existing_paths_missing_from_the_manifest_are_updated(windmill, project, tmp_path):
+    run(windmill, project, tmp_path / "manifest.json")
+
+    result = run(windmill, project, tmp_path / "other_manifest.json")  # E.g. deployed from another checkout
+
+    assert (result["deployed"], result["failed"]) == (3, 0)
+    assert sorted(windmill["requests"]) == sorted((action, path) for path in ("flows/f_main", "scripts/common/s_two", "scripts/s_one")
+                                                  for action in ("create", "update"))
+
+
+def test_manifest_records_only_successful_uploads(windmill, project, tmp_path):
+    manifest_file = tmp_path / "manifest.json"
+    run(windmill, project, manifest_file)
+    before = manifest(windmill, manifest_file)
+
+    (project / "scripts" / "s_one.py").write_text("def main():\n    return 'broken'\n")
+    (project / "flows" / "f_main.yml").write_text("summary: Main flow v2\nvalue:\n  modules: []\n")
+    windmill["failing"].add("scripts/s_one")
+    result = run(windmill, project, manifest_file)
+
+    assert (result["deployed"], result["failed"], result["unchanged"]) == (1, 1, 1)
+    after = manifest(windmill, manifest_file)
+    assert after["scripts/s_one"] == before["scripts/s_one"]  # Still the last deployed version
+    assert after["flows/f_main"] != before["flows/f_main"]
+    assert after["scripts/common/s_two"] == before["scripts/common/s_two"]
+
+    # The failed item is retried on the next run, and only it.
+    windmill["failing"].clear()
+    retry = run(windmill, project, manifest_file)
+    assert (retry["deployed"], retry["failed"]) == (1, 0)
+    assert windmill["requests"] == [("update", "scripts/s_one")]
+    assert manifest(windmill, manifest_file)["scripts/s_one"]["hash"] == deploy_fixed_port.payload_hash(
+        windmill["stored"][("scripts", "scripts/s_one")])
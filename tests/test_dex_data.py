@@ -0,0 +1,75 @@
+# File: test_dex_data.py
+# Cached, coalesced and batched DexScreener lookups (common/s_dex_data.py) against a stub API.
+
+import asyncio
+import random
+import threading
+import time
+
+from cryptex_project.cryptex_project.scripts.common import s_dex_data
+from cryptex_project.cryptex_project.scripts.common.s_dex_data import DexScreenerClient, dex_stats
+
+
+def stub_dexscreener(known_ratio: float, latency_s: float = 0.02):
+    requested = []
+    lock = threading.Lock()
+
+    def handler(method, path, body):
+        addresses = path.rstrip("/").rsplit("/", 1)[-1].split(",")
+        with lock:
+            requested.append(addresses)
+        time.sleep(latency_s)  # Simulated API latency
+        pairs = [{"chainId": "ethereum", "pairAddress": f"pair-{a}", "priceUsd": "1.0",
+                  "baseToken": {"address": a}, "quoteToken": {"address": "0xweth"},
+                  "liquidity": {"usd": 10000 * (1 + int(a[-3:], 16) % 50)}, "pairCreatedAt": 1_600_000_000_000}
+                 for a in addresses if int(a[-3:], 16) % 100 < known_ratio * 100]
+        return 200, {"pairs": pairs}
+    return handler, requested
+
+
+def test_concurrent_lookups_are_batched_coalesced_and_cached(memory_backends, stub_server, n_tokens=200, n_lookups=1000):
+    handler, requested = stub_dexscreener(known_ratio=0.8)
+    base_url = stub_server(handler) + "/tokens/"
+    rng = random.Random(13)
+    tokens = [f"0x{i:040x}" for i in range(n_tokens)]
+    lookups = [rng.choice(tokens) for _ in range(n_lookups)]
+
+    async def run():
+        client = DexScreenerClient(base_url=base_url, rate_limit_rps=50)
+        # Many analyzers asking at once, in chunks of 20 signals each.
+        chunks = [lookups[i:i + 20] for i in range(0, len(lookups), 20)]
+        return await asyncio.gather(*(client.get_tokens(chunk) for chunk in chunks))
+
+    before = dex_stats()
+    cold = asyncio.run(run())
+    cold_requests = len(requested)
+    warm = asyncio.run(run())
+    stats = {k: v - before[k] for k, v in dex_stats().items()}
+    print({"lookups": n_lookups, "distinct_tokens": len(set(lookups)), "cold_requests": cold_requests, **stats})
+
+    fetched = [a for batch in requested for a in batch]
+    assert len(fetched) == len(set(fetched)) == len(set(lookups))
+    assert all(len(batch) <= s_dex_data.DEX_BATCH_SIZE for batch in requested)
+    assert len(requested) == cold_requests  # The warm run is served from the cache
+    assert cold == warm
+    for chunk in cold:
+        for address, summary in chunk.items():
+            if int(address[-3:], 16) % 100 < 80:
+                assert summary["pair_address"] == f"pair-{address}"
+            else:
+                assert summary is None  # Cached as a miss, not re-queried
+
+
+def test_failed_batch_is_retried(memory_backends, stub_server):
+    calls = []
+
+    def handler(method, path, body):
+        calls.append(path)
+        return (503, {"error": "unavailable"}) if len(calls) == 1 else (200, {"pairs": []})
+    base_url = stub_server(handler) + "/tokens/"
+
+    async def run():
+        return await DexScreenerClient(base_url=base_url, rate_limit_rps=50).get_tokens(["0xabc"])
+
+    assert asyncio.run(run()) == {"0xabc": None}
+    assert len(calls) == 2  # Retried once, then answered
@@ -0,0 +1,79 @@
+# File: test_dex_webhook_ingest.py
+# Alchemy Address Activity deliveries parsed into DEX trade rows (s_dex_webhook_ingest.py).
+
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+from cryptex_project.cryptex_project.scripts.s_dex_webhook_ingest import ingest_activity, parse_activity
+
+WALLET = "0x" + "ab" * 20
+OTHER = "0x" + "cd" * 20
+
+
+def delivery(activity: List[Dict[str, Any]], event_id: str = "whevt_1") -> Dict[str, Any]:
+    return {"webhookId": "wh_test", "id": event_id, "type": "ADDRESS_ACTIVITY", "event": {"network": "ETH_MAINNET", "activity": activity}}
+
+
+def synthetic_deliveries(n_deliveries: int, entries_per_delivery: int, wallets: List[str], seed: int = 21) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    tokens = [("USDC", "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48", 6), ("PEPE", "0x6982508145454ce325ddbe47a25d4ec3d2311933", 18),
+              ("WETH", "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2", 18)]
+    deliveries = []
+    for d in range(n_deliveries):
+        activity = []
+        for i in range(entries_per_delivery):
+            symbol, address, decimals = rng.choice(tokens)
+            entry = {"fromAddress": rng.choice(wallets), "toAddress": f"0x{rng.getrandbits(160):040x}", "blockNum": hex(19_000_000 + d),
+                     "hash": f"0x{d:08x}{i // 3:056x}", "category": "token", "asset": symbol,
+                     "rawContract": {"rawValue": hex(rng.randrange(1, 10 ** decimals * 1000)), "address": address, "decimals": decimals},
+                     "log": {"logIndex": hex(i % 3)}}
+            if rng.random() < 0.5:
+                entry["fromAddress"], entry["toAddress"] = entry["toAddress"], entry["fromAddress"]
+            activity.append(entry)
+        deliveries.append(delivery(activity, f"whevt_{d}"))
+    return deliveries
+
+
+def test_parse_signs_amounts_from_the_wallet_side():
+    payload = delivery([
+        {"fromAddress": OTHER, "toAddress": WALLET.upper().replace("0X", "0x"), "hash": "0xAA", "category": "token", "asset": "usdc",
+         "rawContract": {"rawValue": hex(2_500_000), "address": "0xA0B8", "decimals": 6}, "log": {"logIndex": "0x5"}},
+        {"fromAddress": WALLET, "toAddress": OTHER, "hash": "0xbb", "category": "external", "asset": "ETH", "value": 1.5},
+        {"fromAddress": WALLET, "toAddress": OTHER, "hash": "0xbb", "category": "internal", "asset": "ETH", "value": 0.5},
+        {"fromAddress": OTHER, "toAddress": "0x" + "ef" * 20, "hash": "0xcc", "category": "token", "asset": "PEPE", "value": 1},
+    ])
+    trades = parse_activity(payload, {WALLET})
+    assert [(t.tx_hash, t.log_index, t.asset, t.amount, t.token_address) for t in trades] == [
+        ("0xaa", 5, "USDC", 2.5, "0xa0b8"), ("0xbb", -1, "ETH", -1.5, None), ("0xbb", -2, "ETH", -0.5, None)]
+
+
+def test_transfer_between_two_monitored_wallets_is_two_rows():
+    payload = delivery([{"fromAddress": WALLET, "toAddress": OTHER, "hash": "0xdd", "asset": "ETH", "value": 2}])
+    assert sorted((t.trader_id, t.amount, t.counterparty) for t in parse_activity(payload, {WALLET, OTHER})) == \
+        sorted([(OTHER, 2.0, WALLET), (WALLET, -2.0, OTHER)])
+
+
+def test_redelivery_is_idempotent(db, n_deliveries=10, entries_per_delivery=500, n_wallets=100):
+    wallets = [f"0x{i:040x}" for i in range(n_wallets)]
+    monitored = set(wallets[:n_wallets // 2])
+    deliveries = synthetic_deliveries(n_deliveries, entries_per_delivery, wallets)
+    expected = sum(len(parse_activity(p, monitored)) for p in deliveries)
+
+    timings, assets = [], []
+    for _ in range(2):  # The second pass is Alchemy retrying every delivery
+        started = time.perf_counter()
+        assets.append([ingest_activity(p, monitored) for p in deliveries])
+        timings.append(time.perf_counter() - started)
+    entries = n_deliveries * entries_per_delivery
+    print({"deliveries": n_deliveries, "entries": entries, "payload_mb": round(sum(len(json.dumps(p)) for p in deliveries) / 1e6, 1),
+           "first_replay_s": round(timings[0], 2), "entries_per_s": round(entries / timings[0]), "redelivery_s": round(timings[1], 2)})
+
+    assert all(assets[0]) and not any(assets[1])
+    with cursor() as cur:
+        cur.execute("SELECT COUNT(*), COUNT(DISTINCT (raw_data->>'tx_hash', raw_data->>'log_index', trader_id)) FROM public.recent_trades")
+        assert cur.fetchone() == (expected, expected)
+        cur.execute("SELECT COALESCE(SUM(trades), 0) FROM public.herd_buckets")
+        assert cur.fetchone()[0] == expected  # Herd counts moved once per new row
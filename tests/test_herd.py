@@ -0,0 +1,53 @@
+# File: test_herd.py
+# Herd aggregates maintained at ingest (common/s_herd.py), checked against a count in Python.
+# The 1M-trade size is marked slow and deselected by default; run it with `pytest -m slow`.
+
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+from cryptex_project.cryptex_project.scripts.common.s_herd import DIRECTIONS, herd_index, record_herd_trades, refresh_herd_stats
+
+
+@pytest.mark.parametrize("n_trades", [20_000, pytest.param(1_000_000, marks=pytest.mark.slow)])
+def test_herd_index_matches_the_trades(db, n_trades, n_assets=20, n_traders=200, batch_size=2_000, n_lookups=1_000):
+    rng = random.Random(7)
+    assets = [f"TOK{i}" for i in range(n_assets)]
+    now = datetime.now(timezone.utc)
+    rows = []
+    for _ in range(n_trades):
+        # Spread over the last 23h, away from the 1h boundary so the expected counts are exact.
+        minutes_ago = rng.choice((rng.uniform(1, 50), rng.uniform(75, 23 * 60)))
+        rows.append((rng.choice(assets), rng.choice(DIRECTIONS), f"t{rng.randrange(n_traders)}", rng.uniform(1e3, 1e6),
+                     now - timedelta(minutes=minutes_ago)))
+
+    started = time.perf_counter()
+    for offset in range(0, n_trades, batch_size):
+        with cursor() as cur:
+            record_herd_trades(cur, rows[offset:offset + batch_size])
+    ingest_s = time.perf_counter() - started
+
+    expected_1h, expected_24h = defaultdict(set), defaultdict(int)
+    for asset, direction, trader, _, seen_at in rows:
+        expected_24h[asset, direction] += 1
+        if now - seen_at < timedelta(hours=1):
+            expected_1h[asset, direction].add(trader)
+
+    with cursor() as cur:
+        refresh_herd_stats(cur, assets)  # Ingest refreshes a key at most every few seconds
+        started = time.perf_counter()
+        for _ in range(n_lookups):
+            herd_index(cur, rng.choice(assets), rng.choice(DIRECTIONS))
+        lookup_s = time.perf_counter() - started
+        for asset in assets:
+            index = herd_index(cur, asset, "LONG", window="1h")
+            assert index["traders_same_side"] == len(expected_1h[asset, "LONG"])
+            assert index["traders_opposite_side"] == len(expected_1h[asset, "SHORT"])
+            cur.execute("SELECT direction, trades_24h FROM public.herd_stats WHERE asset = %s", (asset,))
+            assert {direction: trades for direction, trades in cur.fetchall()} == \
+                {direction: expected_24h[asset, direction] for direction in DIRECTIONS}
+    print({"trades": n_trades, "trades_per_s": round(n_trades / ingest_s), "lookup_us": round(lookup_s / n_lookups * 1e6, 1)})
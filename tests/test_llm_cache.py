@@ -0,0 +1,87 @@
+# File: test_llm_cache.py
+# The chat-completion cache (common/s_llm_cache.py). The Redis test runs only when
+# CRYPTEX_TEST_REDIS_URL points at a scratch Redis, e.g. redis://localhost:6379/15.
+
+import asyncio
+import os
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from cryptex_project.cryptex_project.scripts.common import s_llm_cache
+from cryptex_project.cryptex_project.scripts.common.s_llm_cache import DictBackend, RedisBackend, acached_chat_completion
+
+# --- CONFIG ---
+TEST_REDIS_URL = os.environ.get("CRYPTEX_TEST_REDIS_URL")
+# --------------
+
+
+class SlowBackend(DictBackend):
+    """A DictBackend with a blocking round-trip, like a Redis on a slow network."""
+
+    def __init__(self, delay_s: float):
+        super().__init__()
+        self.delay_s = delay_s
+
+    def get(self, key):
+        time.sleep(self.delay_s)
+        return super().get(key)
+
+    def set(self, key, value, ttl_s):
+        time.sleep(self.delay_s)
+        return super().set(key, value, ttl_s)
+
+
+class FakeAsyncClient:
+    """Answers every chat completion with the prompt after a short await."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, **params):
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=messages[0]["content"]))])
+
+
+def test_slow_backend_does_not_block_concurrent_calls(memory_backends, n_calls=10, delay_s=0.2):
+    backend = SlowBackend(delay_s)
+    s_llm_cache.set_backend(backend)
+    client = FakeAsyncClient()
+
+    async def run():
+        return await asyncio.gather(*(acached_chat_completion(client, "gpt-4o", [{"role": "user", "content": f"prompt {i}"}])
+                                      for i in range(n_calls)))
+
+    started = time.perf_counter()
+    answers = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+
+    assert answers == [f"prompt {i}" for i in range(n_calls)]
+    assert len(backend._data) == n_calls
+    # Blocking the loop would serialize one lookup and one store per call: 2 * n_calls * delay_s.
+    assert elapsed < n_calls * delay_s
+
+
+@pytest.fixture
+def redis_backend():
+    if not TEST_REDIS_URL:
+        pytest.skip("CRYPTEX_TEST_REDIS_URL is not set")
+    backend = RedisBackend(TEST_REDIS_URL, max_entries=3, index_key=f"cryptex:test:{uuid.uuid4().hex}:index")
+    yield backend
+    backend.client.delete(backend.index_key, *backend.client.zrange(backend.index_key, 0, -1))
+
+
+def test_short_ttl_entries_do_not_trim_longer_lived_ones(redis_backend):
+    prefix = redis_backend.index_key[:-len("index")]
+    redis_backend.set(prefix + "long", "kept for an hour", 3600)
+    time.sleep(1.1)
+    redis_backend.set(prefix + "short", "kept for a second", 1)
+    assert redis_backend.client.zscore(redis_backend.index_key, prefix + "long") is not None
+
+    # At the cap, the entry closest to expiry goes first, whatever the write order.
+    redis_backend.set(prefix + "medium-1", "kept for a minute", 60)
+    assert redis_backend.set(prefix + "medium-2", "kept for a minute", 60) == 1
+    assert redis_backend.get(prefix + "short") is None
+    assert redis_backend.get(prefix + "long") == "kept for an hour"
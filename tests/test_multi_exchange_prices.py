@@ -0,0 +1,88 @@
+# File: test_multi_exchange_prices.py
+# Batched trade-idea pricing (intelligence/s_get_multi_exchange_prices.py over common/s_price_cache.py)
+# against stub ccxt REST clients, with an empty in-process snapshot so every quote comes over REST.
+
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from cryptex_project.cryptex_project.scripts.common import s_price_cache
+from cryptex_project.cryptex_project.scripts.common.s_price_cache import DictSnapshot, set_store
+from cryptex_project.cryptex_project.scripts.intelligence.s_get_multi_exchange_prices import best_quotes, price_ideas
+
+NAN = float("nan")
+
+
+class StubExchange:
+    """Synchronous ccxt client with a fixed market list and tickers; records its ticker requests."""
+
+    def __init__(self, name: str, tickers: Dict[str, Dict[str, Any]]):
+        self.id = name
+        self.has = {"fetchTickers": True}
+        self.tickers = tickers
+        self.markets = {symbol: {"symbol": symbol, "id": symbol.replace("/", ""), "spot": True} for symbol in tickers}
+        self.markets_by_id = {m["id"]: [m] for m in self.markets.values()}
+        self.fetch_tickers_calls: List[List[str]] = []
+
+    def load_markets(self) -> Dict[str, Any]:
+        return self.markets
+
+    def fetch_tickers(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        self.fetch_tickers_calls.append(list(symbols))
+        return {s: {"symbol": s, **self.tickers[s]} for s in symbols}
+
+    def fetch_ticker(self, symbol: str) -> Dict[str, Any]:
+        raise AssertionError("batched pricing must not fetch tickers one by one")
+
+
+def ticker(last: float, bid: float, ask: float) -> Dict[str, float]:
+    return {"last": last, "bid": bid, "ask": ask}
+
+
+@pytest.fixture
+def exchanges(monkeypatch):
+    """kraken quotes in USD, binance in USDT; only binance lists SOL, and kraken's ETH book is empty (NaN)."""
+    stubs = {
+        "kraken": StubExchange("kraken", {"BTC/USD": ticker(60010, 60000, 60020), "ETH/USD": ticker(2990, NAN, NAN)}),
+        "binance": StubExchange("binance", {"BTC/USDT": ticker(60005, 59990, 60030), "ETH/USDT": ticker(3000, 2999, 3001),
+                                            "SOL/USDT": ticker(150, 149.9, 150.1)}),
+    }
+    for name, stub in stubs.items():
+        monkeypatch.setitem(s_price_cache._rest_clients, name, stub)
+    set_store(DictSnapshot())
+    yield stubs
+    set_store(None)
+
+
+def test_ideas_are_priced_with_one_ticker_request_per_exchange(exchanges):
+    ideas = [{"asset": "ETH", "id": 1}, {"asset": "DOGE", "id": 2}, {"asset": "SOLUSDT", "id": 3}, {"asset": "BTC", "id": 4},
+             {"asset": "ETH", "id": 5}]
+
+    priced = asyncio.run(price_ideas(ideas, exchanges=["kraken", "binance"]))
+
+    # Symbols come from each exchange's own market list, not a fixed asset map.
+    assert {name: [sorted(c) for c in stub.fetch_tickers_calls] for name, stub in exchanges.items()} == {
+        "kraken": [["BTC/USD", "ETH/USD"]], "binance": [["BTC/USDT", "ETH/USDT", "SOL/USDT"]]}
+    assert [p["id"] for p in priced] == [1, 2, 3, 4, 5]
+    assert priced[1] == {"asset": "DOGE", "id": 2, "live_prices": []}
+    btc = priced[3]
+    assert (btc["best_price"], btc["best_price_exchange"]) == (60005, "binance")
+    assert (btc["best_bid"], btc["best_bid_exchange"], btc["best_ask"], btc["best_ask_exchange"]) == (60000, "kraken", 60020, "kraken")
+    assert [row["exchange"] for row in btc["live_prices"]] == ["binance", "kraken"]  # Cheapest first
+    sol = priced[2]
+    assert (sol["best_price"], [row["exchange"] for row in sol["live_prices"]]) == (150, ["binance"])
+    # kraken's NaN book never wins, even though its last price is the lowest.
+    eth = priced[0]
+    assert (eth["best_price_exchange"], eth["best_bid"], eth["best_bid_exchange"], eth["best_ask"], eth["best_ask_exchange"]) == (
+        "kraken", 2999, "binance", 3001, "binance")
+    assert priced[4] == {**eth, "id": 5}
+
+
+def test_missing_and_nan_quotes_never_win():
+    quotes = {"a": {"X": {"price": NAN, "bid": NAN, "ask": NAN}}, "b": {"X": {"price": 10.0, "bid": 9.0, "ask": 11.0}}, "c": {}}
+    best = best_quotes(["X", "Y"], ["a", "b", "c"], quotes)
+    assert {k: v for k, v in best["X"].items() if k != "live_prices"} == {
+        "best_price": 10.0, "best_price_exchange": "b", "best_bid": 9.0, "best_bid_exchange": "b",
+        "best_ask": 11.0, "best_ask_exchange": "b"}
+    assert best["Y"]["best_price"] is None and best["Y"]["best_price_exchange"] is None and best["Y"]["live_prices"] == []
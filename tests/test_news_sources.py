@@ -0,0 +1,103 @@
+# File: test_news_sources.py
+# Incremental news fetching (common/s_news_sources.py) against a stub NewsAPI and stub RSS feeds.
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Any, Dict
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from cryptex_project.cryptex_project.scripts.common import s_asset_tagger, s_news_sources
+from cryptex_project.cryptex_project.scripts.common.s_asset_tagger import AssetTagger, build_dictionary
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+from cryptex_project.cryptex_project.scripts.common.s_news_sources import ingest_new_articles, load_cursors, parse_feed, parse_time
+
+BASE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def published(i: int) -> datetime:
+    return BASE + timedelta(minutes=i)
+
+
+def article(i: int) -> Dict[str, Any]:
+    return {"title": f"Headline {i} about BTC", "description": "ETH and SOL move", "url": f"https://example.invalid/a/{i}",
+            "publishedAt": published(i).isoformat().replace("+00:00", "Z"), "source": {"name": "Test Wire"}}
+
+
+def stub_news(state, feed_size: int = 50):
+    """NewsAPI /v2/everything (newest first, honouring from/to/page) and RSS feeds at /feeds/<n>."""
+    def handler(method, path, body):
+        parsed = urlparse(path)
+        if parsed.path == "/v2/everything":
+            query = parse_qs(parsed.query)
+            since = parse_time(query["from"][0] + "Z") if "from" in query else None
+            until = parse_time(query["to"][0] + "Z") if "to" in query else None
+            page, size = int(query["page"][0]), int(query["pageSize"][0])
+            matching = [article(i) for i in range(state["total"] - 1, -1, -1)
+                        if (not since or published(i) >= since) and (not until or published(i) <= until)]
+            return 200, {"status": "ok", "totalResults": len(matching), "articles": matching[(page - 1) * size:page * size]}
+        feed = int(parsed.path.rsplit("/", 1)[-1])
+        items = "".join(f"<item><title>Feed {feed} item {i}</title><link>https://example.invalid/f{feed}/{i}</link>"
+                        f"<pubDate>{format_datetime(published(i))}</pubDate></item>"
+                        for i in range(state["total"] - feed_size, state["total"]))
+        return 200, f"<rss><channel><title>Test Feed {feed}</title>{items}</channel></rss>"
+    return handler
+
+
+@pytest.fixture
+def offline_tagger(monkeypatch):
+    monkeypatch.setattr(s_asset_tagger, "_tagger", AssetTagger.from_dictionary(build_dictionary(include_exchanges=False)))
+
+
+def test_parse_rss_and_atom():
+    rss = ("<rss><channel><title>Wire</title><item><title>BTC up</title><link> https://x.invalid/1 </link>"
+           "<pubDate>Thu, 01 Jan 2026 10:00:00 +0200</pubDate></item><item><title>No link</title></item></channel></rss>")
+    atom = ('<feed xmlns="http://www.w3.org/2005/Atom"><title>Atom Wire</title><entry><title>ETH down</title>'
+            '<link rel="self" href="https://x.invalid/self"/><link rel="alternate" href="https://x.invalid/2"/>'
+            '<updated>2026-01-01T08:00:00Z</updated></entry></feed>')
+    assert [(a["title"], a["url"], a["publishedAt"], a["source"]["name"]) for a in parse_feed(rss, "u") + parse_feed(atom, "u")] == [
+        ("BTC up", "https://x.invalid/1", "2026-01-01T08:00:00+00:00", "Wire"),
+        ("ETH down", "https://x.invalid/2", "2026-01-01T08:00:00+00:00", "Atom Wire")]
+
+
+def test_capped_burst_is_backfilled_on_later_runs(db, stub_server, offline_tagger, monkeypatch):
+    monkeypatch.setattr(s_news_sources, "NEWSAPI_PAGE_SIZE", 10)  # NEWSAPI_MAX_PAGES = 5: 50 articles per paging run
+    state = {"total": 30}
+    url = stub_server(stub_news(state)) + "/v2/everything"
+    source = f"newsapi:{url}"
+
+    assert ingest_new_articles("key", [], url)["unseen"] == 30
+    state["total"] = 130  # A burst of 100 while the monitor was away
+    runs = [ingest_new_articles("key", [], url) for _ in range(3)]
+
+    assert [r["unseen"] for r in runs] == [50, 49, 1]
+    with cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM public.recent_catalysts")
+        assert cur.fetchone()[0] == 130
+    assert load_cursors([source])[source] == (published(129), None, None)
+
+
+def test_incremental_runs_fetch_only_new_articles(db, stub_server, offline_tagger, n_articles=500, per_run_new=20, n_feeds=3,
+                                                  feed_size=50):
+    state = {"total": n_articles}
+    root = stub_server(stub_news(state, feed_size))
+    feeds = [f"{root}/feeds/{i}" for i in range(n_feeds)]
+    before = s_news_sources.news_stats()
+    runs = []
+    for run in range(3):
+        if run:
+            state["total"] += per_run_new
+        runs.append(ingest_new_articles("key", feeds, f"{root}/v2/everything"))
+    stats = {k: v - before[k] for k, v in s_news_sources.news_stats().items()}
+    print({"runs": [{k: r[k] for k in ("fetched", "unseen")} for r in runs], **stats})
+
+    assert runs[0]["unseen"] == n_articles + n_feeds * feed_size
+    # The cursor is inclusive: each later run re-reads the newest article of every source, and the filter drops it.
+    for run in runs[1:]:
+        assert run["unseen"] == per_run_new * (1 + n_feeds)
+        assert run["fetched"] == (per_run_new + 1) * (1 + n_feeds)
+    assert "BTC" in runs[0]["assets"]
+    with cursor() as cur:
+        cur.execute("SELECT COUNT(*), COUNT(DISTINCT content_hash) FROM public.recent_catalysts")
+        assert cur.fetchone() == (sum(r["unseen"] for r in runs),) * 2
@@ -0,0 +1,84 @@
+# File: test_outcomes.py
+# Outcome recording (cryptex_record_outcome trigger, common/s_outcomes.py) on a throwaway database,
+# across re-runs of s_db_init.sql, which re-creates trading_signals and restarts its SERIAL ids.
+
+from pathlib import Path
+
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+from cryptex_project.cryptex_project.scripts.common.s_outcomes import rebuild_outcomes
+
+SCHEMA_SQL = Path(__file__).resolve().parent.parent / "cryptex_project" / "cryptex_project" / "scripts" / "s_db_init.sql"
+
+
+def apply_schema() -> None:
+    with cursor() as cur:
+        cur.execute(SCHEMA_SQL.read_text())
+
+
+def insert_signal(signal_id: str, entry_price: float, created_ago: str = "0 seconds") -> int:
+    with cursor() as cur:
+        cur.execute("INSERT INTO public.trading_signals (signal_id, created_at, trader_id, asset, direction, entry_price, catalyst_type) "
+                    "VALUES (%s, NOW() - %s::interval, 'whale', 'BTC', 'LONG', %s, 'listing') RETURNING id",
+                    (signal_id, created_ago, entry_price))
+        return cur.fetchone()[0]
+
+
+def close_signal(signal_id: str, exit_price=None) -> None:
+    with cursor() as cur:
+        cur.execute("UPDATE public.trading_signals SET trade_status = 'CLOSED', exit_price = %s WHERE signal_id = %s",
+                    (exit_price, signal_id))
+
+
+def add_mark(signal_pk: int, mark_price: float, taken_ago: str) -> None:
+    with cursor() as cur:
+        cur.execute("INSERT INTO public.portfolio_snapshots (taken_at, open_positions, priced_positions) "
+                    "VALUES (NOW() - %s::interval, 1, 1) RETURNING id, taken_at", (taken_ago,))
+        snapshot_id, taken_at = cur.fetchone()
+        cur.execute("INSERT INTO public.portfolio_position_pnl (snapshot_id, taken_at, signal_id, asset, mark_price) "
+                    "VALUES (%s, %s, %s, 'BTC', %s)", (snapshot_id, taken_at, signal_pk, mark_price))
+
+
+def outcomes():
+    with cursor() as cur:
+        cur.execute("SELECT signal_id, exit_price FROM public.signal_outcomes ORDER BY signal_id")
+        return cur.fetchall()
+
+
+def trades(asset: str = "*") -> int:
+    with cursor() as cur:
+        cur.execute("SELECT trades FROM public.trader_outcome_stats WHERE trader_id = 'whale' AND asset = %s", (asset,))
+        return cur.fetchone()[0]
+
+
+def test_outcomes_survive_re_creating_trading_signals(db):
+    first = insert_signal("whale-BTC-1", 100, created_ago="2 days")
+    add_mark(first, 90, taken_ago="1 day")
+    close_signal("whale-BTC-1", 110)
+    apply_schema()
+
+    second = insert_signal("whale-BTC-2", 100)
+    assert second == first  # The SERIAL id is reused
+    close_signal("whale-BTC-2")  # The only mark for this id belongs to the first signal
+    assert outcomes() == [("whale-BTC-1", 110)]
+
+    add_mark(second, 120, taken_ago="0 seconds")
+    with cursor() as cur:
+        cur.execute("UPDATE public.trading_signals SET trade_status = 'OPEN'")
+    close_signal("whale-BTC-2")
+    assert outcomes() == [("whale-BTC-1", 110), ("whale-BTC-2", 120)]
+    assert trades() == trades("BTC") == 2
+
+    assert rebuild_outcomes()["outcomes_added"] == 0
+    assert trades() == 2
+
+
+def test_integer_keyed_outcomes_are_migrated(db):
+    with cursor() as cur:
+        cur.execute("ALTER TABLE public.signal_outcomes ALTER COLUMN signal_id TYPE INT USING signal_id::int")
+        cur.execute("INSERT INTO public.signal_outcomes (signal_id, catalyst_type, entry_price, exit_price, return_pct) "
+                    "VALUES (1, 'listing', 1, 2, 100)")
+    apply_schema()
+    apply_schema()  # Re-running leaves migrated keys alone
+    insert_signal("whale-BTC-1", 100)
+    close_signal("whale-BTC-1", 105)
+    assert outcomes() == [("legacy-id:1", 2), ("whale-BTC-1", 105)]
@@ -0,0 +1,94 @@
+# File: test_partitions.py
+# Daily partitions of recent_trades / recent_catalysts: migrating a database built from the original,
+# unpartitioned schema (s_db_migrate_001_partitions.sql) and the daily maintenance job
+# (s_partition_maintenance.py), on throwaway databases.
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import psycopg2
+import pytest
+
+from cryptex_project.cryptex_project.scripts import s_partition_maintenance
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+
+SCRIPTS = Path(__file__).resolve().parent.parent / "cryptex_project" / "cryptex_project" / "scripts"
+
+# The tables as the first s_db_init.sql created them: no partitions, content hashes or ingest xids.
+BASELINE_SCHEMA = """
+CREATE TABLE public.monitored_traders (id SERIAL PRIMARY KEY, identifier VARCHAR(255) NOT NULL UNIQUE, exchange VARCHAR(100) NOT NULL, description TEXT, is_active BOOLEAN DEFAULT TRUE);
+CREATE TABLE public.recent_trades (id SERIAL PRIMARY KEY, ingested_at TIMESTAMPTZ DEFAULT NOW(), trader_id VARCHAR(255), asset VARCHAR(50), raw_data JSONB);
+CREATE TABLE public.recent_catalysts (id SERIAL PRIMARY KEY, ingested_at TIMESTAMPTZ DEFAULT NOW(), headline TEXT, source VARCHAR(100), asset_tags TEXT[], raw_data JSONB);
+CREATE TABLE public.trading_signals (id SERIAL PRIMARY KEY, signal_id VARCHAR(255) NOT NULL UNIQUE, created_at TIMESTAMPTZ DEFAULT NOW(), trader_id VARCHAR(255), exchange VARCHAR(100), asset VARCHAR(50), direction VARCHAR(10), entry_price NUMERIC, trade_size_usd NUMERIC, catalyst_headline TEXT, safety_rating VARCHAR(50), ai_confidence_score INT, ai_summary TEXT, trade_status VARCHAR(50) DEFAULT 'SIGNAL');
+"""
+
+
+def run_script(sql: str) -> None:
+    with cursor() as cur:
+        cur.execute(sql)
+
+
+def utc_day(offset_days: int) -> datetime:
+    today = datetime.now(timezone.utc).replace(hour=12, minute=0, second=0, microsecond=0)
+    return today + timedelta(days=offset_days)
+
+
+def rows_by_partition(table: str):
+    with cursor() as cur:
+        cur.execute(f"SELECT tableoid::regclass::text, COUNT(*) FROM public.{table} GROUP BY 1")
+        return dict(cur.fetchall())
+
+
+def test_baseline_database_upgrades_through_the_migration(empty_db):
+    run_script(BASELINE_SCHEMA)
+    with cursor() as cur:
+        cur.execute("INSERT INTO public.recent_trades (trader_id, asset, raw_data) VALUES ('whale', 'BTC', '{}'), ('whale', 'ETH', '{}')")
+        cur.execute("INSERT INTO public.recent_catalysts (headline, asset_tags, raw_data) VALUES ('BTC breaks out', '{BTC}', '{}')")
+    init_sql = (SCRIPTS / "s_db_init.sql").read_text()
+    with pytest.raises(psycopg2.errors.RaiseException, match="s_db_migrate_001_partitions.sql"):
+        run_script(init_sql)
+
+    migration = (SCRIPTS / "s_db_migrate_001_partitions.sql").read_text()
+    run_script(migration)
+    run_script(migration)  # Already partitioned: left alone
+    run_script(init_sql)
+
+    with cursor() as cur:
+        cur.execute("SELECT id, asset FROM public.recent_trades ORDER BY id")
+        assert cur.fetchall() == [(1, "BTC"), (2, "ETH")]
+        cur.execute("SELECT COUNT(*) FROM pg_partitioned_table WHERE partrelid IN "
+                    "('public.recent_trades'::regclass, 'public.recent_catalysts'::regclass)")
+        assert cur.fetchone()[0] == 2
+        cur.execute("INSERT INTO public.recent_trades (trader_id, asset, raw_data, content_hash) "
+                    "VALUES ('whale', 'SOL', '{}', repeat('a', 64)) RETURNING id")
+        assert cur.fetchone()[0] == 3  # The id sequence carries on
+    assert rows_by_partition("recent_catalysts") == {"recent_catalysts_default": 1}
+
+
+def test_maintenance_moves_default_rows_and_drops_expired_partitions(db):
+    retention = s_partition_maintenance.RETENTION_DAYS
+    with cursor() as cur:
+        # An expired daily partition left from earlier runs, and rows the DEFAULT partition caught.
+        s_partition_maintenance.create_daily_partition(cur, "recent_trades", utc_day(-retention - 2).date())
+        for offset in (-retention - 2, -retention - 1, -1, 0, 0, 2):
+            cur.execute("INSERT INTO public.recent_trades (ingested_at, asset, raw_data) VALUES (%s, 'BTC', '{}')", (utc_day(offset),))
+        cur.execute("INSERT INTO public.recent_catalysts (ingested_at, headline, raw_data) VALUES (%s, 'old', '{}'), (%s, 'new', '{}')",
+                    (utc_day(-retention - 1), utc_day(0)))
+        cur.execute("INSERT INTO public.recent_ingest_hashes (content_hash, first_seen) VALUES (repeat('a', 64), %s), (repeat('b', 64), NOW())",
+                    (utc_day(-retention - 1),))
+    assert rows_by_partition("recent_trades") == {f"recent_trades_p{utc_day(-retention - 2):%Y%m%d}": 1, "recent_trades_default": 5}
+
+    result = s_partition_maintenance.main()
+
+    day = lambda offset: f"{utc_day(offset):%Y%m%d}"
+    ahead = range(-1, s_partition_maintenance.DAYS_AHEAD + 1)
+    assert result["dropped"] == [f"recent_trades_p{day(-retention - 2)}"]
+    assert sorted(result["created"]) == sorted(f"{t}_p{day(o)}" for t in ("recent_trades", "recent_catalysts") for o in ahead)
+    assert rows_by_partition("recent_trades") == {f"recent_trades_p{day(-1)}": 1, f"recent_trades_p{day(0)}": 2,
+                                                  f"recent_trades_p{day(2)}": 1}
+    assert rows_by_partition("recent_catalysts") == {f"recent_catalysts_p{day(0)}": 1}
+    with cursor() as cur:
+        cur.execute("SELECT content_hash FROM public.recent_ingest_hashes")
+        assert cur.fetchall() == [("b" * 64,)]
+
+    assert s_partition_maintenance.main() == {"created": [], "dropped": [], "retention_days": retention}
@@ -0,0 +1,65 @@
+# File: test_portfolio.py
+# Vectorized mark-to-market of open signals (common/s_portfolio.py) with a stub quote source,
+# on a throwaway database.
+
+import pytest
+
+from cryptex_project.cryptex_project.scripts.common import s_portfolio
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+from cryptex_project.cryptex_project.scripts.common.s_portfolio import run_portfolio_snapshot
+
+MARKS = {"BTC": 110.0, "ETH": 40.0}  # DOGE has no quote
+
+
+@pytest.fixture
+def quote_calls(monkeypatch):
+    calls = []
+
+    def quote_assets(exchange, assets):
+        calls.append((exchange, list(assets)))
+        return {a: {"price": MARKS[a], "source": "stub"} for a in assets if a in MARKS}
+    monkeypatch.setattr(s_portfolio, "quote_assets", quote_assets)
+    return calls
+
+
+def open_signal(signal_id: str, asset: str, direction: str, entry_price: float, size_usd: float, status: str = "OPEN") -> int:
+    with cursor() as cur:
+        cur.execute("INSERT INTO public.trading_signals (signal_id, asset, direction, entry_price, trade_size_usd, trade_status) "
+                    "VALUES (%s, %s, %s, %s, %s, %s) RETURNING id", (signal_id, asset, direction, entry_price, size_usd, status))
+        return cur.fetchone()[0]
+
+
+def test_open_positions_are_marked_in_one_pass(db, quote_calls):
+    ids = {
+        "btc-long": open_signal("btc-long", "BTC", "LONG", 100, 1000),      # 10 units, +10 each
+        "btc-short": open_signal("btc-short", "BTC", "short", 100, 500),    # 5 units, -10 each
+        "eth-short": open_signal("eth-short", "ETH", "SHORT", 50, 100),     # 2 units, +10 each
+        "doge-long": open_signal("doge-long", "DOGE", "LONG", 0.1, 300),    # Unpriced
+    }
+    open_signal("closed", "BTC", "LONG", 1, 1, status="CLOSED")
+
+    result = run_portfolio_snapshot("stubex")
+
+    assert quote_calls == [("stubex", ["BTC", "DOGE", "ETH"])]  # Each asset priced once
+    assert result["total_pnl"] == pytest.approx(70.0)
+    assert (result["tracked_positions"], result["priced_positions"]) == (4, 3)
+    with cursor() as cur:
+        cur.execute("SELECT id, exchange, open_positions, priced_positions, total_pnl_usd, total_size_usd FROM public.portfolio_snapshots")
+        assert cur.fetchall() == [(result["snapshot_id"], "stubex", 4, 3, pytest.approx(70.0), pytest.approx(1600.0))]  # DOGE left out
+        cur.execute("SELECT signal_id, asset, mark_price, pnl_usd FROM public.portfolio_position_pnl WHERE snapshot_id = %s",
+                    (result["snapshot_id"],))
+        rows = {signal_id: row for signal_id, *row in cur.fetchall()}
+    assert rows == {
+        ids["btc-long"]: ["BTC", 110.0, pytest.approx(100.0)],
+        ids["btc-short"]: ["BTC", 110.0, pytest.approx(-50.0)],
+        ids["eth-short"]: ["ETH", 40.0, pytest.approx(20.0)],
+        ids["doge-long"]: ["DOGE", None, None],
+    }
+
+
+def test_no_open_positions_writes_nothing(db, quote_calls):
+    assert run_portfolio_snapshot("stubex") == {"status": "no_open_positions"}
+    assert quote_calls == []
+    with cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM public.portfolio_snapshots")
+        assert cur.fetchone()[0] == 0
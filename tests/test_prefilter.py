@@ -0,0 +1,69 @@
+# File: test_prefilter.py
+# Local event scoring ahead of the LLM (common/s_prefilter.py), on synthetic events; no DB or model needed.
+
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from cryptex_project.cryptex_project.scripts.common.s_prefilter import (
+    PREFILTER_THRESHOLD, SOURCE_REPUTATION, EventContext, evaluate, features, prefilter, score_event)
+
+EMPTY = EventContext({}, {})
+
+
+def synthetic_events(n_events: int, seed: int = 25) -> Tuple[List[Dict[str, Any]], List[str], EventContext]:
+    """Labels come from the same five features under different weights plus noise the prefilter
+    cannot see, so the curve shows how much recall a threshold costs when the score is only a proxy."""
+    rng = random.Random(seed)
+    outlets = list(SOURCE_REPUTATION) + ["crypto blog", "unknown wire"]
+    traders = [f"TEST-{i}" for i in range(200)]
+    context = EventContext({f"TOK{i}": 10 ** rng.uniform(3.5, 8.5) for i in range(100)},
+                           {t: rng.uniform(0.2, 0.8) for t in traders[:120]})
+    true_weights = {"source": 10, "sentiment": 35, "size": 25, "liquidity": 10, "history": 20}
+    events, sentiments = [], []
+    for _ in range(n_events):
+        trade = {"trader_id": rng.choice(traders), "asset": f"TOK{rng.randrange(130)}",
+                 "amount": rng.choice((1, -1)) * 10 ** rng.uniform(0, 4), "entryPrice": 10 ** rng.uniform(-1, 3)}
+        catalyst = {"title": "headline", "source": {"name": rng.choice(outlets)}}
+        sentiment = rng.choice(("positive", "negative", "neutral"))
+        quality = sum(true_weights[k] * v for k, v in features(trade, catalyst, sentiment, context).items()) + rng.gauss(0, 12)
+        events.append({"trade": trade, "catalyst": catalyst, "signal": quality > 65, "won": quality > 70 and rng.random() < 0.6})
+        sentiments.append(sentiment)
+    return events, sentiments, context
+
+
+def test_sentiment_agreeing_with_the_trade_scores_higher():
+    long_trade = {"trader_id": "T", "asset": "BTC", "amount": 2, "entryPrice": 50000}
+    catalyst = {"title": "BTC up", "source": {"name": "Reuters"}}
+    agreeing = features(long_trade, catalyst, "positive", EMPTY)
+    assert agreeing["source"] == 1.0 and agreeing["sentiment"] == 1.0
+    assert features(long_trade, catalyst, "negative", EMPTY)["sentiment"] < agreeing["sentiment"]
+    assert features(long_trade, catalyst, "neutral", EMPTY)["sentiment"] < features(long_trade, catalyst, "negative", EMPTY)["sentiment"]
+    assert score_event(long_trade, catalyst, "positive", EMPTY) > score_event(long_trade, catalyst, "negative", EMPTY)
+
+
+def test_unknown_features_fall_back_to_defaults():
+    values = features({"asset": "NEW"}, {"source": "some blog"}, "positive", EMPTY)
+    assert 0 <= score_event({"asset": "NEW"}, {}, "positive", EMPTY) <= 100
+    assert values["sentiment"] == 0.5  # No side to agree with
+    assert {k: values[k] for k in ("size", "liquidity", "history")} == {"size": 0.4, "liquidity": 0.33, "history": 0.5}
+
+
+def test_threshold_sweep_trades_recall_for_llm_calls(n_events=20000):
+    events, sentiments, context = synthetic_events(n_events)
+    pairs = [(e["trade"], e["catalyst"]) for e in events]
+
+    started = time.perf_counter()
+    passed = prefilter(pairs, sentiments, context=context)
+    elapsed = time.perf_counter() - started
+    result = evaluate(events, context=context, sentiments=sentiments)
+    print({"events": n_events, "prefilter_us_per_event": round(elapsed / n_events * 1e6, 2),
+           "passed_at_default_threshold": len(passed), **result})
+
+    curve = result["curve"]
+    assert curve[0]["llm_calls"] == n_events and curve[0]["signal_recall"] == 1.0
+    assert all(a["llm_calls"] >= b["llm_calls"] and a["signal_recall"] >= b["signal_recall"] for a, b in zip(curve, curve[1:]))
+    assert passed == [i for i, (t, c) in enumerate(pairs) if score_event(t, c, sentiments[i], context) >= PREFILTER_THRESHOLD]
+    at_default = next(point for point in curve if point["threshold"] == 40)
+    # The default threshold keeps most signals for a fraction of the calls.
+    assert at_default["signal_recall"] > 0.9 and at_default["cost_fraction"] < 0.8
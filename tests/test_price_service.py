@@ -0,0 +1,111 @@
+# File: test_price_service.py
+# Price service (s_price_service.py) streaming a fake feed into the ticker snapshot (common/s_price_cache.py).
+
+import asyncio
+import random
+import time
+from typing import Any, Dict
+
+import pytest
+
+from cryptex_project.cryptex_project.scripts.common import s_price_cache
+from cryptex_project.cryptex_project.scripts.common.s_price_cache import DictSnapshot, price_cache_stats, read_prices, set_store
+from cryptex_project.cryptex_project.scripts.s_price_service import DEFAULT_EXCHANGES, DEFAULT_SYMBOLS, run_service
+
+
+class FakeExchange:
+    """Stand-in for a ccxt.pro client: emits a random walk every `interval_s`."""
+
+    def __init__(self, name: str, interval_s: float = 0.01, start_price: float = 100.0, fail_every: int = 0):
+        self.id = name
+        self.has = {"watchTicker": True}
+        self.interval_s = interval_s
+        self.fail_every = fail_every
+        self.prices: Dict[str, float] = {}
+        self.start_price = start_price
+        self.calls = 0
+
+    async def load_markets(self) -> Dict[str, Any]:
+        return {}
+
+    async def watch_ticker(self, symbol: str) -> Dict[str, Any]:
+        await asyncio.sleep(self.interval_s)
+        self.calls += 1
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise ConnectionError(f"{self.id} feed dropped")
+        price = self.prices.get(symbol, self.start_price) * (1 + random.uniform(-0.001, 0.001))
+        self.prices[symbol] = price
+        return {"symbol": symbol, "last": price, "bid": price * 0.9999, "ask": price * 1.0001, "timestamp": int(time.time() * 1000)}
+
+    fetch_ticker = watch_ticker
+
+    async def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def no_store(monkeypatch):
+    """No snapshot installed, and Redis pointed at a closed port."""
+    monkeypatch.setattr(s_price_cache, "REDIS_URL", "redis://127.0.0.1:1/0")
+    monkeypatch.setattr(s_price_cache, "_store_failed_at", None)
+    set_store(None)
+    yield
+    set_store(None)
+
+
+@pytest.fixture
+def snapshot():
+    store = DictSnapshot()
+    set_store(store)
+    yield store
+    set_store(None)
+
+
+class BrokenSnapshot(DictSnapshot):
+    def write(self, symbol, exchange, entry):
+        raise ConnectionError("Redis went away")
+
+
+def fake_feed(name):
+    return FakeExchange(name, fail_every=50)
+
+
+def test_service_refuses_to_start_without_redis(no_store):
+    redis = pytest.importorskip("redis")
+    with pytest.raises(redis.exceptions.ConnectionError):
+        asyncio.run(run_service(DEFAULT_SYMBOLS, DEFAULT_EXCHANGES, 1, exchange_factory=fake_feed))
+    # Readers go straight to REST, without another connect attempt
+    assert read_prices("ETH/USDT", ["kraken"]) == ([], ["kraken"])
+    assert s_price_cache._store is None
+
+
+def test_service_stops_when_the_snapshot_write_fails():
+    set_store(BrokenSnapshot())
+    try:
+        with pytest.raises(ConnectionError):
+            asyncio.run(run_service(DEFAULT_SYMBOLS, DEFAULT_EXCHANGES, 30, exchange_factory=fake_feed))
+    finally:
+        set_store(None)
+
+
+def test_feed_errors_are_retried(snapshot, monkeypatch):
+    monkeypatch.setattr("cryptex_project.cryptex_project.scripts.s_price_service.RECONNECT_BACKOFF_S", 0.01)
+    service = asyncio.run(run_service(DEFAULT_SYMBOLS, ["kraken"], 1.5, exchange_factory=lambda name: FakeExchange(name, fail_every=5)))
+    assert service["errors"] > 0 and service["updates"] > service["errors"]
+    fresh, stale = read_prices("ETH/USDT", ["kraken", "binance"], max_age_s=60)
+    assert [row["exchange"] for row in fresh] == ["kraken"] and stale == ["binance"]
+
+
+def test_streamed_snapshot_serves_reads(snapshot, reads=20000):
+    service = asyncio.run(run_service(DEFAULT_SYMBOLS, DEFAULT_EXCHANGES, 2.0, exchange_factory=fake_feed))
+    before = price_cache_stats()
+    started = time.perf_counter()
+    for _ in range(reads):
+        fresh, stale = read_prices("ETH/USDT", DEFAULT_EXCHANGES, max_age_s=60)
+    read_us = (time.perf_counter() - started) / reads * 1e6
+    print({"service": service, "fresh_exchanges": len(fresh), "stale_exchanges": len(stale), "snapshot_read_us": round(read_us, 2)})
+
+    assert service["streams"] == len(DEFAULT_SYMBOLS) * len(DEFAULT_EXCHANGES)
+    assert service["updates"] > 0 and service["errors"] > 0  # fail_every=50 drops feeds; they reconnect
+    assert len(fresh) == len(DEFAULT_EXCHANGES) and not stale
+    assert price_cache_stats()["snapshot_hits"] - before["snapshot_hits"] == reads * len(DEFAULT_EXCHANGES)
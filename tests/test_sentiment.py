@@ -0,0 +1,115 @@
+# File: test_sentiment.py
+# Batched headline sentiment (common/s_sentiment.py), with a stub pipeline and a tiny randomly
+# initialised model built on the fly, so no model download is needed.
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from cryptex_project.cryptex_project.scripts.common import s_sentiment
+from cryptex_project.cryptex_project.scripts.common.s_sentiment import load_model, score_headlines, sentiment_stats
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+WORDS = ["exchange", "lists", "token", "analysts", "see", "surge", "crash", "ahead", "bitcoin", "ether"]
+
+
+class StubTokenizer:
+    """Records each batch; token ids are the headline lengths."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts, **kwargs):
+        self.batches.append(list(texts))
+        return {"input_ids": torch.tensor([[len(t)] for t in texts])}
+
+
+class StubModel:
+    """Class = headline length modulo the number of labels."""
+
+    def __init__(self, n_labels: int):
+        self.n_labels = n_labels
+
+    def __call__(self, input_ids):
+        return SimpleNamespace(logits=torch.nn.functional.one_hot(input_ids[:, 0] % self.n_labels, self.n_labels).float())
+
+
+@pytest.fixture
+def stub_pipeline(monkeypatch):
+    tokenizer = StubTokenizer()
+    monkeypatch.setattr(s_sentiment, "BATCH_SIZE", 4)
+    monkeypatch.setitem(s_sentiment._models, "stub", (tokenizer, StubModel(3), ["negative", "neutral", "positive"]))
+    yield tokenizer
+    for key in [k for k in s_sentiment._memo if k[0] == "stub"]:
+        del s_sentiment._memo[key]
+
+
+def test_unique_headlines_are_scored_in_batches_and_memoized(stub_pipeline):
+    headlines = ["a", "bb", "ccc", "a", None, "  ", "dddd", "eeeee", "ffffff"]
+    before = sentiment_stats()
+
+    labels = score_headlines(headlines, "stub")
+    again = score_headlines(["bb", "ccc"], "stub")
+
+    assert labels == ["neutral", "positive", "negative", "neutral", "neutral", "neutral", "neutral", "positive", "negative"]
+    assert again == ["positive", "negative"]
+    assert stub_pipeline.batches == [["a", "bb", "ccc", "dddd"], ["eeeee", "ffffff"]]  # Blank and repeated headlines skipped
+    stats = {k: v - before[k] for k, v in sentiment_stats().items() if k != "model_load_s"}
+    assert stats == {"scored": 6, "memo_hits": 2, "forward_passes": 2}
+
+
+def test_run_larger_than_the_memo_keeps_every_label(stub_pipeline, monkeypatch):
+    monkeypatch.setattr(s_sentiment, "MEMO_MAX_ENTRIES", 3)
+    headlines = ["a" * n for n in range(1, 10)]
+    assert score_headlines(headlines, "stub") == ["neutral", "positive", "negative"] * 3
+    assert len(s_sentiment._memo) == 3
+
+
+def test_failing_model_falls_back_to_neutral(monkeypatch):
+    def broken(texts, **kwargs):
+        raise RuntimeError("out of memory")
+    monkeypatch.setitem(s_sentiment._models, "broken", (broken, StubModel(3), ["negative", "neutral", "positive"]))
+    assert score_headlines(["BTC crashes", None], "broken") == ["neutral", "neutral"]
+
+
+def test_generic_labels_are_mapped_by_class_count():
+    def model(id2label):
+        return SimpleNamespace(config=SimpleNamespace(id2label=id2label))
+    assert s_sentiment._label_names(model({0: "LABEL_0", 1: "LABEL_1"})) == ["negative", "positive"]
+    assert s_sentiment._label_names(model({0: "LABEL_0", 1: "LABEL_1", 2: "LABEL_2"})) == ["negative", "neutral", "positive"]
+    assert s_sentiment._label_names(model({0: "Negative", 1: "Neutral", 2: "Positive"})) == ["negative", "neutral", "positive"]
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    path = tmp_path_factory.mktemp("tiny-sentiment")
+    vocab = path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "#", ":", *WORDS, *map(str, range(10))]))
+    transformers.BertTokenizerFast(vocab_file=str(vocab)).save_pretrained(path)
+    config = transformers.BertConfig(vocab_size=32, hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+                                     intermediate_size=32, num_labels=3)
+    transformers.BertForSequenceClassification(config).save_pretrained(path)
+    return str(path)
+
+
+def test_tiny_model_throughput(tiny_model, n_headlines=2000):
+    headlines = [f"Exchange {i % 97} lists token #{i}: analysts see {'surge' if i % 3 else 'crash'} ahead" for i in range(n_headlines)]
+    before = sentiment_stats()
+    load_started = time.perf_counter()
+    load_model(tiny_model)
+    load_s = time.perf_counter() - load_started
+    started = time.perf_counter()
+    cold = score_headlines(headlines, tiny_model)
+    cold_s = time.perf_counter() - started
+    started = time.perf_counter()
+    warm = score_headlines(headlines, tiny_model)
+    warm_s = time.perf_counter() - started
+    print({"model_load_s": round(load_s, 3), "headlines": n_headlines, "headlines_per_s": round(n_headlines / cold_s, 1),
+           "memoized_headlines_per_s": round(n_headlines / max(warm_s, 1e-9), 1)})
+
+    assert cold == warm and set(cold) <= {"negative", "neutral", "positive"}
+    assert sentiment_stats()["forward_passes"] - before["forward_passes"] == -(-n_headlines // s_sentiment.BATCH_SIZE)
+    assert warm_s < cold_s
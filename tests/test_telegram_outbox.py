@@ -0,0 +1,73 @@
+# File: test_telegram_outbox.py
+# Durable Telegram outbox (common/s_telegram_outbox.py) drained through a fake Bot API.
+
+import asyncio
+import json
+import threading
+import time
+from typing import Dict, List
+
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+from cryptex_project.cryptex_project.scripts.common.s_telegram_outbox import TelegramSender, drain, enqueue
+
+
+def fake_bot_api(chat_min_interval_s: float = 0.0, reject: str = "\x00"):
+    """Answers 429 with retry_after when a chat is written to more often than chat_min_interval_s,
+    and 400 for any message containing `reject`. Returns (handler, received messages)."""
+    last_sent: Dict[str, float] = {}
+    received: List[dict] = []
+    lock = threading.Lock()
+
+    def handler(method, path, body):
+        payload = json.loads(body)
+        chat_id = str(payload["chat_id"])
+        with lock:
+            now = time.monotonic()
+            wait = last_sent.get(chat_id, 0) + chat_min_interval_s - now
+            if reject in payload["text"]:
+                return 400, {"ok": False, "error_code": 400, "description": "Bad Request: can't parse entities"}
+            if wait > 0:
+                return 429, {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                             "parameters": {"retry_after": max(1, round(wait))}}
+            last_sent[chat_id] = now
+            received.append(payload)
+            return 200, {"ok": True, "result": {"message_id": len(received)}}
+    return handler, received
+
+
+def statuses(chat_id: str) -> Dict[str, str]:
+    with cursor() as cur:
+        cur.execute("SELECT dedupe_key, status FROM public.telegram_outbox WHERE chat_id = %s", (chat_id,))
+        return dict(cur.fetchall())
+
+
+def test_rejected_digest_is_resent_one_by_one(db, stub_server):
+    handler, received = fake_bot_api(reject="*unclosed")
+    api_url = stub_server(handler)
+    enqueue("chat", [("Alert 1", "a1"), ("*unclosed bold", "a2"), ("Alert 3", "a3")])
+
+    result = asyncio.run(drain("token", run_for_seconds=30, sender=TelegramSender("token", api_url=api_url, chat_rps=50)))
+
+    assert statuses("chat") == {"a1": "SENT", "a2": "FAILED", "a3": "SENT"}
+    assert [p["text"] for p in received] == ["Alert 1", "Alert 3"]
+    assert result["digests_split"] == 1 and result["sent"] == 2 and result["failed"] == 1 and result["pending"] == 0
+
+
+def test_burst_drains_as_digests_and_waits_out_429s(db, stub_server, n_alerts=60, n_chats=3):
+    handler, received = fake_bot_api(chat_min_interval_s=0.2)
+    api_url = stub_server(handler)
+    chats = [f"chat-{i}" for i in range(n_chats)]
+    for i, chat in enumerate(chats):
+        enqueue(chat, [(f"Alert {n} for {chat}", f"{chat}-{n}") for n in range(i, n_alerts, n_chats)])
+
+    started = time.perf_counter()
+    result = asyncio.run(drain("token", run_for_seconds=60, chat_ids=chats,
+                               sender=TelegramSender("token", api_url=api_url, chat_rps=10)))  # Faster than the fake allows
+    elapsed = time.perf_counter() - started
+    print({"alerts": n_alerts, "chats": n_chats, "messages_sent": len(received), "elapsed_s": round(elapsed, 2), **result})
+
+    assert result["sent"] == n_alerts and result["pending"] == 0 and result["failed"] == 0
+    assert len(received) < n_alerts  # Waiting alerts went out as digests
+    assert result["rate_limited"] > 0
+    for chat in chats:
+        assert set(statuses(chat).values()) == {"SENT"}
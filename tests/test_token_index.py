@@ -0,0 +1,122 @@
+# File: test_token_index.py
+# The symbol / address -> contract index (common/s_token_index.py), its refresh job
+# (s_token_index_refresh.py) and the risk analyzers that read it, against a stub DexScreener
+# on a throwaway database.
+
+import functools
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from cryptex_project.cryptex_project.scripts import s_04_risk_analyzer, s_token_index_refresh
+from cryptex_project.cryptex_project.scripts.common import s_dex_data, s_token_index
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+from cryptex_project.cryptex_project.scripts.common.s_token_index import get_index, normalize_symbol
+from cryptex_project.cryptex_project.scripts.intelligence import s_risk_analyzer
+from cryptex_project.cryptex_project.scripts.s_token_index_refresh import MIN_LIQUIDITY_USD, best_contracts, symbols_to_refresh
+
+
+def pair(symbol: str, address: str, liquidity_usd: float, chain: str = "ethereum"):
+    return {"chainId": chain, "pairAddress": f"pair-{address}", "priceUsd": "1.0", "pairCreatedAt": 1_600_000_000_000,
+            "baseToken": {"symbol": symbol, "address": address, "name": symbol.title()},
+            "quoteToken": {"symbol": "WETH", "address": "0xweth"}, "liquidity": {"usd": liquidity_usd}}
+
+
+@pytest.fixture
+def dexscreener(db, stub_server, monkeypatch):
+    """Stub search and tokens endpoints serving `listings` (symbol -> pairs); records every request."""
+    listings, requests = {}, []
+
+    def handler(method, path, body):
+        parsed = urlparse(path)
+        requests.append(path)
+        if parsed.path == "/search":
+            return 200, {"pairs": listings.get(parse_qs(parsed.query)["q"][0], [])}
+        addresses = {a.lower() for a in parsed.path.rsplit("/", 1)[-1].split(",")}
+        return 200, {"pairs": [p for pairs in listings.values() for p in pairs if p["baseToken"]["address"].lower() in addresses]}
+
+    root = stub_server(handler)
+    client = functools.partial(s_dex_data.DexScreenerClient, base_url=root + "/tokens/", search_url=root + "/search")
+    monkeypatch.setattr(s_dex_data, "DexScreenerClient", client)
+    monkeypatch.setattr(s_token_index_refresh, "DexScreenerClient", client)
+    monkeypatch.setattr(s_token_index, "_index", None)
+    return listings, requests
+
+
+def add_miss(key: str, kind: str = "symbol", checked_ago=None) -> None:
+    with cursor() as cur:
+        cur.execute("INSERT INTO public.token_index_misses (lookup_key, kind, last_checked, attempts) "
+                    "VALUES (%s, %s, NOW() - %s::interval, %s)", (key, kind, checked_ago, int(checked_ago is not None)))
+
+
+def test_quote_suffixes_are_stripped():
+    assert [normalize_symbol(s) for s in ("BTCUSDT", "eth/usdt:USDT", "SOL-PERP", "PEPEUSDC", " arb_usd ", "USDT", "", None)] == [
+        "BTC", "ETH", "SOL", "PEPE", "ARB", "USDT", None, None]
+
+
+def test_best_contract_per_chain_with_the_exact_base_symbol():
+    pairs = [
+        pair("PEPE", "0xsmall", MIN_LIQUIDITY_USD * 5),
+        pair("PEPE", "0xbig", MIN_LIQUIDITY_USD * 20),
+        pair("pepe", "0xbig", MIN_LIQUIDITY_USD * 30),  # Same token, deeper pool; the symbol is matched case-insensitively
+        pair("PEPE2", "0xcopy", MIN_LIQUIDITY_USD * 100),  # Not the same symbol
+        pair("PEPE", "0xdust", MIN_LIQUIDITY_USD / 2, chain="bsc"),  # Too thin
+        pair("PEPE", "Pepe111", MIN_LIQUIDITY_USD * 2, chain="solana"),
+    ]
+    rows = sorted(best_contracts("PEPE", pairs))
+    assert [(r[1], r[2], r[4]) for r in rows] == [("ethereum", "0xbig", MIN_LIQUIDITY_USD * 30),
+                                                  ("solana", "Pepe111", MIN_LIQUIDITY_USD * 2)]
+    assert best_contracts("PEPE", [pair("PEPE", "0xdust", 1)]) == []
+
+
+def test_refresh_picks_up_queued_misses_and_rechecks_them(dexscreener, monkeypatch):
+    listings, requests = dexscreener
+    monkeypatch.setattr(s_token_index_refresh, "BUILTIN_ALIASES", {})  # Only this test's symbols
+    listings["NEWT"] = [pair("NEWT", "0xnewt", MIN_LIQUIDITY_USD * 3)]
+    with cursor() as cur:
+        cur.execute("INSERT INTO public.recent_trades (trader_id, asset, raw_data) VALUES ('whale', 'NEWTUSDT', '{}'), ('whale', 'USDT', '{}')")
+        cur.execute("INSERT INTO public.token_contracts (symbol, chain_id, address) VALUES ('BTC', 'ethereum', '0xwbtc')")
+    add_miss("QUEUED")                          # Queued by an analyzer, never checked
+    add_miss("GONE", checked_ago="30 days")     # Due for a retry
+    add_miss("DEAD", checked_ago="1 hour")      # Known unresolvable
+    add_miss("0xabc", kind="address")
+
+    assert symbols_to_refresh(100) == (["GONE", "NEWT", "QUEUED"], ["0xabc"])
+    result = s_token_index_refresh.main()
+
+    assert result == {"contracts": 1, "missed_symbols": 2, "missed_addresses": 1}
+    assert get_index().resolve_symbol("NEWTUSDT")["address"] == "0xnewt"
+    with cursor() as cur:
+        cur.execute("SELECT lookup_key, attempts FROM public.token_index_misses WHERE last_checked > NOW() - interval '1 minute'")
+        assert sorted(cur.fetchall()) == [("0xabc", 1), ("GONE", 2), ("QUEUED", 1)]
+    # Checked now: nothing is due until the retry interval passes.
+    assert symbols_to_refresh(100) == ([], [])
+    assert s_token_index_refresh.main() == {"status": "up_to_date"}
+    assert len([r for r in requests if r.startswith("/search")]) == 3
+
+
+def test_signal_risk_analyzer_skips_unresolvable_symbols(dexscreener):
+    listings, requests = dexscreener
+    listings["NEWT"] = [pair("NEWT", "0xnewt", 80000)]
+    s_token_index.record_contracts([("NEWT", "ethereum", "0xnewt", "Newt", 80000.0, "test")])
+    add_miss("DEAD", checked_ago="1 hour")
+
+    signals = [{"trade": {"raw_pos": {"symbol": "DEADUSDT"}}}, {"trade": {"raw_pos": {"symbol": "NEWTUSDT"}}},
+               {"trade": {"raw_pos": {"symbol": "FRESHUSDT"}}}]
+    rated = s_risk_analyzer.scan(signals)
+
+    assert [s["risk_analysis"]["safety_rating"] for s in rated] == ["UNKNOWN", "SAFE", "UNKNOWN"]
+    assert rated[0]["risk_analysis"]["details"] == "Token is on the unresolvable list."
+    assert requests == ["/tokens/0xnewt"]  # Only the indexed token goes to DexScreener
+    with cursor() as cur:
+        cur.execute("SELECT lookup_key, last_checked IS NULL FROM public.token_index_misses ORDER BY 1")
+        assert cur.fetchall() == [("DEAD", False), ("FRESH", True)]  # Queued for the next refresh
+
+
+def test_transaction_risk_analyzer_skips_unresolvable_addresses(dexscreener):
+    listings, requests = dexscreener
+    add_miss("0xdead", kind="address", checked_ago="1 hour")
+    tx = {"signatures": ["sig"], "account_keys": [{"account": "0xDEAD", "signer": False, "writable": True}]}
+
+    assert s_04_risk_analyzer.scan([tx])[0]["risk_analysis"] == {"safety_rating": "UNKNOWN", "details": "Token is on the unresolvable list."}
+    assert requests == []
@@ -0,0 +1,54 @@
+# File: test_traders.py
+# The versioned monitored_traders cache (common/s_traders.py) on a throwaway database: readers skip
+# the list query while the version holds, and reload after the wallet bot adds or removes a wallet.
+
+import pytest
+
+from cryptex_project.cryptex_project.scripts.common import s_traders
+from cryptex_project.cryptex_project.scripts.common.s_llm_cache import DictBackend
+from cryptex_project.cryptex_project.scripts.common.s_traders import get_active_traders, set_backend, traders_stats
+from cryptex_project.cryptex_project.scripts.telegram import s_wallet_command_bot
+
+
+@pytest.fixture
+def wallet_bot(monkeypatch):
+    """Runs a Telegram command through the wallet bot; replies are recorded instead of sent."""
+    replies = []
+    monkeypatch.setattr(s_wallet_command_bot.requests, "post", lambda url, json: replies.append(json["text"]))
+
+    def send(text: str) -> str:
+        s_wallet_command_bot.main({"message": {"chat": {"id": 1}, "from": {"username": "tester"}, "text": text}})
+        return replies[-1]
+    return send
+
+
+def stats_since(before):
+    return {key: value - before[key] for key, value in traders_stats().items()}
+
+
+def identifiers():
+    return {t["identifier"] for t in get_active_traders()}
+
+
+def test_readers_reload_only_after_the_list_changes(db, wallet_bot):
+    set_backend(DictBackend())
+    before = traders_stats()
+    seeded = identifiers()
+    assert stats_since(before) == {"hits": 0, "shared_hits": 0, "reloads": 1}
+
+    assert identifiers() == seeded  # Same version: no list query
+    assert stats_since(before) == {"hits": 1, "shared_hits": 0, "reloads": 1}
+
+    assert wallet_bot("/addwallet 0xnew ethereum").startswith("✅")
+    assert identifiers() == seeded | {"0xnew"}
+    assert stats_since(before) == {"hits": 1, "shared_hits": 0, "reloads": 2}
+
+    # Another process starts with nothing in memory and picks the list up from the shared cache.
+    s_traders._local = None
+    assert identifiers() == seeded | {"0xnew"}
+    assert stats_since(before) == {"hits": 1, "shared_hits": 1, "reloads": 2}
+
+    assert wallet_bot("/removewallet 0xnew").startswith("🗑️")
+    assert identifiers() == seeded
+    assert identifiers() == seeded
+    assert stats_since(before) == {"hits": 2, "shared_hits": 1, "reloads": 3}
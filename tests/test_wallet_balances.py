@@ -0,0 +1,65 @@
+# File: test_wallet_balances.py
+# Batched JSON-RPC balance scans diffed against wallet_balances (common/s_wallet_balances.py),
+# against a stub node.
+
+import asyncio
+import json
+import time
+
+from cryptex_project.cryptex_project.scripts.common.s_db import cursor
+from cryptex_project.cryptex_project.scripts.common.s_wallet_balances import (
+    DEFAULT_TRACKED_TOKENS, NATIVE, RPC_BATCH_SIZE, scan_wallets, scanner_stats)
+
+
+def stub_node(state, change_ratio: float, latency_s: float = 0.01):
+    """Balances derived from the address; in round 1, change_ratio of the native balances moved."""
+    def balance(address: str, asset: str) -> str:
+        seed = int(address[-6:], 16) + len(asset)
+        moved = state["round"] and (seed % 1000) < change_ratio * 1000 and asset == NATIVE
+        return hex(seed * 10 ** 12 + (7 if moved else 0))
+
+    def answer(call):
+        if call["method"] == "eth_blockNumber":
+            result = hex(19_000_000 + state["round"])
+        elif call["method"] == "eth_getBalance":
+            result = balance(call["params"][0], NATIVE)
+        else:
+            result = balance("0x" + call["params"][0]["data"][-40:], call["params"][0]["to"].lower())
+        return {"jsonrpc": "2.0", "id": call["id"], "result": result}
+
+    def handler(method, path, body):
+        payload = json.loads(body)
+        time.sleep(latency_s)  # Simulated node latency per HTTP request
+        return 200, [answer(c) for c in payload] if isinstance(payload, list) else answer(payload)
+    return handler
+
+
+def test_rescan_records_only_changes(db, stub_server, n_wallets=1000, change_ratio=0.02):
+    state = {"round": 0}
+    tokens = DEFAULT_TRACKED_TOKENS["ethereum"]
+    rpc_urls = {"testnet": stub_server(stub_node(state, change_ratio))}
+    wallets = [(f"0x{i:040x}", "testnet") for i in range(n_wallets)]
+    before = scanner_stats()
+
+    timings, events = [], []
+    for round_ in range(2):
+        state["round"] = round_
+        started = time.perf_counter()
+        # The stub has no provider limit to respect.
+        events.append(asyncio.run(scan_wallets(wallets, rpc_urls, {"testnet": tokens}, rate_limit_rps=500)))
+        timings.append(time.perf_counter() - started)
+    stats = {k: v - before[k] for k, v in scanner_stats().items()}
+    print({"wallets": n_wallets, "first_scan_s": round(timings[0], 2), "rescan_s": round(timings[1], 2),
+           "baseline_rows": len(events[0]), "changes": len(events[1]), **stats})
+
+    balances = n_wallets * (1 + len(tokens))
+    assert len(events[0]) == balances and all(e["first_seen"] for e in events[0])
+    assert 0 < len(events[1]) < balances * change_ratio
+    assert all(e["asset"] == NATIVE and e["delta"] == 7 and e["block_number"] == 19_000_001 for e in events[1])
+    # One eth_blockNumber call plus full batches per scan.
+    assert stats["requests"] == 2 * (1 + -(-balances // RPC_BATCH_SIZE)) and stats["call_errors"] == 0
+    with cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM public.wallet_balances WHERE chain = 'testnet'")
+        assert cur.fetchone()[0] == balances
+        cur.execute("SELECT COUNT(*) FROM public.wallet_balance_events WHERE chain = 'testnet'")
+        assert cur.fetchone()[0] == len(events[1])  # A wallet's first scan only records the baseline